@@ -19,6 +19,8 @@ from shared.app.core.config import settings
 sys.path.insert(0, "/app/shared")
 from app.models.base import Base
 from app.models.chat import * # Import all models to register them
+from app.models.outbox import * # noqa: F401,F403
+from app.models.archive import * # noqa: F401,F403
 
 
 # this is the Alembic Config object, which provides
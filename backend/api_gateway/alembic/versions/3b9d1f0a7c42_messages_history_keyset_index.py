@@ -0,0 +1,42 @@
+"""Composite index for keyset-paginated message history
+
+Revision ID: 3b9d1f0a7c42
+Revises: 172e5e3c57f8
+Create Date: 2025-07-02 10:14:08.112530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9d1f0a7c42'
+down_revision: Union[str, Sequence[str], None] = '172e5e3c57f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction and keeps the
+    # messages table writable while the index is built.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_group_id_timestamp_id',
+            'messages',
+            ['group_id', 'timestamp', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        # The composite index has group_id as its leading column, so the
+        # single-column index is redundant and only slows down inserts.
+        op.drop_index(op.f('ix_messages_group_id'), table_name='messages', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_messages_group_id'), 'messages', ['group_id'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_messages_group_id_timestamp_id', table_name='messages', postgresql_concurrently=True)
@@ -0,0 +1,139 @@
+"""Range-partition messages by month and add the message_archives table
+
+Revision ID: 5d2f8a1c3e69
+Revises: 8c41e7d2b9a5
+Create Date: 2025-07-07 11:02:37.540218
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f8a1c3e69'
+down_revision: Union[str, Sequence[str], None] = '8c41e7d2b9a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Keep in sync with MESSAGE_PARTITION_PREMAKE_MONTHS; the Orchestrator's
+# nightly job creates later months.
+PREMAKE_MONTHS = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_partition(month: date) -> None:
+    op.execute(
+        f"CREATE TABLE messages_p{month:%Y_%m} PARTITION OF messages "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('message_archives',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('row_count', sa.BigInteger(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('month')
+    )
+
+    # An existing table cannot be turned into a partitioned one: move it
+    # aside, create the partitioned table under the old name and copy the
+    # rows over. Index and primary key names are schema-wide, so the old
+    # ones are dropped or renamed first.
+    #
+    # Downtime: the rename takes an exclusive lock on `messages` until the
+    # migration commits, so stop the gateway and the workers before running
+    # it. The copy runs one month at a time, each statement reading only
+    # that month's range, which bounds the work per statement and lets the
+    # progress be followed in pg_stat_activity. The self-referencing
+    # parent_message_id foreign key is not recreated: `id` alone is no
+    # longer unique to reference, and archived months take parents away.
+    op.drop_index('ix_messages_group_id_timestamp_id', table_name='messages')
+    op.drop_index(op.f('ix_messages_timestamp'), table_name='messages')
+    op.drop_index(op.f('ix_messages_turn_id'), table_name='messages')
+    op.rename_table('messages', 'messages_unpartitioned')
+    op.execute("ALTER TABLE messages_unpartitioned RENAME CONSTRAINT messages_pkey TO messages_unpartitioned_pkey")
+
+    op.create_table('messages',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('group_id', sa.Uuid(), nullable=False),
+    sa.Column('turn_id', sa.Uuid(), nullable=False),
+    sa.Column('sender_alias', sa.String(length=100), nullable=False),
+    sa.Column('content', sa.String(), nullable=False),
+    sa.Column('parent_message_id', sa.Uuid(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('meta', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['chat_groups.id'], ),
+    sa.PrimaryKeyConstraint('id', 'timestamp'),
+    postgresql_partition_by='RANGE (timestamp)',
+    )
+
+    oldest = op.get_bind().execute(sa.text("SELECT min(timestamp) FROM messages_unpartitioned")).scalar()
+    current = date.today().replace(day=1)
+    month = min(oldest.date().replace(day=1), current) if oldest else current
+    months = []
+    while month <= _add_months(current, PREMAKE_MONTHS):
+        _create_partition(month)
+        months.append(month)
+        month = _add_months(month, 1)
+
+    for month in months:
+        op.execute(
+            "INSERT INTO messages (id, group_id, turn_id, sender_alias, content, parent_message_id, timestamp, meta) "
+            "SELECT id, group_id, turn_id, sender_alias, content, parent_message_id, timestamp, meta "
+            f"FROM messages_unpartitioned WHERE timestamp >= '{month.isoformat()}' "
+            f"AND timestamp < '{_add_months(month, 1).isoformat()}'"
+        )
+    op.drop_table('messages_unpartitioned')
+
+    # Indexes on the partitioned table are created on every partition.
+    op.create_index('ix_messages_group_id_timestamp_id', 'messages', ['group_id', 'timestamp', 'id'], unique=False)
+    op.create_index(op.f('ix_messages_timestamp'), 'messages', ['timestamp'], unique=False)
+    op.create_index(op.f('ix_messages_turn_id'), 'messages', ['turn_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Only rows still in Postgres are kept; archived months stay on disk.
+    op.drop_index(op.f('ix_messages_turn_id'), table_name='messages')
+    op.drop_index(op.f('ix_messages_timestamp'), table_name='messages')
+    op.drop_index('ix_messages_group_id_timestamp_id', table_name='messages')
+    op.rename_table('messages', 'messages_partitioned')
+    op.execute("ALTER TABLE messages_partitioned RENAME CONSTRAINT messages_pkey TO messages_partitioned_pkey")
+
+    op.create_table('messages',
+    sa.Column('id', sa.Uuid(), nullable=False),
+    sa.Column('group_id', sa.Uuid(), nullable=False),
+    sa.Column('turn_id', sa.Uuid(), nullable=False),
+    sa.Column('sender_alias', sa.String(length=100), nullable=False),
+    sa.Column('content', sa.String(), nullable=False),
+    sa.Column('parent_message_id', sa.Uuid(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=False),
+    sa.Column('meta', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['group_id'], ['chat_groups.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(
+        "INSERT INTO messages (id, group_id, turn_id, sender_alias, content, parent_message_id, timestamp, meta) "
+        "SELECT id, group_id, turn_id, sender_alias, content, parent_message_id, timestamp, meta FROM messages_partitioned"
+    )
+    op.drop_table('messages_partitioned')
+    # Replies whose parent was archived lose the reference.
+    op.execute(
+        "UPDATE messages SET parent_message_id = NULL WHERE parent_message_id IS NOT NULL "
+        "AND parent_message_id NOT IN (SELECT id FROM messages)"
+    )
+    op.create_foreign_key(None, 'messages', 'messages', ['parent_message_id'], ['id'])
+
+    op.create_index('ix_messages_group_id_timestamp_id', 'messages', ['group_id', 'timestamp', 'id'], unique=False)
+    op.create_index(op.f('ix_messages_timestamp'), 'messages', ['timestamp'], unique=False)
+    op.create_index(op.f('ix_messages_turn_id'), 'messages', ['turn_id'], unique=False)
+    op.drop_table('message_archives')
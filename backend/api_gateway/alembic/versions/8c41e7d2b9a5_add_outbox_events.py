@@ -0,0 +1,37 @@
+"""Add outbox_events table for transactional job enqueueing
+
+Revision ID: 8c41e7d2b9a5
+Revises: 3b9d1f0a7c42
+Create Date: 2025-07-04 16:41:52.907114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41e7d2b9a5'
+down_revision: Union[str, Sequence[str], None] = '3b9d1f0a7c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox_events',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('job_name', sa.String(length=100), nullable=False),
+    sa.Column('queue_name', sa.String(length=100), nullable=False),
+    sa.Column('job_kwargs', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('outbox_events')
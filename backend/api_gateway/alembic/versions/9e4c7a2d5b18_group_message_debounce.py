@@ -0,0 +1,29 @@
+"""Add message_debounce_seconds to chat_groups
+
+Revision ID: 9e4c7a2d5b18
+Revises: f6b3d8a2c917
+Create Date: 2025-07-18 14:41:09.263517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4c7a2d5b18'
+down_revision: Union[str, Sequence[str], None] = 'f6b3d8a2c917'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing groups keep the server-wide USER_MESSAGE_DEBOUNCE_SECONDS.
+    op.add_column('chat_groups', sa.Column('message_debounce_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chat_groups', 'message_debounce_seconds')
@@ -0,0 +1,46 @@
+"""Generated tsvector column and GIN index for message search
+
+Revision ID: a7e3c91f4d20
+Revises: 5d2f8a1c3e69
+Create Date: 2025-07-09 09:27:15.381604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e3c91f4d20'
+down_revision: Union[str, Sequence[str], None] = '5d2f8a1c3e69'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Must match SEARCH_TEXT_CONFIG in the groups router.
+    op.add_column('messages', sa.Column(
+        'content_tsv',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('english'::regconfig, content)", persisted=True),
+        nullable=True,
+    ))
+    # btree_gin lets group_id share the GIN index, so a search scans only the
+    # group's postings instead of every match and filtering by group.
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.create_index(
+        'ix_messages_group_id_content_tsv',
+        'messages',
+        ['group_id', 'content_tsv'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_group_id_content_tsv', table_name='messages', postgresql_using='gin')
+    op.drop_column('messages', 'content_tsv')
@@ -0,0 +1,126 @@
+"""Store compact message meta as JSONB and index tool calls
+
+Revision ID: c4b8e2f16a93
+Revises: a7e3c91f4d20
+Create Date: 2025-07-11 14:52:06.218734
+
+"""
+import logging
+import uuid
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4b8e2f16a93'
+down_revision: Union[str, Sequence[str], None] = 'a7e3c91f4d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+BATCH_SIZE = 5000
+
+# Rewrites a batch of full `model_dump()` (or `dumpd()`, under "kwargs")
+# blobs into the shape of compact_message_meta: type, tool_calls (id, name,
+# args), tool_call_id and usage, with empty entries dropped.
+BACKFILL_BATCH = sa.text("""
+WITH batch AS (
+    SELECT timestamp, id, pg_column_size(meta) AS old_size,
+           CASE WHEN meta ? 'kwargs' THEN meta -> 'kwargs' ELSE meta END AS src
+    FROM messages
+    WHERE (meta ? 'content' OR meta ? 'kwargs') AND (timestamp, id) > (:after_ts, :after_id)
+    ORDER BY timestamp, id
+    LIMIT :batch_size
+), compacted AS (
+    SELECT timestamp, id, old_size, (
+        SELECT jsonb_object_agg(key, value)
+        FROM jsonb_each(jsonb_build_object(
+            'type', src -> 'type',
+            'tool_calls', (
+                SELECT jsonb_agg(jsonb_build_object(
+                    'id', call -> 'id', 'name', call -> 'name', 'args', COALESCE(call -> 'args', '{}'::jsonb)
+                ))
+                FROM jsonb_array_elements(
+                    CASE WHEN jsonb_typeof(src -> 'tool_calls') = 'array' THEN src -> 'tool_calls' ELSE '[]'::jsonb END
+                ) AS call
+            ),
+            'tool_call_id', src -> 'tool_call_id',
+            'usage', src -> 'usage_metadata'
+        ))
+        WHERE value <> 'null'::jsonb AND value <> '""'::jsonb
+    ) AS meta
+    FROM batch
+)
+UPDATE messages AS m SET meta = c.meta
+FROM compacted AS c
+WHERE m.timestamp = c.timestamp AND m.id = c.id
+RETURNING m.timestamp, m.id, c.old_size, pg_column_size(m.meta) AS new_size
+""")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        'messages', 'meta',
+        existing_type=sa.JSON(),
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        existing_nullable=True,
+        postgresql_using='meta::jsonb',
+    )
+
+    # Each batch commits on its own, so the backfill neither holds locks on
+    # the whole table nor has to start over if it is interrupted.
+    bind = op.get_bind()
+    rows = old_bytes = new_bytes = 0
+    with op.get_context().autocommit_block():
+        after = {"after_ts": datetime.min, "after_id": uuid.UUID(int=0)}
+        while True:
+            batch = bind.execute(BACKFILL_BATCH, {**after, "batch_size": BATCH_SIZE}).all()
+            if not batch:
+                break
+            rows += len(batch)
+            old_bytes += sum(r.old_size for r in batch)
+            new_bytes += sum(r.new_size or 0 for r in batch)
+            last = max(batch, key=lambda r: (r.timestamp, r.id))
+            after = {"after_ts": last.timestamp, "after_id": last.id}
+            logger.info("Compacted meta of %d messages", rows)
+    if rows:
+        logger.info(
+            "Compacted meta of %d messages: %.0f -> %.0f bytes per row on average (%.0f saved per row)",
+            rows, old_bytes / rows, new_bytes / rows, (old_bytes - new_bytes) / rows,
+        )
+
+    op.create_index(
+        'ix_messages_meta_tool_calls',
+        'messages',
+        [sa.text("(meta -> 'tool_calls') jsonb_path_ops")],
+        unique=False,
+        postgresql_using='gin',
+    )
+    # Equality lookups of the tool message answering a call; a btree serves
+    # them better than GIN.
+    op.create_index(
+        'ix_messages_meta_tool_call_id',
+        'messages',
+        [sa.text("(meta ->> 'tool_call_id')")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The dropped parts of the old blobs cannot be restored.
+    op.drop_index('ix_messages_meta_tool_call_id', table_name='messages')
+    op.drop_index('ix_messages_meta_tool_calls', table_name='messages', postgresql_using='gin')
+    op.alter_column(
+        'messages', 'meta',
+        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+        type_=sa.JSON(),
+        existing_nullable=True,
+        postgresql_using='meta::json',
+    )
@@ -0,0 +1,31 @@
+"""Add orchestrator_mode to chat_groups
+
+Revision ID: e2a9c4f7b816
+Revises: c4b8e2f16a93
+Create Date: 2025-07-14 10:27:43.581209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9c4f7b816'
+down_revision: Union[str, Sequence[str], None] = 'c4b8e2f16a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'chat_groups',
+        sa.Column('orchestrator_mode', sa.String(length=20), server_default='auto', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chat_groups', 'orchestrator_mode')
@@ -0,0 +1,31 @@
+"""Add the fast cascade model to group_members
+
+Revision ID: f6b3d8a2c917
+Revises: e2a9c4f7b816
+Create Date: 2025-07-15 09:12:37.904126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b3d8a2c917'
+down_revision: Union[str, Sequence[str], None] = 'e2a9c4f7b816'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing Orchestrators keep calling their single model.
+    op.add_column('group_members', sa.Column('fast_provider', sa.String(length=50), nullable=True))
+    op.add_column('group_members', sa.Column('fast_model', sa.String(length=100), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('group_members', 'fast_model')
+    op.drop_column('group_members', 'fast_provider')
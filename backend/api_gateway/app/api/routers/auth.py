@@ -7,7 +7,7 @@ import structlog
 from shared.app.db import get_db_session
 from shared.app.schemas.auth import UserCreate, Token, UserRead # Added UserRead
 from shared.app.models.chat import User
-from app.core.security import get_password_hash, verify_password, create_access_token, get_current_user # Added get_current_user
+from app.core.security import hash_password, verify_and_update_password, create_access_token, get_current_user, password_rehashes # Added get_current_user
 
 router = APIRouter()
 logger = structlog.get_logger(__name__)
@@ -22,7 +22,7 @@ async def register_user(user_in: UserCreate, db: AsyncSession = Depends(get_db_s
                 logger.warn("register_user.email_exists", email=user_in.email)
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
 
-            hashed_password = get_password_hash(user_in.password)
+            hashed_password = await hash_password(user_in.password)
             user = User(email=user_in.email, hashed_password=hashed_password)
             session.add(user)
             await session.commit()
@@ -50,7 +50,10 @@ async def login_for_access_token(
             logger.error("login.db_error", error=str(e), exc_info=True)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = await verify_and_update_password(
+        form_data.password, user.hashed_password if user else None
+    )
+    if not valid:
         logger.warn("login.auth_failed", username=form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -58,6 +61,19 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if new_hash:
+        # The stored hash predates the current bcrypt parameters; upgrade it
+        # now that we have the plaintext. A failure here must not block login.
+        try:
+            async with db() as session:
+                db_user = await session.get(User, user.id)
+                db_user.hashed_password = new_hash
+                await session.commit()
+            password_rehashes.inc()
+            logger.info("login.password_rehashed", user_id=str(user.id))
+        except Exception as e:
+            logger.error("login.rehash_failed", user_id=str(user.id), error=str(e), exc_info=True)
+
     access_token = create_access_token(data={"sub": str(user.id)})
     logger.info("login.success", user_id=str(user.id))
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,14 +1,25 @@
-import uuid
 import asyncio
-from fastapi import APIRouter, Depends, HTTPException, Query, status # Added status
-from sqlalchemy import select
+import gzip
+import uuid
+import zlib
+from collections.abc import AsyncIterator
+from typing import Literal
+
+import zstandard
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status # Added status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import cast, func, insert, literal, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import REGCONFIG, TSVECTOR
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload
 from arq import ArqRedis
 from app.core.arq_client import get_arq_pool
 from app.core.security import get_current_user
+from app.core.cache import TTLCache
+from app.core.authz import authorize_group, cached_group_access, raise_for_access, record_group_access
+from app.core.outbox_relay import notify_outbox
 import structlog
-from shared.app.db import get_db_session
+from shared.app.db import get_db_session, get_read_db_session
 from shared.app.schemas.groups import ( #ชัดเจนขึ้น
     GroupCreate,
     GroupRead,
@@ -17,33 +28,97 @@ from shared.app.schemas.groups import ( #ชัดเจนขึ้น
     AgentConfigUpdate,
     GroupMemberRead,
     GroupUpdate,
+    OrchestratorConfig,
 )
-from shared.app.schemas.chat import MessageCreate, MessageRead, MessageHistoryRead
+from shared.app.schemas.chat import MessageCreate, MessageRead, MessageHistoryRead, MessageSearchResult, TurnStatusRead, GroupUsageRead
 from shared.app.agents.prompts import ORCHESTRATOR_PROMPT, AGENT_BASE_PROMPT
 from shared.app.models.chat import ChatGroup, GroupMember, User, Message
-from datetime import datetime
+from shared.app.models.outbox import OutboxEvent
+from shared.app.models.archive import MessageArchive
+from shared.app.utils.event_stream import group_stream_key
+from shared.app.utils.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    decode_search_cursor,
+    encode_cursor,
+    encode_search_cursor,
+)
+from shared.app.utils.history_cache import (
+    append_history_entries,
+    fill_history,
+    get_history_generation,
+    invalidate_history,
+    read_history,
+    serialize_history_entry,
+)
+from shared.app.utils.message_archive import (
+    add_months,
+    archived_group_files,
+    delete_group_archives,
+    month_start,
+    read_archived_messages,
+)
+from shared.app.utils.singleflight import SingleFlight
+from shared.app.utils.turn_queue import release_group_turn
+from shared.app.utils.turn_status import TERMINAL_TURN_PHASES, cancel_turn, queue_turn, read_turn_status
+from shared.app.utils.usage import budgets, read_group_usage
+from shared.app.core.config import settings
+from shared.app.core.metrics import Counter
+from datetime import date, datetime
 
 router = APIRouter()
 logger = structlog.get_logger(__name__)
 
+# Columns every history row carries; `fields=` can only add the optional ones.
+HISTORY_REQUIRED_FIELDS = ("id", "group_id", "turn_id", "sender_alias", "content", "timestamp")
+HISTORY_OPTIONAL_FIELDS = ("parent_message_id", "meta")
+
+# Text search configuration of the generated `messages.content_tsv` column;
+# changing it requires a migration that regenerates the column.
+SEARCH_TEXT_CONFIG = "english"
+SEARCH_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=24, MinWords=8, MaxFragments=2"
+# Not mapped on `Message`: the column is Postgres-only and never written.
+_content_tsv = literal_column("messages.content_tsv", type_=TSVECTOR)
+
+# Rows fetched per round trip by the export's server-side cursor; together
+# with the archive read size this bounds the export's memory use.
+EXPORT_BATCH_SIZE = 1000
+EXPORT_ARCHIVE_READ_BYTES = 64 * 1024
+EXPORT_FORMATS = {
+    "none": ("application/x-ndjson", ".ndjson"),
+    "gzip": ("application/gzip", ".ndjson.gz"),
+    "zstd": ("application/zstd", ".ndjson.zst"),
+}
+
+history_cache_hits = Counter("synapse_history_cache_hits_total", "First-page history requests served from Redis.")
+history_cache_misses = Counter("synapse_history_cache_misses_total", "First-page history requests that fell back to Postgres.")
+history_cache_coalesced = Counter(
+    "synapse_history_cache_coalesced_total", "History cache misses that reused a concurrent identical load."
+)
+_history_loads = SingleFlight()
+# Archived months change once a night. A month archived in the last minute is
+# missing from pages that reach past Postgres until this entry expires.
+_archived_months = TTLCache(maxsize=1, ttl=60)
+
 # --- Helper Function to get and authorize group ---
 async def get_group_and_authorize(
     group_id: uuid.UUID, session: AsyncSession, current_user: User, eager_load_members: bool = False
 ) -> ChatGroup:
-    """Fetches a group and verifies ownership."""
+    """Fetches a group and verifies ownership. Use `authorize_group` when the entity itself is not needed."""
+    cached_access = cached_group_access(group_id, current_user.id)
+    if cached_access is not None:
+        raise_for_access(cached_access, group_id, current_user)
+
     query = select(ChatGroup).where(ChatGroup.id == group_id)
     if eager_load_members:
-        query = query.options(selectinload(ChatGroup.members))
+        # One round trip for the group and its members.
+        query = query.options(joinedload(ChatGroup.members))
     
     result = await session.execute(query)
-    group = result.scalars().first()
-
-    if not group:
-        logger.warn("get_group_and_authorize.not_found", group_id=str(group_id))
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
-    if group.owner_id != current_user.id:
-        logger.warn("get_group_and_authorize.forbidden", group_id=str(group_id), owner_id=str(group.owner_id), current_user_id=str(current_user.id))
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this group")
+    group = result.unique().scalars().first()
+
+    access = record_group_access(group_id, current_user.id, group.owner_id if group else None)
+    raise_for_access(access, group_id, current_user)
     return group
 
 # --- Helper Function to get and authorize group member ---
@@ -51,10 +126,10 @@ async def get_member_and_authorize(
     group_id: uuid.UUID, member_id: uuid.UUID, session: AsyncSession, current_user: User
 ) -> GroupMember:
     """Fetches a group member, ensuring it belongs to the specified group and user."""
-    group = await get_group_and_authorize(group_id, session, current_user) # Authorization check for group
+    await authorize_group(group_id, session, current_user) # Authorization check for group
 
     result = await session.execute(
-        select(GroupMember).where(GroupMember.id == member_id, GroupMember.group_id == group.id)
+        select(GroupMember).where(GroupMember.id == member_id, GroupMember.group_id == group_id)
     )
     member = result.scalars().first()
     if not member:
@@ -76,19 +151,32 @@ async def create_group(
     logger.info("create_group.start", owner_id=str(current_user.id), group_name=group_in.name)
     async with db() as session:
         try:
-            new_group = ChatGroup(name=group_in.name, owner_id=current_user.id)
+            new_group = ChatGroup(
+                name=group_in.name,
+                owner_id=current_user.id,
+                orchestrator_mode=group_in.orchestrator_mode,
+                message_debounce_seconds=group_in.message_debounce_seconds,
+            )
             session.add(new_group)
             # It's important to flush here so new_group.id is available if needed before commit,
             # though for associating members, adding them to session and then committing works.
             # await session.flush() # Ensure new_group.id is populated for member association
 
+            orchestrator_config = group_in.orchestrator or OrchestratorConfig(
+                provider=settings.ORCHESTRATOR_PROVIDER,
+                model=settings.ORCHESTRATOR_MODEL,
+                fast_provider=settings.ORCHESTRATOR_FAST_PROVIDER,
+                fast_model=settings.ORCHESTRATOR_FAST_MODEL,
+            )
             orchestrator_member = GroupMember(
                 alias="Orchestrator",
                 # group_id=new_group.id, # Set after flush or rely on relationship
                 group=new_group,
                 system_prompt=ORCHESTRATOR_PROMPT,
-                provider="gemini",
-                model="gemini-2.5-pro",
+                provider=orchestrator_config.provider,
+                model=orchestrator_config.model,
+                fast_provider=orchestrator_config.fast_provider if orchestrator_config.fast_model else None,
+                fast_model=orchestrator_config.fast_model if orchestrator_config.fast_provider else None,
                 temperature=0.1,
                 tools=[]
             )
@@ -124,11 +212,11 @@ async def create_group(
 
 @router.get("/", response_model=list[GroupRead])
 async def list_groups(
-    db: AsyncSession = Depends(get_db_session),
+    read_db: AsyncSession = Depends(get_read_db_session),
     current_user: User = Depends(get_current_user),
 ):
     logger.info("list_groups.start", user_id=str(current_user.id))
-    async with db() as session:
+    async with read_db() as session:
         result = await session.execute(
             select(ChatGroup).where(ChatGroup.owner_id == current_user.id).order_by(ChatGroup.created_at.desc())
         )
@@ -141,13 +229,27 @@ async def list_groups(
 async def get_group_details(
     group_id: uuid.UUID,
     db: AsyncSession = Depends(get_db_session),
+    read_db: AsyncSession = Depends(get_read_db_session),
     current_user: User = Depends(get_current_user),
 ):
     logger.info("get_group_details.start", group_id=str(group_id), user_id=str(current_user.id))
+    # Authorization is decided against the primary (and usually cached), so a
+    # replica that has not caught up yet can never cache a wrong 404.
     async with db() as session:
-        group = await get_group_and_authorize(group_id, session, current_user, eager_load_members=True)
-        logger.info("get_group_details.success", group_id=str(group.id))
-        return group
+        await authorize_group(group_id, session, current_user)
+
+    async with read_db() as session:
+        result = await session.execute(
+            select(ChatGroup).where(ChatGroup.id == group_id).options(joinedload(ChatGroup.members))
+        )
+        group = result.unique().scalars().first()
+    if group is None:
+        # Only possible for a group created moments ago on the primary.
+        logger.info("get_group_details.replica_lag_fallback", group_id=str(group_id))
+        async with db() as session:
+            group = await get_group_and_authorize(group_id, session, current_user, eager_load_members=True)
+    logger.info("get_group_details.success", group_id=str(group.id))
+    return group
 
 @router.put("/{group_id}", response_model=GroupRead)
 async def update_group_name(
@@ -156,10 +258,14 @@ async def update_group_name(
     db: AsyncSession = Depends(get_db_session),
     current_user: User = Depends(get_current_user),
 ):
-    logger.info("update_group_name.start", group_id=str(group_id), new_name=group_in.name, user_id=str(current_user.id))
+    logger.info("update_group_name.start", group_id=str(group_id), new_name=group_in.name, orchestrator_mode=group_in.orchestrator_mode, user_id=str(current_user.id))
     async with db() as session:
         group = await get_group_and_authorize(group_id, session, current_user)
         group.name = group_in.name
+        if group_in.orchestrator_mode is not None:
+            group.orchestrator_mode = group_in.orchestrator_mode
+        if "message_debounce_seconds" in group_in.model_fields_set:
+            group.message_debounce_seconds = group_in.message_debounce_seconds
         try:
             await session.commit()
             await session.refresh(group)
@@ -175,6 +281,7 @@ async def update_group_name(
 async def delete_group(
     group_id: uuid.UUID,
     db: AsyncSession = Depends(get_db_session),
+    arq_pool: ArqRedis = Depends(get_arq_pool),
     current_user: User = Depends(get_current_user),
 ):
     logger.info("delete_group.start", group_id=str(group_id), user_id=str(current_user.id))
@@ -188,6 +295,17 @@ async def delete_group(
             await session.rollback()
             logger.error("delete_group.error", group_id=str(group_id), error=str(e), exc_info=True)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Could not delete group: {e}")
+
+    try:
+        await arq_pool.delete(group_stream_key(str(group_id)))
+        await invalidate_history(arq_pool, group_id)
+    except Exception as e:
+        # Both keys expire on their own; a Redis hiccup must not fail the delete.
+        logger.warn("delete_group.redis_cleanup_failed", group_id=str(group_id), error=str(e))
+    try:
+        await asyncio.to_thread(delete_group_archives, group_id)
+    except OSError as e:
+        logger.warn("delete_group.archive_cleanup_failed", group_id=str(group_id), error=str(e))
     return None # For 204 response
 
 # --- Group Member (Agent) Management ---
@@ -201,7 +319,7 @@ async def add_group_member(
 ):
     logger.info("add_group_member.start", group_id=str(group_id), alias=member_in.alias, user_id=str(current_user.id))
     async with db() as session:
-        group = await get_group_and_authorize(group_id, session, current_user) # Authorizes group access
+        await authorize_group(group_id, session, current_user) # Authorizes group access
 
         # Optional: Check for alias conflict within the group
         existing_member_check = await session.execute(
@@ -213,7 +331,7 @@ async def add_group_member(
 
         system_prompt = f"{AGENT_BASE_PROMPT}\n{member_in.role_prompt}"
         new_member = GroupMember(
-            group_id=group.id,
+            group_id=group_id,
             alias=member_in.alias,
             system_prompt=system_prompt,
             tools=member_in.tools,
@@ -299,33 +417,463 @@ async def delete_group_member(
 
 
 # --- Message Endpoints (from Phase 1, ensure they are still correct) ---
-@router.get("/{group_id}/messages", response_model=list[MessageHistoryRead])
+def parse_history_fields(fields: str | None) -> tuple[str, ...]:
+    """Resolves the `fields=` projection of the history endpoint into column names."""
+    if fields is None:
+        return HISTORY_REQUIRED_FIELDS + HISTORY_OPTIONAL_FIELDS
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(HISTORY_REQUIRED_FIELDS) - set(HISTORY_OPTIONAL_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown field(s): {', '.join(sorted(unknown))}",
+        )
+    return HISTORY_REQUIRED_FIELDS + tuple(f for f in HISTORY_OPTIONAL_FIELDS if f in requested)
+
+
+@router.get(
+    "/{group_id}/messages",
+    response_model=list[MessageHistoryRead],
+    response_model_exclude_unset=True,
+)
 async def get_message_history(
     group_id: uuid.UUID,
+    response: Response,
     limit: int = Query(50, ge=1, le=100),
-    before_timestamp: datetime | None = Query(None, description="Fetch messages older than this timestamp (ISO 8601)"),
+    cursor: str | None = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    before_timestamp: datetime | None = Query(None, description="Fetch messages older than this timestamp (ISO 8601). Prefer `cursor`, which never skips messages sharing a timestamp."),
+    fields: str | None = Query(None, description="Comma-separated projection, e.g. `id,content`. Core fields are always returned; `meta` and `parent_message_id` only when listed. Defaults to all fields."),
     db: AsyncSession = Depends(get_db_session),
+    read_db: AsyncSession = Depends(get_read_db_session),
+    arq_pool: ArqRedis = Depends(get_arq_pool),
     current_user: User = Depends(get_current_user),
 ):
-    logger.info("get_message_history.start", group_id=str(group_id), user_id=str(current_user.id), limit=limit, before_timestamp=before_timestamp)
+    """
+    Returns one page of a group's history in chronological order.
+
+    Pages are walked newest-first with keyset pagination over
+    `(timestamp, id)`: when an older page may exist, its cursor is returned in
+    the `X-Next-Cursor` response header. The first page is served from the
+    group's recent-history cache in Redis; older pages come from the read
+    replica, and pages that run past the months still in Postgres continue
+    into the message archive.
+    """
+    logger.info("get_message_history.start", group_id=str(group_id), user_id=str(current_user.id), limit=limit, before_timestamp=before_timestamp, has_cursor=cursor is not None)
+    columns = parse_history_fields(fields)
+    if cursor is not None:
+        try:
+            cursor_timestamp, cursor_id = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     async with db() as session:
-        group = await get_group_and_authorize(group_id, session, current_user) # Verify group access
+        await authorize_group(group_id, session, current_user) # Verify group access
+
+    if cursor is None and before_timestamp is None and limit <= settings.HISTORY_CACHE_SIZE:
+        # The first page is what every chat open asks for; serve it from
+        # the hot cache and project afterwards. Misses are filled from the
+        # primary: the cache's generation check assumes the fill observes
+        # every committed write, which a lagging replica may not.
+        recent = await _get_recent_history(group_id, db, arq_pool)
+        messages = [
+            {column: row.get(column) for column in columns}
+            for row in recent[:limit]
+        ]
+    else:
+        async with read_db() as session:
+            query = (
+                select(*(getattr(Message, column) for column in columns))
+                .where(Message.group_id == group_id)
+                .order_by(Message.timestamp.desc(), Message.id.desc())
+                .limit(limit)
+            )
 
-        query = (
-            select(Message)
-            .where(Message.group_id == group.id)
-            .order_by(Message.timestamp.desc())
-            .limit(limit)
+            if cursor is not None:
+                query = query.where(tuple_(Message.timestamp, Message.id) < tuple_(cursor_timestamp, cursor_id))
+            elif before_timestamp:
+                query = query.where(Message.timestamp < before_timestamp)
+
+            messages_result = await session.execute(query)
+            messages = [dict(row) for row in messages_result.mappings().all()]
+
+    if len(messages) < limit:
+        messages = await _continue_into_archive(
+            group_id, read_db, messages, columns, limit,
+            before=cursor_timestamp if cursor is not None else before_timestamp,
+            before_id=cursor_id if cursor is not None else None,
         )
 
-        if before_timestamp:
-            query = query.where(Message.timestamp < before_timestamp)
+    if len(messages) == limit:
+        oldest = messages[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            _as_datetime(oldest["timestamp"]), uuid.UUID(str(oldest["id"]))
+        )
+
+    logger.info("get_message_history.success", group_id=str(group_id), count=len(messages), fields=columns)
+    return messages[::-1]
+
+
+def _as_datetime(value: datetime | str) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
 
-        messages_result = await session.execute(query)
-        messages = messages_result.scalars().all()
-        
-        logger.info("get_message_history.success", group_id=str(group.id), count=len(messages))
-        return messages[::-1]
+
+async def _get_archived_months(read_db) -> frozenset[date]:
+    archived = _archived_months.get("months")
+    if archived is None:
+        async with read_db() as session:
+            archived = frozenset((await session.execute(select(MessageArchive.month))).scalars().all())
+        _archived_months.set("months", archived)
+    return archived
+
+
+async def _continue_into_archive(
+    group_id: uuid.UUID,
+    read_db,
+    messages: list[dict],
+    columns: tuple[str, ...],
+    limit: int,
+    before: datetime | None,
+    before_id: uuid.UUID | None,
+) -> list[dict]:
+    """
+    Completes a short page (newest first) with rows from archived months
+    older than its last row, or than ``(before, before_id)`` if it is empty.
+    """
+    archived = await _get_archived_months(read_db)
+    if not archived:
+        return messages
+    # A month archived after the page was read is in both places; keep the
+    # archive's copy so the rows are not returned twice.
+    messages = [m for m in messages if month_start(_as_datetime(m["timestamp"])) not in archived]
+    if messages:
+        before, before_id = _as_datetime(messages[-1]["timestamp"]), uuid.UUID(str(messages[-1]["id"]))
+    rows = await asyncio.to_thread(
+        read_archived_messages, group_id, sorted(archived), before, before_id, limit - len(messages)
+    )
+    return messages + [{column: row.get(column) for column in columns} for row in rows]
+
+
+async def _get_recent_history(group_id: uuid.UUID, db, redis: ArqRedis) -> list[dict]:
+    """
+    Newest HISTORY_CACHE_SIZE rows of a group (newest first), from the Redis
+    cache when warm. Concurrent misses for the same group share one query.
+    """
+    try:
+        cached = await read_history(redis, group_id, settings.HISTORY_CACHE_SIZE)
+    except Exception as e:
+        logger.warn("get_message_history.cache_read_failed", group_id=str(group_id), error=str(e))
+        cached, redis = None, None
+    if cached is not None:
+        history_cache_hits.inc()
+        return cached
+
+    history_cache_misses.inc()
+    rows, shared = await _history_loads.do(group_id, lambda: _load_recent_history(group_id, db, redis))
+    if shared:
+        history_cache_coalesced.inc()
+    return rows
+
+
+async def _load_recent_history(group_id: uuid.UUID, db, redis: ArqRedis | None) -> list[dict]:
+    generation = None
+    if redis is not None:
+        try:
+            generation = await get_history_generation(redis, group_id)
+        except Exception as e:
+            logger.warn("get_message_history.cache_generation_failed", group_id=str(group_id), error=str(e))
+            redis = None
+
+    async with db() as session:
+        result = await session.execute(
+            select(*(getattr(Message, column) for column in HISTORY_REQUIRED_FIELDS + HISTORY_OPTIONAL_FIELDS))
+            .where(Message.group_id == group_id)
+            .order_by(Message.timestamp.desc(), Message.id.desc())
+            .limit(settings.HISTORY_CACHE_SIZE)
+        )
+        rows = [dict(row) for row in result.mappings().all()]
+
+    if redis is not None:
+        try:
+            filled = await fill_history(redis, group_id, rows, generation)
+            logger.debug("get_message_history.cache_fill", group_id=str(group_id), filled=filled, count=len(rows))
+        except Exception as e:
+            logger.warn("get_message_history.cache_fill_failed", group_id=str(group_id), error=str(e))
+    return rows
+
+
+def build_search_query(
+    group_id: uuid.UUID,
+    q: str,
+    limit: int,
+    sender_alias: str | None = None,
+    turn_id: uuid.UUID | None = None,
+    after: tuple[float, datetime, uuid.UUID] | None = None,
+):
+    """
+    Ranked matches of ``q`` (web search syntax: quoted phrases, `or`, `-term`)
+    in a group, best first, with ties broken by recency. Snippets are only
+    computed for the rows of the returned page.
+    """
+    config = cast(literal(SEARCH_TEXT_CONFIG), REGCONFIG)
+    tsquery = func.websearch_to_tsquery(config, q)
+    rank = func.ts_rank_cd(_content_tsv, tsquery)
+    matches = (
+        select(
+            Message.id, Message.group_id, Message.turn_id, Message.sender_alias,
+            Message.timestamp, Message.content, rank.label("rank"),
+        )
+        .where(Message.group_id == group_id, _content_tsv.op("@@")(tsquery))
+        .order_by(rank.desc(), Message.timestamp.desc(), Message.id.desc())
+        .limit(limit)
+    )
+    if sender_alias is not None:
+        matches = matches.where(Message.sender_alias == sender_alias)
+    if turn_id is not None:
+        matches = matches.where(Message.turn_id == turn_id)
+    if after is not None:
+        matches = matches.where(tuple_(rank, Message.timestamp, Message.id) < tuple_(*after))
+
+    page = matches.subquery("page")
+    return select(
+        page.c.id, page.c.group_id, page.c.turn_id, page.c.sender_alias, page.c.timestamp, page.c.rank,
+        func.ts_headline(config, page.c.content, tsquery, SEARCH_HEADLINE_OPTIONS).label("snippet"),
+    ).order_by(page.c.rank.desc(), page.c.timestamp.desc(), page.c.id.desc())
+
+
+@router.get("/{group_id}/messages/search", response_model=list[MessageSearchResult])
+async def search_messages(
+    group_id: uuid.UUID,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=256, description="Search terms; supports quoted phrases, `or` and `-term`"),
+    sender_alias: str | None = Query(None, description="Only messages from this sender"),
+    turn_id: uuid.UUID | None = Query(None, description="Only messages of this turn"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    db: AsyncSession = Depends(get_db_session),
+    read_db: AsyncSession = Depends(get_read_db_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Full-text search over a group's messages, ranked by relevance, with
+    highlighted snippets. Archived months are not searched. When more results
+    may exist, the next page's cursor is returned in `X-Next-Cursor`.
+    """
+    logger.info("search_messages.start", group_id=str(group_id), user_id=str(current_user.id), limit=limit, has_cursor=cursor is not None)
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_search_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    async with db() as session:
+        await authorize_group(group_id, session, current_user) # Verify group access
+
+    async with read_db() as session:
+        result = await session.execute(
+            build_search_query(group_id, q, limit, sender_alias=sender_alias, turn_id=turn_id, after=after)
+        )
+        results = [dict(row) for row in result.mappings().all()]
+
+    if len(results) == limit:
+        last = results[-1]
+        response.headers["X-Next-Cursor"] = encode_search_cursor(last["rank"], last["timestamp"], last["id"])
+
+    logger.info("search_messages.success", group_id=str(group_id), count=len(results))
+    return results
+
+
+@router.get("/{group_id}/messages/{message_id}", response_model=MessageHistoryRead)
+async def get_message(
+    group_id: uuid.UUID,
+    message_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db_session),
+    read_db: AsyncSession = Depends(get_read_db_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Returns one message with its metadata. WebSocket events carry only a slim
+    envelope; clients fetch the rest here for events flagged `has_meta`.
+    """
+    async with db() as session:
+        await authorize_group(group_id, session, current_user) # Verify group access
+
+    query = select(Message).where(Message.group_id == group_id, Message.id == message_id)
+    async with read_db() as session:
+        message = (await session.execute(query)).scalars().first()
+    if message is None:
+        # Events are fetched right after they are broadcast, which can be
+        # before the replica has applied the insert.
+        async with db() as session:
+            message = (await session.execute(query)).scalars().first()
+    if message is None:
+        logger.warn("get_message.not_found", group_id=str(group_id), message_id=str(message_id))
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+    return message
+
+
+@router.get("/{group_id}/turns/{turn_id}", response_model=TurnStatusRead)
+async def get_turn_status(
+    group_id: uuid.UUID,
+    turn_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db_session),
+    arq_pool: ArqRedis = Depends(get_arq_pool),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Live progress of a turn: its phase, the agents or tools it is waiting on
+    and its turn count. Connected WebSocket clients receive the same record
+    as `turn_status` events. Statuses expire TURN_STATUS_TTL_SECONDS after
+    their last update.
+    """
+    async with db() as session:
+        await authorize_group(group_id, session, current_user) # Verify group access
+
+    turn_status = await read_turn_status(arq_pool, turn_id)
+    if turn_status is None or turn_status["group_id"] != str(group_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Turn status not found")
+    return turn_status
+
+
+@router.post("/{group_id}/turns/{turn_id}/cancel", response_model=TurnStatusRead, status_code=status.HTTP_202_ACCEPTED)
+async def cancel_group_turn(
+    group_id: uuid.UUID,
+    turn_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db_session),
+    arq_pool: ArqRedis = Depends(get_arq_pool),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Stops a running turn: nothing further is dispatched, queued agent and
+    tool jobs are dropped and running ones are aborted. Results that were
+    already produced are still saved.
+    """
+    logger.info("cancel_group_turn.start", group_id=str(group_id), turn_id=str(turn_id), user_id=str(current_user.id))
+    async with db() as session:
+        await authorize_group(group_id, session, current_user) # Verify group access
+
+    turn_status = await read_turn_status(arq_pool, turn_id)
+    if turn_status is None or turn_status["group_id"] != str(group_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Turn status not found")
+    if turn_status["phase"] in TERMINAL_TURN_PHASES:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Turn has already ended ({turn_status['phase']})")
+
+    cancelled = await cancel_turn(arq_pool, group_id, turn_id)
+    if cancelled is None:
+        # It ended on its own between the read and the cancellation.
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Turn has already ended")
+    try:
+        # A cancelled turn may never reach the end of its graph; let the
+        # group's queued messages run now.
+        await release_group_turn(arq_pool, group_id, turn_id)
+    except Exception as e:
+        logger.warn("cancel_group_turn.release_failed", group_id=str(group_id), turn_id=str(turn_id), error=str(e))
+    logger.info("cancel_group_turn.success", group_id=str(group_id), turn_id=str(turn_id))
+    return cancelled
+
+
+@router.get("/{group_id}/usage", response_model=GroupUsageRead)
+async def get_group_usage(
+    group_id: uuid.UUID,
+    days: int = Query(7, ge=1, le=settings.USAGE_RETENTION_DAYS),
+    db: AsyncSession = Depends(get_db_session),
+    arq_pool: ArqRedis = Depends(get_arq_pool),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    LLM token usage and cost of the group per UTC day, newest first, with the
+    budgets the router enforces. Days older than USAGE_RETENTION_DAYS are not
+    kept.
+    """
+    async with db() as session:
+        await authorize_group(group_id, session, current_user) # Verify group access
+
+    return {
+        "group_id": group_id,
+        "budgets": budgets(),
+        "days": await read_group_usage(arq_pool, group_id, days),
+    }
+
+
+@router.get("/{group_id}/export", response_class=StreamingResponse)
+async def export_group_messages(
+    group_id: uuid.UUID,
+    compression: Literal["none", "gzip", "zstd"] = Query("none", description="Compress the NDJSON stream"),
+    db: AsyncSession = Depends(get_db_session),
+    read_db: AsyncSession = Depends(get_read_db_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Streams every message of a group, archived months included, as NDJSON in
+    chronological order (one history row with all fields per line). Rows
+    are read from the replica through a server-side cursor, so the gateway's
+    memory use does not grow with the size of the history.
+    """
+    logger.info("export_group_messages.start", group_id=str(group_id), user_id=str(current_user.id), compression=compression)
+    async with db() as session:
+        await authorize_group(group_id, session, current_user) # Verify group access
+
+    media_type, suffix = EXPORT_FORMATS[compression]
+    return StreamingResponse(
+        _export_body(group_id, read_db, compression),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{group_id}{suffix}"'},
+    )
+
+
+async def _export_body(group_id: uuid.UUID, read_db, compression: str) -> AsyncIterator[bytes]:
+    if compression == "gzip":
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) # gzip container
+    elif compression == "zstd":
+        compressor = zstandard.ZstdCompressor().compressobj()
+    else:
+        compressor = None
+
+    exported = 0
+    try:
+        async for chunk, rows in _export_ndjson(group_id, read_db):
+            exported += rows
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor is not None:
+            yield compressor.flush()
+    except Exception as e:
+        # Headers are already sent; the client sees a truncated stream.
+        logger.error("export_group_messages.error", group_id=str(group_id), exported=exported, error=str(e), exc_info=True)
+        raise
+    logger.info("export_group_messages.success", group_id=str(group_id), exported=exported)
+
+
+async def _export_ndjson(group_id: uuid.UUID, read_db) -> AsyncIterator[tuple[bytes, int]]:
+    """Yields ``(ndjson_chunk, row_count)``: archived months first, then Postgres."""
+    archived = await _get_archived_months(read_db)
+    # Archive lines are already NDJSON in the history row shape; pass them
+    # through undecoded. Row counts are only tracked for Postgres rows.
+    for path in await asyncio.to_thread(archived_group_files, group_id, list(archived)):
+        archive = await asyncio.to_thread(gzip.open, path, "rb")
+        try:
+            while chunk := await asyncio.to_thread(archive.read, EXPORT_ARCHIVE_READ_BYTES):
+                yield chunk, 0
+        finally:
+            archive.close()
+
+    query = (
+        select(*(getattr(Message, column) for column in HISTORY_REQUIRED_FIELDS + HISTORY_OPTIONAL_FIELDS))
+        .where(Message.group_id == group_id)
+        .order_by(Message.timestamp, Message.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    if archived:
+        # Archived months are contiguous from the oldest; skip a month that
+        # was archived but is still visible here.
+        query = query.where(Message.timestamp >= add_months(max(archived), 1))
+    async with read_db() as session:
+        result = await session.stream(query)
+        async for batch in result.mappings().partitions():
+            ndjson = "".join(serialize_history_entry(dict(row)) + "\n" for row in batch)
+            yield ndjson.encode("utf-8"), len(batch)
 
 
 @router.post("/{group_id}/messages", response_model=MessageRead, status_code=status.HTTP_202_ACCEPTED)
@@ -337,22 +885,42 @@ async def send_message(
     current_user: User = Depends(get_current_user),
 ):
     logger.info("send_message.start", group_id=str(group_id), user_id=str(current_user.id))
+    message_id = uuid.uuid4()
+    turn_id = uuid.uuid4()
     async with db() as session:
         try:
-            group = await get_group_and_authorize(group_id, session, current_user) # Verify group access
-
-            turn_id = uuid.uuid4()
-            user_message = Message(
-                group_id=group.id,
-                turn_id=turn_id,
-                sender_alias="User",
-                content=message_in.content,
+            await authorize_group(group_id, session, current_user) # Verify group access
+
+            # The message and the job that starts its turn commit together, so
+            # a turn can be neither lost nor started for a rolled-back message.
+            # The outbox relay enqueues the job; this request never waits on Redis.
+            inserted = await session.execute(
+                insert(Message)
+                .values(
+                    id=message_id,
+                    group_id=group_id,
+                    turn_id=turn_id,
+                    sender_alias="User",
+                    content=message_in.content,
+                )
+                .returning(Message.timestamp)
+            )
+            timestamp = inserted.scalar_one()
+            session.add(
+                OutboxEvent(
+                    job_name="start_turn",
+                    queue_name="orchestrator_queue",
+                    job_kwargs={
+                        "group_id": str(group_id),
+                        "message_content": message_in.content,
+                        "user_id": str(current_user.id),
+                        "message_id": str(message_id),
+                        "turn_id": str(turn_id),
+                    },
+                )
             )
-
-            session.add(user_message)
             await session.commit()
-            await session.refresh(user_message)
-            logger.info("send_message.saved_to_db", message_id=str(user_message.id))
+            logger.info("send_message.saved_to_db", message_id=str(message_id))
 
         except HTTPException:
             raise
@@ -362,26 +930,25 @@ async def send_message(
             logger.error("send_message.db_error", error=str(e), exc_info=True)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Database error: {e}")
 
-    for attempt in range(3):
-        try:
-            await arq_pool.enqueue_job(
-                "start_turn",
-                group_id=str(group_id),
-                message_content=message_in.content,
-                user_id=str(current_user.id),
-                message_id=str(user_message.id),
-                turn_id=str(turn_id),
-                _queue_name="orchestrator_queue",
-            )
-            logger.info("send_message.enqueued_to_orchestrator", group_id=str(group_id), message_id=str(user_message.id))
-            break
-        except Exception as e:
-            logger.error("send_message.enqueue_attempt_failed", attempt=attempt + 1, error=str(e))
-            if attempt == 2:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Failed to enqueue job for orchestrator after retries: {e}",
-                )
-            await asyncio.sleep(1)
-
-    return user_message
\ No newline at end of file
+    try:
+        await queue_turn(arq_pool, group_id, turn_id)
+    except Exception as e:
+        logger.warn("send_message.turn_status_write_failed", group_id=str(group_id), turn_id=str(turn_id), error=str(e))
+    notify_outbox()
+
+    user_message = {
+        "id": message_id,
+        "group_id": group_id,
+        "turn_id": turn_id,
+        "sender_alias": "User",
+        "content": message_in.content,
+        "timestamp": timestamp,
+        "parent_message_id": None,
+        "meta": None,
+    }
+    try:
+        await append_history_entries(arq_pool, group_id, [user_message])
+    except Exception as e:
+        logger.warn("send_message.history_cache_write_failed", group_id=str(group_id), error=str(e))
+
+    return user_message
@@ -62,6 +62,7 @@ async def list_llm_options():
                 provider_name="gemini",
                 models=[
                     ModelInfo(id="gemini-2.5-pro", name="Gemini 2.5 Pro"), # Corrected to 1.5, or use 2.5 if that's what you have access to
+                    ModelInfo(id="gemini-2.5-flash", name="Gemini 2.5 Flash"),
                     ModelInfo(id="gemini-1.5-pro-latest", name="Gemini 1.5 Pro Latest"),
                     ModelInfo(id="gemini-1.5-flash-latest", name="Gemini 1.5 Flash Latest"),
                     ModelInfo(id="gemini-1.0-pro", name="Gemini 1.0 Pro"),
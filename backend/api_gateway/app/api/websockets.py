@@ -1,65 +1,369 @@
 import asyncio
+import json
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
 import structlog
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, WebSocketException, HTTPException, Depends, status
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, WebSocketException, Depends, status
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
 from app.core.arq_client import get_arq_pool
+from app.core.authz import GroupAccess, check_group_access
 from app.core.security import get_user_from_token
+from shared.app.core.config import settings
+from shared.app.core.metrics import Counter, Gauge
 from shared.app.db import get_db_session
-from shared.app.models.chat import ChatGroup, User
+from shared.app.models.chat import User
+from shared.app.utils.event_stream import (
+    decode_stream_id,
+    group_stream_key,
+    normalize_stream_id,
+    parse_stream_id,
+    stream_entry_coalesce_key,
+    stream_entry_to_frame,
+)
 
 router = APIRouter()
 
 logger = structlog.get_logger(__name__)
 
+RESYNC_CLOSE_REASON = "slow_consumer:resync"
+REPLAY_BATCH_SIZE = 200
+STREAM_BLOCK_MS = 1000
 
-class ConnectionManager:
-    def __init__(self) -> None:
-        self.active_connections: dict[str, list[WebSocket]] = {}
+ws_connections = Gauge("synapse_ws_connections", "Open WebSocket connections.")
+ws_queued_frames = Gauge("synapse_ws_queued_frames", "Frames waiting in per-connection send queues.")
+ws_frames_sent = Counter("synapse_ws_frames_sent_total", "Frames written to WebSocket clients.")
+ws_frames_dropped = Counter(
+    "synapse_ws_frames_dropped_total", "Frames dropped because a send queue overflowed.", ["reason"]
+)
+ws_frames_coalesced = Counter(
+    "synapse_ws_frames_coalesced_total", "Queued frames replaced by a newer frame with the same key."
+)
+ws_slow_consumer_disconnects = Counter(
+    "synapse_ws_slow_consumer_disconnects_total", "Connections closed by the disconnect overflow policy."
+)
+ws_replayed_events = Counter("synapse_ws_replayed_events_total", "Events replayed from the group stream on reconnect.")
+ws_replay_gaps = Counter(
+    "synapse_ws_replay_gaps_total", "Reconnects whose last_event_id had already been trimmed from the stream."
+)
+ws_send_failures = Counter("synapse_ws_send_failures_total", "Sends that raised or timed out.", ["reason"])
 
-    async def connect(self, websocket: WebSocket, group_id: str):
-        await websocket.accept()
-        if group_id not in self.active_connections:
-            self.active_connections[group_id] = []
-        self.active_connections[group_id].append(websocket)
 
-    def disconnect(self, websocket: WebSocket, group_id: str):
-        if group_id in self.active_connections:
-            self.active_connections[group_id].remove(websocket)
+class ClientConnection:
+    """A WebSocket with its own bounded outbound queue and writer task.
+
+    Broadcasting only appends to the queue, so a slow client never delays
+    delivery to the other clients of the same group. Stream events are queued
+    as the bytes stored in Redis and sent as binary frames; control frames
+    built here are text.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        group_id: str,
+        max_queue_size: int,
+        policy: str,
+        send_timeout: float,
+    ) -> None:
+        self.websocket = websocket
+        self.group_id = group_id
+        self.max_queue_size = max_queue_size
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.queue: deque[tuple[str | None, str | bytes]] = deque()
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._writer_task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._writer_task = asyncio.create_task(self._writer())
+
+    def offer(self, message: str | bytes, coalesce_key: str | None = None) -> bool:
+        """Queues a frame without waiting. Returns False if it was not queued."""
+        if self.closed:
+            return False
+
+        if len(self.queue) >= self.max_queue_size and not self._make_room(coalesce_key):
+            return False
+
+        self.queue.append((coalesce_key, message))
+        ws_queued_frames.inc()
+        self._wakeup.set()
+        return True
+
+    def _make_room(self, coalesce_key: str | None) -> bool:
+        """Applies the slow-consumer policy to a full queue."""
+        if self.policy == "disconnect":
+            ws_slow_consumer_disconnects.inc()
+            ws_frames_dropped.inc(reason="disconnect")
+            logger.warn(
+                "websocket.slow_consumer_disconnect",
+                group_id=self.group_id,
+                queue_depth=len(self.queue),
+            )
+            self._close_for_resync()
+            return False
+
+        if self.policy == "coalesce" and coalesce_key is not None:
+            for idx, (queued_key, _) in enumerate(self.queue):
+                if queued_key == coalesce_key:
+                    # The newer frame supersedes the queued one; it is appended
+                    # by the caller so ordering follows the latest update.
+                    del self.queue[idx]
+                    ws_queued_frames.dec()
+                    ws_frames_coalesced.inc()
+                    return True
+
+        self.queue.popleft()
+        ws_queued_frames.dec()
+        ws_frames_dropped.inc(reason="drop_oldest")
+        return True
+
+    def _close_for_resync(self) -> None:
+        self.closed = True
+        ws_queued_frames.dec(len(self.queue))
+        self.queue.clear()
+        self._wakeup.set()
+        asyncio.create_task(self._safe_close(status.WS_1013_TRY_AGAIN_LATER, RESYNC_CLOSE_REASON))
 
-    async def broadcast_to_group(self, group_id: str, message: str) -> None:
-        for connection in self.active_connections.get(group_id, []):
+    async def _safe_close(self, code: int, reason: str | None = None) -> None:
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception as e:
+            logger.debug("websocket.close_failed", group_id=self.group_id, error=str(e))
+
+    async def _writer(self) -> None:
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                _, message = self.queue.popleft()
+                ws_queued_frames.dec()
+                send = self.websocket.send_bytes if isinstance(message, bytes) else self.websocket.send_text
+                await asyncio.wait_for(send(message), timeout=self.send_timeout)
+                ws_frames_sent.inc()
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            ws_send_failures.inc(reason="timeout")
+            logger.warn("websocket.send_timeout", group_id=self.group_id, timeout=self.send_timeout)
+            self.closed = True
+            await self._safe_close(status.WS_1013_TRY_AGAIN_LATER, RESYNC_CLOSE_REASON)
+        except (WebSocketDisconnect, RuntimeError) as e:
+            ws_send_failures.inc(reason="disconnected")
+            logger.info("websocket.send_failed_connection_closed", group_id=self.group_id, error=str(e))
+            self.closed = True
+        except Exception as e:
+            ws_send_failures.inc(reason="error")
+            logger.error("websocket.send_failed", group_id=self.group_id, error=str(e), exc_info=True)
+            self.closed = True
+
+    async def stop(self) -> None:
+        self.closed = True
+        ws_queued_frames.dec(len(self.queue))
+        self.queue.clear()
+        if self._writer_task and not self._writer_task.done():
+            self._writer_task.cancel()
             try:
-                await connection.send_text(message)
-            except RuntimeError:
-                # Connection might already be closed; ignore
+                await self._writer_task
+            except asyncio.CancelledError:
                 pass
 
 
-manager = ConnectionManager()
+class ConnectionManager:
+    def __init__(
+        self,
+        max_queue_size: int | None = None,
+        policy: str | None = None,
+        send_timeout: float | None = None,
+    ) -> None:
+        self.active_connections: dict[str, list[ClientConnection]] = {}
+        self.max_queue_size = max_queue_size or settings.WS_SEND_QUEUE_SIZE
+        self.policy = policy or settings.WS_SLOW_CONSUMER_POLICY
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT_SECONDS
+        self._listeners: dict[str, asyncio.Task] = {}
+        # Id of the last stream entry each group listener has broadcast.
+        self._stream_cursors: dict[str, str] = {}
+        # Serializes a group's listener setup, replays and teardown. A lock is
+        # dropped once nobody holds or waits for it.
+        self._group_locks: dict[str, asyncio.Lock] = {}
+        self._group_lock_users: dict[str, int] = {}
 
+    @asynccontextmanager
+    async def _group_lock(self, group_id: str):
+        lock = self._group_locks.setdefault(group_id, asyncio.Lock())
+        self._group_lock_users[group_id] = self._group_lock_users.get(group_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._group_lock_users[group_id] -= 1
+            if not self._group_lock_users[group_id]:
+                del self._group_lock_users[group_id]
+                del self._group_locks[group_id]
 
-async def redis_listener(redis: Redis, group_id: str):
-    """Listens to a Redis channel and broadcasts messages."""
-    channel = f"group:{group_id}"
-    try:
-        pubsub = redis.pubsub()
-        await pubsub.subscribe(channel)
+    async def connect(
+        self,
+        websocket: WebSocket,
+        group_id: str,
+        redis: Redis | None = None,
+        last_event_id: str | None = None,
+    ) -> ClientConnection:
+        await websocket.accept()
+        connection = ClientConnection(
+            websocket, group_id, self.max_queue_size, self.policy, self.send_timeout
+        )
+        connection.start()
+
+        if redis is None:
+            self._register(connection)
+            return connection
+
+        try:
+            async with self._group_lock(group_id):
+                try:
+                    # One stream reader per group feeds every local connection
+                    # of it; the last client leaving removes it.
+                    if group_id not in self._listeners:
+                        self._stream_cursors[group_id] = await _latest_event_id(redis, group_id)
+                        self._listeners[group_id] = asyncio.create_task(self._stream_listener(redis, group_id))
+                    if last_event_id:
+                        await self._replay(connection, redis, group_id, last_event_id)
+                    # No await between the end of the replay and registration, so the
+                    # listener cannot broadcast an event the replay has not covered.
+                    self._register(connection)
+                except Exception:
+                    if not self.active_connections.get(group_id):
+                        self._remove_group(group_id)
+                    raise
+        except Exception:
+            # Redis failed before the connection was registered: nothing else
+            # will stop its writer or close the accepted socket.
+            await connection.stop()
+            await connection._safe_close(status.WS_1011_INTERNAL_ERROR)
+            raise
+        return connection
+
+    def _register(self, connection: ClientConnection) -> None:
+        self.active_connections.setdefault(connection.group_id, []).append(connection)
+        ws_connections.inc()
+
+    async def _replay(self, connection: ClientConnection, redis: Redis, group_id: str, last_event_id: str) -> None:
+        """Queues every event after ``last_event_id`` that the group listener has already broadcast."""
+        key = group_stream_key(group_id)
+        try:
+            last_seen = parse_stream_id(last_event_id)
+        except ValueError:
+            logger.warn("websocket.replay_invalid_last_event_id", group_id=group_id, last_event_id=last_event_id)
+            return
+
+        if last_seen > (0, 0):
+            oldest = await redis.xrange(key, min="-", max="+", count=1)
+            if oldest and parse_stream_id(oldest[0][0]) > last_seen:
+                # The client's position was trimmed away: tell it to re-fetch history.
+                ws_replay_gaps.inc()
+                connection.offer(json.dumps({"type": "resync", "reason": "event_stream_trimmed"}))
+
+        cursor = normalize_stream_id(last_event_id)
+        replayed = 0
+        empty_reads = 0
         while True:
-            message = await pubsub.get_message(
-                ignore_subscribe_messages=True, timeout=1.0
-            )
-            if message:
-                await manager.broadcast_to_group(
-                    group_id, message["data"].decode("utf-8")
+            entries = await redis.xrange(key, min=f"({cursor}", max="+", count=REPLAY_BATCH_SIZE)
+            if not entries:
+                # Either fully caught up, or entries newer than the snapshot were
+                # broadcast meanwhile; re-read a few times before giving up so a
+                # deleted stream cannot spin this loop forever.
+                empty_reads += 1
+                if empty_reads > 3 or parse_stream_id(cursor) >= parse_stream_id(self._stream_cursors[group_id]):
+                    break
+                continue
+            live_cursor = parse_stream_id(self._stream_cursors[group_id])
+            caught_up = False
+            for entry_id, fields in entries:
+                if parse_stream_id(entry_id) > live_cursor:
+                    # The listener has not reached this entry yet and will deliver it live.
+                    caught_up = True
+                    break
+                connection.offer(stream_entry_to_frame(entry_id, fields), stream_entry_coalesce_key(fields))
+                cursor = decode_stream_id(entry_id)
+                replayed += 1
+            if caught_up or (len(entries) < REPLAY_BATCH_SIZE and parse_stream_id(cursor) >= live_cursor):
+                break
+
+        ws_replayed_events.inc(replayed)
+        logger.info("websocket.replayed_events", group_id=group_id, from_event_id=last_event_id, count=replayed)
+
+    async def _stream_listener(self, redis: Redis, group_id: str) -> None:
+        """Reads new entries from the group's event stream and broadcasts them."""
+        key = group_stream_key(group_id)
+        while True:
+            try:
+                response = await redis.xread(
+                    {key: self._stream_cursors[group_id]}, count=100, block=STREAM_BLOCK_MS
                 )
-            await asyncio.sleep(0.01)  # Prevent busy-waiting
-    except asyncio.CancelledError:
-        await pubsub.unsubscribe(channel)
-    except Exception as e:
-        await pubsub.unsubscribe(channel)
-        raise HTTPException(status_code=500, detail=f"Redis listener error: {e}")
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                logger.error("websocket.stream_listener_error", group_id=group_id, error=str(e), exc_info=True)
+                await asyncio.sleep(1)
+                continue
+
+            for _stream_name, entries in response or []:
+                for entry_id, fields in entries:
+                    event_id = decode_stream_id(entry_id)
+                    self._stream_cursors[group_id] = event_id
+                    try:
+                        frame = stream_entry_to_frame(entry_id, fields)
+                    except (ValueError, TypeError) as e:
+                        logger.error("websocket.malformed_stream_entry", group_id=group_id, event_id=event_id, error=str(e))
+                        continue
+                    self._fanout(group_id, frame, stream_entry_coalesce_key(fields))
+
+    async def disconnect(self, connection: ClientConnection) -> None:
+        group_id = connection.group_id
+        connections = self.active_connections.get(group_id, [])
+        if connection in connections:
+            connections.remove(connection)
+            ws_connections.dec()
+        await connection.stop()
+        if connections:
+            return
+        # Another client may be replaying under the lock and not registered yet.
+        async with self._group_lock(group_id):
+            if not self.active_connections.get(group_id):
+                self._remove_group(group_id)
+
+    def _remove_group(self, group_id: str) -> None:
+        """Stops the group's listener; the caller holds the group lock."""
+        self.active_connections.pop(group_id, None)
+        listener = self._listeners.pop(group_id, None)
+        if listener:
+            listener.cancel()
+        self._stream_cursors.pop(group_id, None)
+
+    def _fanout(self, group_id: str, message: str | bytes, coalesce_key: str | None = None) -> int:
+        delivered = 0
+        for connection in list(self.active_connections.get(group_id, [])):
+            if connection.offer(message, coalesce_key):
+                delivered += 1
+        return delivered
+
+    async def broadcast_to_group(self, group_id: str, message: str | bytes, coalesce_key: str | None = None) -> int:
+        """Queues a frame on every connection of the group; returns how many accepted it."""
+        return self._fanout(group_id, message, coalesce_key)
+
+
+async def _latest_event_id(redis: Redis, group_id: str) -> str:
+    newest = await redis.xrevrange(group_stream_key(group_id), max="+", min="-", count=1)
+    return decode_stream_id(newest[0][0]) if newest else "0-0"
+
+
+manager = ConnectionManager()
 
 
 @router.websocket("/ws/{group_id}")
@@ -69,7 +373,16 @@ async def websocket_endpoint(
     redis: Redis = Depends(get_arq_pool),
     db: async_sessionmaker = Depends(get_db_session),
 ):
-    """WebSocket endpoint for streaming chat events to authorized clients."""
+    """
+    WebSocket endpoint for streaming chat events to authorized clients.
+
+    Message events are binary frames holding UTF-8 JSON in the slim envelope
+    of ``message_event``; full metadata is fetched on demand from
+    ``GET /groups/{group_id}/messages/{message_id}``. Every event frame
+    carries the ``event_id`` of its entry in the group's event stream. A reconnecting client passes the last one it saw as the
+    ``last_event_id`` query parameter (or ``Last-Event-ID`` header) and first
+    receives everything it missed, straight from Redis, before live events.
+    """
 
     token = websocket.query_params.get("token")
     if token is None:
@@ -87,17 +400,25 @@ async def websocket_endpoint(
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
+    try:
+        group_uuid = uuid.UUID(group_id)
+    except ValueError:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     async with db() as session:
-        group = await session.get(ChatGroup, group_id)
-        if not group or group.owner_id != current_user.id:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
+        access = await check_group_access(group_uuid, current_user.id, session)
+    if access is not GroupAccess.ALLOWED:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    last_event_id = websocket.query_params.get("last_event_id") or websocket.headers.get("Last-Event-ID")
 
     try:
-        await manager.connect(websocket, group_id)
+        connection = await manager.connect(websocket, group_id, redis, last_event_id=last_event_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to establish WebSocket: {e}")
-    listener_task = asyncio.create_task(redis_listener(redis, group_id))
+        # The socket was accepted and is already closed with 1011.
+        logger.error("websocket.connect_failed", group_id=group_id, error=str(e), exc_info=True)
+        return
     logger.info("websocket.connected", user=current_user.email, group_id=group_id)
 
     try:
@@ -106,5 +427,4 @@ async def websocket_endpoint(
     except WebSocketDisconnect:
         logger.info("websocket.disconnected", user=current_user.email)
     finally:
-        listener_task.cancel()
-        manager.disconnect(websocket, group_id)
+        await manager.disconnect(connection)
@@ -4,6 +4,7 @@ from arq import create_pool, ArqRedis
 from arq.connections import RedisSettings
 
 from shared.app.core.config import settings
+from shared.app.core.job_stream import with_job_streams
 
 REDIS_URL = settings.REDIS_URL
 if not REDIS_URL:
@@ -19,10 +20,13 @@ ARQ_REDIS_SETTINGS = RedisSettings(host=parsed.hostname, port=parsed.port)
 _arq_pool: ArqRedis | None = None
 
 async def init_arq_pool() -> ArqRedis:
-    """Create the ARQ Redis pool if it doesn't already exist."""
+    """
+    Create the ARQ Redis pool if it doesn't already exist. With
+    JOB_TRANSPORT="stream" it enqueues immediate jobs through Redis Streams.
+    """
     global _arq_pool
     if _arq_pool is None:
-        _arq_pool = await create_pool(ARQ_REDIS_SETTINGS)
+        _arq_pool = with_job_streams(await create_pool(ARQ_REDIS_SETTINGS))
     return _arq_pool
 
 
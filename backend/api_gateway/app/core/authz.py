@@ -0,0 +1,163 @@
+import asyncio
+import enum
+import uuid
+
+import structlog
+from fastapi import HTTPException, status
+from redis.asyncio import Redis
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from shared.app.core.config import settings
+from shared.app.core.metrics import Counter
+from shared.app.models.chat import ChatGroup, User
+from .cache import TTLCache
+
+logger = structlog.get_logger(__name__)
+
+
+class GroupAccess(enum.Enum):
+    ALLOWED = "allowed"
+    FORBIDDEN = "forbidden"
+    NOT_FOUND = "not_found"
+
+
+# (group_id, user_id) -> GroupAccess. Denials are cached too, so repeated
+# probes of a foreign or missing group do not reach Postgres either.
+_access_cache = TTLCache(maxsize=settings.AUTHZ_CACHE_MAX_ENTRIES, ttl=settings.AUTHZ_CACHE_TTL_SECONDS)
+
+authz_cache_hits = Counter("synapse_authz_cache_hits_total", "Group authorization checks served from the cache.", ["decision"])
+authz_cache_misses = Counter("synapse_authz_cache_misses_total", "Group authorization checks that queried Postgres.")
+
+
+def _cache_key(group_id: uuid.UUID | str, user_id: uuid.UUID | str) -> tuple[str, str]:
+    return str(group_id), str(user_id)
+
+
+def invalidate_group_access(group_id: uuid.UUID | str) -> None:
+    """Forgets every cached decision about ``group_id``."""
+    group_key = str(group_id)
+    _access_cache.discard_where(lambda key: key[0] == group_key)
+
+
+def clear_access_cache() -> None:
+    _access_cache.clear()
+
+
+# Group changes are published here once committed, so that every gateway
+# process drops its cached decisions, not only the one that made the change.
+INVALIDATION_CHANNEL = "synapse:authz:invalidate"
+_CHANGED_GROUPS = "authz_changed_groups"
+_redis: Redis | None = None
+_listener: asyncio.Task | None = None
+
+
+@event.listens_for(ChatGroup, "after_update")
+@event.listens_for(ChatGroup, "after_delete")
+def _invalidate_changed_group(mapper, connection, target: ChatGroup) -> None:
+    # Any update may be an ownership change; group updates are rare enough
+    # that distinguishing them is not worth it.
+    invalidate_group_access(target.id)
+    if (session := object_session(target)) is not None:
+        session.info.setdefault(_CHANGED_GROUPS, set()).add(str(target.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changed_groups(session: Session) -> None:
+    group_ids = session.info.pop(_CHANGED_GROUPS, None)
+    if group_ids and _redis is not None:
+        asyncio.get_running_loop().create_task(_publish(_redis, group_ids))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_groups(session: Session) -> None:
+    session.info.pop(_CHANGED_GROUPS, None)
+
+
+async def _publish(redis: Redis, group_ids: set[str]) -> None:
+    try:
+        for group_id in group_ids:
+            await redis.publish(INVALIDATION_CHANNEL, group_id)
+    except Exception as e:
+        # The other processes then hold the stale decision until it expires.
+        logger.warn("authz.invalidation_publish_failed", error=str(e))
+
+
+async def _listen(redis: Redis) -> None:
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        invalidate_group_access(message["data"].decode("utf-8"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warn("authz.invalidation_listener_failed", error=str(e))
+            # Messages published meanwhile are lost: start over from scratch.
+            clear_access_cache()
+            await asyncio.sleep(1.0)
+
+
+def start_access_invalidation(redis: Redis) -> None:
+    """Publishes this process's group changes and applies everyone else's."""
+    global _redis, _listener
+    _redis = redis
+    if _listener is None:
+        _listener = asyncio.create_task(_listen(redis))
+
+
+async def stop_access_invalidation() -> None:
+    global _redis, _listener
+    _redis = None
+    if _listener is not None:
+        _listener.cancel()
+        await asyncio.gather(_listener, return_exceptions=True)
+        _listener = None
+
+
+def record_group_access(group_id: uuid.UUID, user_id: uuid.UUID, owner_id: uuid.UUID | None) -> GroupAccess:
+    if owner_id is None:
+        access = GroupAccess.NOT_FOUND
+    elif owner_id == user_id:
+        access = GroupAccess.ALLOWED
+    else:
+        access = GroupAccess.FORBIDDEN
+    _access_cache.set(_cache_key(group_id, user_id), access)
+    return access
+
+
+def cached_group_access(group_id: uuid.UUID, user_id: uuid.UUID) -> GroupAccess | None:
+    access = _access_cache.get(_cache_key(group_id, user_id))
+    if access is not None:
+        authz_cache_hits.inc(decision=access.value)
+    return access
+
+
+async def check_group_access(group_id: uuid.UUID, user_id: uuid.UUID, session: AsyncSession) -> GroupAccess:
+    """Decides whether ``user_id`` may access ``group_id`` without loading the ORM entity."""
+    access = cached_group_access(group_id, user_id)
+    if access is not None:
+        return access
+    authz_cache_misses.inc()
+    owner_id = (await session.execute(select(ChatGroup.owner_id).where(ChatGroup.id == group_id))).scalar_one_or_none()
+    return record_group_access(group_id, user_id, owner_id)
+
+
+def raise_for_access(access: GroupAccess, group_id: uuid.UUID, current_user: User) -> None:
+    if access is GroupAccess.NOT_FOUND:
+        logger.warn("authorize_group.not_found", group_id=str(group_id))
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
+    if access is GroupAccess.FORBIDDEN:
+        logger.warn("authorize_group.forbidden", group_id=str(group_id), current_user_id=str(current_user.id))
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this group")
+
+
+async def authorize_group(group_id: uuid.UUID, session: AsyncSession, current_user: User) -> None:
+    """
+    Raises 404/403 unless ``current_user`` owns the group. For handlers that
+    need only the check and not the `ChatGroup` itself.
+    """
+    raise_for_access(await check_group_access(group_id, current_user.id, session), group_id, current_user)
@@ -0,0 +1,164 @@
+import asyncio
+
+import structlog
+from arq import ArqRedis
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from shared.app.core.config import settings
+from shared.app.core.metrics import Counter, Gauge
+from shared.app.db import AsyncSessionLocal
+from shared.app.models.outbox import OutboxEvent
+
+logger = structlog.get_logger(__name__)
+
+outbox_enqueued = Counter("synapse_outbox_enqueued_total", "Outbox rows handed to arq.", ["job"])
+outbox_enqueue_failures = Counter("synapse_outbox_enqueue_failures_total", "Outbox rows whose enqueue attempt failed.", ["job"])
+outbox_pending = Gauge("synapse_outbox_pending", "Outbox rows waiting to be enqueued at the end of the last relay pass.")
+
+
+def outbox_job_id(event_id: int) -> str:
+    """
+    arq job id for an outbox row. arq refuses a second job with the same id, so
+    a row that is relayed twice (the process died between the enqueue and the
+    delete) still produces a single job.
+    """
+    return f"outbox:{event_id}"
+
+
+class OutboxRelay:
+    """Moves committed `OutboxEvent` rows into arq, in id order and in batches."""
+
+    def __init__(
+        self,
+        arq_pool: ArqRedis,
+        sessionmaker: async_sessionmaker = AsyncSessionLocal,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL_SECONDS,
+    ) -> None:
+        self.arq_pool = arq_pool
+        self.sessionmaker = sessionmaker
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def notify(self) -> None:
+        """Called after a commit that wrote outbox rows; never blocks."""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                # Drain everything that is pending, one batch at a time. A batch
+                # with failures ends the drain, so an unavailable Redis is
+                # retried at the poll interval rather than in a tight loop.
+                while await self.relay_once() == self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("outbox_relay.pass_failed", error=str(e), exc_info=True)
+
+    async def relay_once(self) -> int:
+        """Relays one batch and returns the number of rows arq accepted."""
+        async with self.sessionmaker() as session:
+            # SKIP LOCKED lets several gateway processes relay concurrently
+            # without handing the same row to arq twice.
+            result = await session.execute(
+                select(OutboxEvent)
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            events = result.scalars().all()
+            if not events:
+                outbox_pending.set(0)
+                return 0
+
+            outcomes = await asyncio.gather(
+                *(
+                    self.arq_pool.enqueue_job(
+                        event.job_name,
+                        _job_id=outbox_job_id(event.id),
+                        _queue_name=event.queue_name,
+                        **event.job_kwargs,
+                    )
+                    for event in events
+                ),
+                return_exceptions=True,
+            )
+
+            delivered, failed = [], []
+            for event, outcome in zip(events, outcomes):
+                if isinstance(outcome, Exception):
+                    failed.append((event, outcome))
+                    outbox_enqueue_failures.inc(job=event.job_name)
+                else:
+                    # None means arq already holds a job with this id.
+                    delivered.append(event.id)
+                    outbox_enqueued.inc(job=event.job_name)
+
+            if delivered:
+                await session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(delivered)))
+            for event, error in failed:
+                await session.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id == event.id)
+                    .values(attempts=OutboxEvent.attempts + 1, last_error=str(error)[:1000])
+                )
+            await session.commit()
+
+            if failed:
+                logger.warn("outbox_relay.enqueue_failed", failed=len(failed), delivered=len(delivered), error=str(failed[0][1]))
+            logger.debug("outbox_relay.batch_relayed", delivered=len(delivered), failed=len(failed))
+
+            if len(events) < self.batch_size:
+                outbox_pending.set(len(failed))
+            else:
+                outbox_pending.set(
+                    (await session.execute(select(func.count()).select_from(OutboxEvent))).scalar_one()
+                )
+            return len(delivered)
+
+
+_relay: OutboxRelay | None = None
+
+
+def start_outbox_relay(arq_pool: ArqRedis) -> OutboxRelay:
+    global _relay
+    if _relay is None:
+        _relay = OutboxRelay(arq_pool)
+        _relay.start()
+    return _relay
+
+
+async def stop_outbox_relay() -> None:
+    global _relay
+    if _relay is not None:
+        await _relay.stop()
+        _relay = None
+
+
+def notify_outbox() -> None:
+    """Wakes the relay of this process, if running, to pick up new rows now."""
+    if _relay is not None:
+        _relay.notify()
@@ -1,21 +1,70 @@
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.exceptions import WebSocketException
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select
 
 from shared.app.core.config import settings
+from shared.app.core.metrics import Counter, Gauge, Histogram
 from shared.app.db import get_db_session
 from shared.app.models.chat import User
+from .cache import TTLCache
 
 # Reusable OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+def build_password_context() -> CryptContext:
+    """bcrypt at BCRYPT_ROUNDS; `needs_update` flags hashes made with any other cost."""
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = build_password_context()
+
+# bcrypt is deliberately slow (~100ms+ per call), so it runs in its own bounded
+# pool instead of on the event loop or the default executor.
+_password_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_password_slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+
+password_hash_queue_depth = Gauge("synapse_password_hash_queue_depth", "Password operations waiting for a bcrypt worker.")
+password_hash_in_progress = Gauge("synapse_password_hash_in_progress", "Password operations running on a bcrypt worker.")
+password_hash_wait_seconds = Histogram("synapse_password_hash_wait_seconds", "Time password operations spent queued for a worker.")
+password_hash_duration_seconds = Histogram(
+    "synapse_password_hash_duration_seconds", "Time spent hashing or verifying a password.", ["op"]
+)
+password_hash_rejected = Counter(
+    "synapse_password_hash_rejected_total", "Password operations rejected because the queue was full."
+)
+password_rehashes = Counter("synapse_password_rehashes_total", "Stored hashes upgraded to current parameters on login.")
+
+# Verified token -> user id, and user id -> column values of the User row.
+# Both are bounded, short-lived and local to this process.
+_token_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAX_ENTRIES, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+_user_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAX_ENTRIES, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+_USER_COLUMNS = ("id", "email", "hashed_password")
+
+auth_cache_hits = Counter("synapse_auth_cache_hits_total", "Authentication lookups served from the in-process cache.", ["cache"])
+auth_cache_misses = Counter("synapse_auth_cache_misses_total", "Authentication lookups that had to decode a token or query Postgres.", ["cache"])
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target: User) -> None:
+    _user_cache.pop(str(target.id))
+
+
+def clear_auth_caches() -> None:
+    _token_cache.clear()
+    _user_cache.clear()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -23,6 +72,50 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def _run_password_op(op: str, fn, *args):
+    if password_hash_queue_depth.value() >= settings.PASSWORD_HASH_MAX_QUEUE:
+        password_hash_rejected.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+
+    enqueued_at = time.perf_counter()
+    password_hash_queue_depth.inc()
+    try:
+        await _password_slots.acquire()
+    finally:
+        password_hash_queue_depth.dec()
+    try:
+        started_at = time.perf_counter()
+        password_hash_wait_seconds.observe(started_at - enqueued_at)
+        password_hash_in_progress.inc()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, fn, *args)
+    finally:
+        password_hash_in_progress.dec()
+        password_hash_duration_seconds.observe(time.perf_counter() - started_at, op=op)
+        _password_slots.release()
+
+
+async def hash_password(password: str) -> str:
+    """Async `get_password_hash` that keeps bcrypt off the event loop."""
+    return await _run_password_op("hash", pwd_context.hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str | None) -> tuple[bool, str | None]:
+    """
+    Verifies a password off the event loop. Returns ``(valid, new_hash)``, where
+    ``new_hash`` is set when the stored hash uses outdated parameters and should
+    be replaced. With no stored hash (unknown user) a dummy verification still
+    runs, so response timing does not reveal whether the account exists.
+    """
+    if hashed_password is None:
+        await _run_password_op("verify", pwd_context.dummy_verify)
+        return False, None
+    return await _run_password_op("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -30,32 +123,70 @@ def create_access_token(data: dict) -> str:
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+
+def _verify_token(token: str) -> str | None:
+    """Returns the token's subject, or None if the token is invalid or expired."""
+    user_id = _token_cache.get(token)
+    if user_id is not None:
+        auth_cache_hits.inc(cache="token")
+        return user_id
+    auth_cache_misses.inc(cache="token")
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    user_id = payload.get("sub")
+    if not user_id:
+        return None
+    # Never keep a token cached past its own expiry.
+    exp = payload.get("exp")
+    ttl = exp - time.time() if exp is not None else None
+    _token_cache.set(token, user_id, ttl=ttl)
+    return user_id
+
+
+async def _load_user(user_id: str, db: async_sessionmaker) -> User | None:
+    values = _user_cache.get(user_id)
+    if values is not None:
+        auth_cache_hits.inc(cache="user")
+        # A fresh transient instance per request, so no caller can mutate the cached record.
+        return User(**values)
+    auth_cache_misses.inc(cache="user")
+
+    try:
+        user_pk = uuid.UUID(user_id)
+    except ValueError:
+        return None
+    async with db() as session:
+        user = await session.get(User, user_pk)
+        if user is None:
+            return None
+        _user_cache.set(user_id, {column: getattr(user, column) for column in _USER_COLUMNS})
+        return user
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db_session)
 ) -> User:
     """
     Dependency to get the current user from a JWT token.
-    Performs validation and fetches the user from the database.
+    Performs validation and fetches the user, from the auth cache when possible.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    user_id = _verify_token(token)
+    if user_id is None:
         raise credentials_exception
 
-    async with db() as session:
-        user = await session.get(User, user_id)
-        if user is None:
-            raise credentials_exception
-        return user
+    user = await _load_user(user_id, db)
+    if user is None:
+        raise credentials_exception
+    return user
 
 
 async def get_user_from_token(token: str, db: async_sessionmaker) -> User:
@@ -65,16 +196,11 @@ async def get_user_from_token(token: str, db: async_sessionmaker) -> User:
     for WebSocket authentication where dependency injection isn't available.
     """
     credentials_exception = WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str | None = payload.get("sub")
-        if not user_id:
-            raise credentials_exception
-    except JWTError:
+    user_id = _verify_token(token)
+    if not user_id:
         raise credentials_exception
 
-    async with db() as session:
-        user = await session.get(User, user_id)
-        if user is None:
-            raise credentials_exception
-        return user
+    user = await _load_user(user_id, db)
+    if user is None:
+        raise credentials_exception
+    return user
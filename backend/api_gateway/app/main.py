@@ -1,10 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from app.api.routers import auth, groups
 from app.api.routers import system # Import the new system router
 from app.api import websockets
 from app.core.arq_client import init_arq_pool, close_arq_pool
+from app.core.authz import start_access_invalidation, stop_access_invalidation
+from app.core.outbox_relay import start_outbox_relay, stop_outbox_relay
 from shared.app.core.logging import setup_logging
+from shared.app.core.metrics import REGISTRY
 
 setup_logging()
 
@@ -16,15 +20,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["X-Next-Cursor"],  # History pagination cursor
 )
 
 @app.on_event("startup")
 async def on_startup() -> None:
-    await init_arq_pool()
+    arq_pool = await init_arq_pool()
+    start_outbox_relay(arq_pool)
+    start_access_invalidation(arq_pool)
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    await stop_outbox_relay()
+    await stop_access_invalidation()
     await close_arq_pool()
 
 
@@ -38,4 +47,10 @@ app.include_router(
 
 @app.get("/health", tags=["Status"])
 def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/metrics", tags=["Status"], response_class=PlainTextResponse)
+def metrics():
+    """Exposes gateway metrics in the Prometheus text format."""
+    return REGISTRY.render()
@@ -7,11 +7,15 @@ from langchain_core.messages import ToolMessage, SystemMessage, BaseMessage
 import structlog
 
 from shared.app.core.config import settings
+from shared.app.core.job_stream import start_job_stream_consumer
 from shared.app.core.logging import setup_logging
+from shared.app.core.metrics import start_metrics_server
 from shared.app.agents.tools import TOOL_REGISTRY
 from shared.app.agents.runner import run_agent
 from shared.app.schemas.groups import GroupMemberRead
 from shared.app.utils.message_serde import deserialize_messages
+from shared.app.utils.speculation import SpeculativeDispatch, complete_speculation, start_speculation
+from shared.app.utils.turn_status import is_turn_cancelled
 
 setup_logging()
 logger = structlog.get_logger(__name__)
@@ -24,6 +28,7 @@ async def run_tool(
     thread_id: str,
     tool_call_id: str,
     gathering_id: str | None = None, # Expected to be None
+    turn_id: str | None = None,
 ):
     arq_pool: ArqRedis = ctx["redis"]
     logger.info(
@@ -35,6 +40,10 @@ async def run_tool(
         gathering_id=gathering_id 
     )
 
+    if await is_turn_cancelled(arq_pool, turn_id):
+        logger.info("run_tool.turn_cancelled", tool_name=tool_name, thread_id=thread_id, turn_id=turn_id)
+        return
+
     tool_function = TOOL_REGISTRY.get(tool_name)
     tool_run_result_content: str
 
@@ -92,6 +101,8 @@ async def run_tool(
         thread_id=thread_id,
         message_dict=serialized_message_dict,
         gathering_id=gathering_id, 
+        turn_id=turn_id,
+        alias=tool_name,
         _queue_name="orchestrator_queue",
     )
     logger.info(
@@ -107,14 +118,29 @@ async def run_agent_llm(
     group_members_dict: list,
     thread_id: str,
     gathering_id: str | None = None,
+    turn_id: str | None = None,
+    speculation_id: str | None = None,
 ):
     arq_pool: ArqRedis = ctx["redis"]
     logger.info(
         "run_agent_llm.entry",
-        alias=alias, thread_id=thread_id, gathering_id=gathering_id,
+        alias=alias, thread_id=thread_id, gathering_id=gathering_id, speculation_id=speculation_id,
         num_messages_received=len(messages_dict),
         num_group_members_received=len(group_members_dict)
     )
+    if await is_turn_cancelled(arq_pool, turn_id):
+        # Queued before the cancellation; skip the paid LLM call entirely.
+        logger.info("run_agent_llm.turn_cancelled", alias=alias, thread_id=thread_id, turn_id=turn_id)
+        return
+    if speculation_id and not await start_speculation(arq_pool, speculation_id):
+        logger.info("run_agent_llm.speculation_discarded", alias=alias, thread_id=thread_id, speculation_id=speculation_id)
+        return
+    speculation = None
+    if alias == "Orchestrator" and settings.SPECULATIVE_DISPATCH_ENABLED and turn_id:
+        speculation = SpeculativeDispatch(
+            arq_pool, thread_id=thread_id, turn_id=turn_id,
+            messages_dict=messages_dict, group_members_dict=group_members_dict,
+        )
     logger.debug("run_agent_llm.received_messages_dict_preview", alias=alias, thread_id=thread_id, messages_preview=[str(m)[:100]+"..." for m in messages_dict[:3]])
     logger.debug("run_agent_llm.received_group_members_dict_preview", alias=alias, thread_id=thread_id, member_aliases=[gm.get('alias') for gm in group_members_dict])
 
@@ -126,7 +152,10 @@ async def run_agent_llm(
         deserialized_group_members: list[GroupMemberRead] = [GroupMemberRead.model_validate(gm) for gm in group_members_dict]
         logger.debug("run_agent_llm.deserialized_group_members_for_agent", alias=alias, thread_id=thread_id, count=len(deserialized_group_members), member_aliases=[gm.alias for gm in deserialized_group_members])
 
-        agent_response_message = await run_agent(deserialized_messages, deserialized_group_members, alias)
+        agent_response_message = await run_agent(
+            deserialized_messages, deserialized_group_members, alias,
+            on_text=speculation.on_text if speculation is not None else None,
+        )
     
     except Exception as e: # Catch errors during deserialization or if run_agent itself raises an unexpected one
         logger.error("run_agent_llm.agent_execution_pipeline_error", alias=alias, thread_id=thread_id, error=str(e), exc_info=True)
@@ -149,14 +178,28 @@ async def run_agent_llm(
         response_content_snippet=str(agent_response_message.content)[:100]+"..."
     )
 
+    if speculation is not None and (confirmed := await speculation.finish(agent_response_message)):
+        # The dispatcher adopts these instead of starting the agents again.
+        agent_response_message.additional_kwargs["speculations"] = confirmed
+
     serialized_response_dict = dumpd(agent_response_message)
     logger.debug("run_agent_llm.serialized_agent_response_dict_preview", alias=alias, thread_id=thread_id, preview=str(serialized_response_dict)[:200]+"...")
 
+    if speculation_id:
+        # Held back until the dispatcher adopts it, if it ever does.
+        await complete_speculation(
+            arq_pool, speculation_id, serialized_response_dict, group_id=thread_id, turn_id=turn_id
+        )
+        logger.info("run_agent_llm.speculation_completed", alias=alias, thread_id=thread_id, speculation_id=speculation_id)
+        return
+
     await arq_pool.enqueue_job(
         "process_worker_result",
         thread_id=thread_id,
         message_dict=serialized_response_dict,
         gathering_id=gathering_id,
+        turn_id=turn_id,
+        alias=alias,
         _queue_name="orchestrator_queue",
     )
     logger.info(
@@ -169,9 +212,25 @@ class WorkerSettings:
     functions = [run_tool, run_agent_llm]
     queue_name = "execution_queue"
     redis_settings = RedisSettings.from_dsn(settings.REDIS_URL)
+    # Lets `cancel_turn` abort jobs of a cancelled turn: queued ones never
+    # start and running ones have their task (and its LLM or tool call)
+    # cancelled.
+    allow_abort_jobs = True
 
     async def on_startup(ctx):
         logger.info("execution_worker.startup", redis_host=str(WorkerSettings.redis_settings.host), queue_name=WorkerSettings.queue_name, functions_registered=len(WorkerSettings.functions))
+        if settings.WORKER_METRICS_PORT:
+            # Orchestrator cascade metrics and anything else the runs record.
+            ctx["metrics_server"] = await start_metrics_server(settings.WORKER_METRICS_PORT)
+            logger.info("execution_worker.metrics_server_started", port=settings.WORKER_METRICS_PORT)
+        # With JOB_TRANSPORT="stream", jobs are pushed to this worker instead
+        # of being polled; arq still runs anything left on its queue.
+        ctx["job_stream_consumer"] = await start_job_stream_consumer(ctx, WorkerSettings.queue_name, WorkerSettings.functions)
 
     async def on_shutdown(ctx):
+        if consumer := ctx.get("job_stream_consumer"):
+            await consumer.close()
+        if metrics_server := ctx.get("metrics_server"):
+            metrics_server.close()
+            await metrics_server.wait_closed()
         logger.info("execution_worker.shutdown", queue_name=WorkerSettings.queue_name)
\ No newline at end of file
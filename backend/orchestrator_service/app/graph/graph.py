@@ -18,8 +18,10 @@ def should_dispatch_or_end(state: GraphState) -> str:
     A conditional edge that decides whether to dispatch a worker or end the flow.
     """
     last_message = state["messages"][-1]
-    # If the router decided on next_actors or the last message has tool_calls, dispatch.
-    if state.get("next_actors") or getattr(last_message, 'tool_calls', None):
+    # If the router decided on next_actors or the last message has tool_calls, dispatch,
+    # unless the router stopped the turn.
+    tool_calls = getattr(last_message, 'tool_calls', None) and not state.get("stop_reason")
+    if state.get("next_actors") or tool_calls:
         return "dispatcher"
     # Otherwise, there's nothing to do, so sync and end.
     else:
@@ -35,9 +37,23 @@ workflow.add_conditional_edges(
     }
 )
 
-# After dispatching a job, the graph's current turn is over. It must END.
+def should_route_or_end(state: GraphState) -> str:
+    """
+    After the dispatcher: if it ran every pending tool call inline, their
+    results go straight back to the router. Otherwise jobs were dispatched
+    and the run ENDs until their results arrive.
+    """
+    return "router" if state.get("inline_tool_results") else END
+
 # The checkpointer will save the state before the graph execution finishes.
-workflow.add_edge("dispatcher", END)
+workflow.add_conditional_edges(
+    "dispatcher",
+    should_route_or_end,
+    {
+        "router": "router",
+        END: END
+    }
+)
 
 # The sync node is also a terminal state.
 workflow.add_edge("sync_to_postgres", END)
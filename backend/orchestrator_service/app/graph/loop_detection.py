@@ -0,0 +1,110 @@
+"""
+Detects agents going round in circles within a turn.
+
+Every agent message of the current turn is fingerprinted as the set of
+hashed word shingles of its normalized content plus its tool calls. The
+fingerprints are rebuilt from the state on each routing pass, as a turn
+holds at most a few dozen messages. Two signals end a turn early:
+
+* repetition: the latest message is a near copy (Jaccard similarity of the
+  fingerprints at least LOOP_SIMILARITY_THRESHOLD) of LOOP_MAX_REPEATS or
+  more earlier messages of the same sender. A ping-pong between the
+  Orchestrator and an agent repeats both sides, so it trips this as well.
+* stagnation: each of the last LOOP_STAGNATION_WINDOW messages contributed
+  less than LOOP_MIN_NOVELTY of shingles not seen earlier in the turn.
+"""
+import hashlib
+import json
+import re
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+from shared.app.core.config import settings
+
+_WORD_REGEX = re.compile(r"\w+")
+
+
+def _hash(text: str) -> int:
+    # Deterministic across processes, unlike the salted built-in hash().
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def message_fingerprint(message: BaseMessage, shingle_size: int) -> frozenset[int]:
+    """Hashed word shingles of the message content and tool calls."""
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content, default=str)
+    parts = [content]
+    for call in getattr(message, "tool_calls", None) or []:
+        parts.append(f"{call.get('name')} {json.dumps(call.get('args'), sort_keys=True, default=str)}")
+    words = _WORD_REGEX.findall(" ".join(parts).lower())
+    if not words:
+        return frozenset()
+    if len(words) <= shingle_size:
+        return frozenset({_hash(" ".join(words))})
+    return frozenset(_hash(" ".join(words[i:i + shingle_size])) for i in range(len(words) - shingle_size + 1))
+
+
+def jaccard(a: frozenset[int], b: frozenset[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def current_turn_agent_messages(messages: list[BaseMessage]) -> list[AIMessage]:
+    """Agent messages after the latest user message."""
+    start = 0
+    for index in range(len(messages) - 1, -1, -1):
+        if getattr(messages[index], "name", None) == "User":
+            start = index + 1
+            break
+    return [m for m in messages[start:] if isinstance(m, AIMessage)]
+
+
+def detect_loop(
+    messages: list[BaseMessage],
+    *,
+    shingle_size: int | None = None,
+    similarity_threshold: float | None = None,
+    max_repeats: int | None = None,
+    stagnation_window: int | None = None,
+    min_novelty: float | None = None,
+) -> str | None:
+    """
+    Returns why the current turn looks stuck, or None. Only evaluated when
+    the latest message is from an agent; thresholds default to the settings.
+    """
+    shingle_size = shingle_size or settings.LOOP_SHINGLE_SIZE
+    similarity_threshold = settings.LOOP_SIMILARITY_THRESHOLD if similarity_threshold is None else similarity_threshold
+    max_repeats = settings.LOOP_MAX_REPEATS if max_repeats is None else max_repeats
+    stagnation_window = settings.LOOP_STAGNATION_WINDOW if stagnation_window is None else stagnation_window
+    min_novelty = settings.LOOP_MIN_NOVELTY if min_novelty is None else min_novelty
+
+    if not messages or not isinstance(messages[-1], AIMessage):
+        return None
+    agent_messages = current_turn_agent_messages(messages)
+    fingerprints = [message_fingerprint(m, shingle_size) for m in agent_messages]
+
+    if max_repeats > 0:
+        last, sender = fingerprints[-1], agent_messages[-1].name
+        repeats = [
+            score for message, fingerprint in zip(agent_messages[:-1], fingerprints[:-1])
+            if message.name == sender and (score := jaccard(last, fingerprint)) >= similarity_threshold
+        ]
+        if len(repeats) >= max_repeats:
+            return (
+                f"repetition: {sender} sent a near-identical message {len(repeats) + 1} times "
+                f"(similarity >= {min(repeats):.2f})"
+            )
+
+    if stagnation_window > 0 and len(fingerprints) > stagnation_window:
+        seen: set[int] = set()
+        novelties = []
+        for fingerprint in fingerprints:
+            novelties.append(len(fingerprint - seen) / len(fingerprint) if fingerprint else 0.0)
+            seen |= fingerprint
+        recent = novelties[-stagnation_window:]
+        if max(recent) < min_novelty:
+            return (
+                f"stagnation: the last {stagnation_window} messages added at most "
+                f"{max(recent):.0%} new content (threshold {min_novelty:.0%})"
+            )
+    return None
@@ -1,16 +1,24 @@
-import json
+import asyncio
 import uuid
-from datetime import datetime, timezone
+from langchain_core.messages import ToolMessage
 from redis.asyncio import Redis
 from .state import GraphState
-from shared.app.utils.message_serde import serialize_messages
+from shared.app.agents.tools import INLINE, TOOL_REGISTRY, tool_execution_class
+from shared.app.core.metrics import Counter
+from shared.app.utils.message_serde import compact_message_meta, serialize_messages
+from shared.app.utils.event_stream import append_group_event, encode_event, group_stream_key, message_event
+from shared.app.utils.history_cache import append_history_entries
+from shared.app.utils.speculation import adopt_speculation, discard_speculations
+from shared.app.utils.turn_queue import release_group_turn
+from shared.app.utils.turn_status import is_turn_cancelled, register_turn_jobs, set_turn_status
+from shared.app.utils.usage import exhausted_budget, message_usage, record_orchestrator_call_saved, record_usage
 from shared.app.db import AsyncSessionLocal
 from shared.app.models.chat import Message
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import insert, select
 from shared.app.core.config import settings
 import structlog
 from shared.app.core.logging import setup_logging
-from .router import route_logic
+from .router import BUDGET_STOP_REASON, LOOP_STOP_REASON, MAX_TURNS, route_logic
 
 setup_logging()
 logger = structlog.get_logger(__name__)
@@ -18,105 +26,192 @@ logger = structlog.get_logger(__name__)
 GATHER_KEY_PREFIX = "synapse:gather"
 GATHER_TIMEOUT_SECONDS = 300
 
+inline_tool_calls = Counter(
+    "synapse_inline_tool_calls_total",
+    "Tool calls the dispatcher ran inline, by tool and outcome (success, error or timeout).",
+    ["tool", "outcome"],
+)
 
-async def _persist_new_messages(state: GraphState) -> dict:
-    logger.debug("_persist_new_messages.entry", group_id=state.get("group_id"), turn_id=state.get("turn_id"), current_last_saved_index=state.get("last_saved_index", 0), messages_in_state_count=len(state.get("messages", [])))
-    last_saved = state.get("last_saved_index", 0)
-    new_messages_to_persist = state["messages"][last_saved:]
 
-    if not new_messages_to_persist:
-        logger.debug("_persist_new_messages.no_new_messages_to_persist", group_id=state.get("group_id"), turn_id=state.get("turn_id"))
-        return {}
+async def record_turn_status(redis: Redis | None, group_id: str, turn_id: str, phase: str, **fields) -> None:
+    """Best-effort `set_turn_status`: progress reporting never fails a turn."""
+    if redis is None or not group_id or not turn_id:
+        return
+    try:
+        await set_turn_status(redis, group_id, turn_id, phase, **fields)
+    except Exception as e:
+        logger.warn("turn_status.update_failed", group_id=group_id, turn_id=turn_id, phase=phase, error=str(e))
+
+
+async def end_group_turn(redis: Redis | None, group_id: str | None, turn_id: str | None) -> None:
+    """Best-effort `release_group_turn`: lets the group's next queued messages run."""
+    if redis is None or not group_id or not turn_id:
+        return
+    try:
+        await release_group_turn(redis, group_id, turn_id)
+    except Exception as e:
+        logger.warn("turn_queue.release_failed", group_id=group_id, turn_id=turn_id, error=str(e))
+
+
+async def turn_was_cancelled(redis: Redis | None, group_id: str | None, turn_id: str | None) -> bool:
+    """Whether the turn was cancelled. Fails open, so a Redis hiccup never stops a turn."""
+    if redis is None or not turn_id:
+        return False
+    try:
+        return await is_turn_cancelled(redis, turn_id)
+    except Exception as e:
+        logger.warn("turn_cancel.check_failed", group_id=group_id, turn_id=turn_id, error=str(e))
+        return False
 
+
+async def check_budget(redis: Redis | None, group_id: str | None, turn_id: str | None) -> str | None:
+    """The budget the turn or group has spent, if any. Fails open like `turn_was_cancelled`."""
+    if redis is None or not group_id or not turn_id:
+        return None
+    try:
+        return await exhausted_budget(redis, group_id, turn_id)
+    except Exception as e:
+        logger.warn("usage.budget_check_failed", group_id=group_id, turn_id=turn_id, error=str(e))
+        return None
+
+
+async def persist_messages(
+    group_id: str, turn_id: str, messages: list, models_by_alias: dict[str, str] | None = None
+) -> list[str]:
+    """
+    Writes messages to Postgres, then publishes them to the group's event
+    stream and history cache. Idempotent by message id: rows that already
+    exist are neither written nor published again, so a gathered result
+    delivered early (see `process_worker_result`) is not repeated when the
+    graph persists the whole gather. Returns the ids of the messages.
+    ``models_by_alias`` prices usage of messages that do not record the
+    model that answered.
+    """
     redis_client = None
     persisted_message_ids = []
+    pending_broadcasts = []
+    history_rows = []
+    usage_increments = []
+    models_by_alias = models_by_alias or {}
     try:
         async with AsyncSessionLocal() as session:
             redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=False)
-            for lc_msg_idx, lc_msg in enumerate(new_messages_to_persist):
+            # `messages` is partitioned on timestamp, so there is no unique
+            # index on `id` alone for ON CONFLICT; skip already persisted ids
+            # up front instead. Only this turn writes these ids.
+            candidate_ids = [uuid.UUID(str(m.id)) for m in messages if getattr(m, "id", None)]
+            existing_ids = set()
+            if candidate_ids:
+                existing_ids = {
+                    str(i) for i in (await session.execute(
+                        select(Message.id).where(Message.id.in_(candidate_ids))
+                    )).scalars()
+                }
+            for lc_msg_idx, lc_msg in enumerate(messages):
                 message_id_to_save = getattr(lc_msg, "id", None)
                 if not message_id_to_save:
                     message_id_to_save = uuid.uuid4()
                     logger.warn(
-                        "_persist_new_messages.missing_lc_msg_id",
+                        "persist_messages.missing_lc_msg_id",
                         sender_alias=getattr(lc_msg, "name", "system"),
                         assigned_id=str(message_id_to_save),
                         message_content_snippet=str(lc_msg.content)[:50] + "..." if lc_msg.content else "N/A",
                         message_type=type(lc_msg).__name__,
-                        group_id=state.get("group_id"), turn_id=state.get("turn_id")
+                        group_id=group_id, turn_id=turn_id
                     )
 
                 sender_alias = getattr(lc_msg, "name", "system")
                 content_value = lc_msg.content
                 if not isinstance(content_value, str):
-                    logger.warn("_persist_new_messages.content_not_string_before_save", type=type(content_value).__name__, msg_id=str(message_id_to_save))
+                    logger.warn("persist_messages.content_not_string_before_save", type=type(content_value).__name__, msg_id=str(message_id_to_save))
                     content_value = str(content_value)
 
                 db_message_values = {
-                    "id": message_id_to_save,
-                    "group_id": state["group_id"],
-                    "turn_id": state["turn_id"],
+                    "id": uuid.UUID(str(message_id_to_save)),
+                    "group_id": uuid.UUID(str(group_id)),
+                    "turn_id": uuid.UUID(str(turn_id)),
                     "sender_alias": sender_alias,
                     "content": content_value,
-                    "meta": lc_msg.model_dump(),
+                    "meta": compact_message_meta(lc_msg),
                 }
                 if hasattr(lc_msg, "parent_message_id") and lc_msg.parent_message_id:
                     db_message_values["parent_message_id"] = lc_msg.parent_message_id
 
                 logger.debug(
-                    "_persist_new_messages.persisting_message_to_db",
+                    "persist_messages.persisting_message_to_db",
                     msg_idx_in_batch=lc_msg_idx,
-                    total_in_batch=len(new_messages_to_persist),
+                    total_in_batch=len(messages),
                     message_id=str(message_id_to_save),
                     sender=sender_alias,
-                    group_id=state.get("group_id"), turn_id=state.get("turn_id")
+                    group_id=group_id, turn_id=turn_id
                 )
-                stmt = (
-                    insert(Message)
-                    .values(**db_message_values)
-                    .on_conflict_do_nothing(index_elements=["id"])
-                )
-                await session.execute(stmt)
+                inserted_timestamp = None
+                if str(message_id_to_save) not in existing_ids:
+                    stmt = insert(Message).values(**db_message_values).returning(Message.timestamp)
+                    inserted_timestamp = (await session.execute(stmt)).scalar_one()
                 persisted_message_ids.append(str(message_id_to_save))
+                if inserted_timestamp is not None:
+                    # Rows that already existed are in the history cache already.
+                    history_rows.append({
+                        **db_message_values,
+                        "parent_message_id": db_message_values.get("parent_message_id"),
+                        "timestamp": inserted_timestamp,
+                    })
+                    # Counted once, when the row is first written.
+                    if increment := message_usage(db_message_values["meta"], models_by_alias.get(sender_alias)):
+                        usage_increments.append(increment)
+                    # Only the slim envelope is broadcast. Tool calls are the part
+                    # of meta clients render, so they fetch it for those messages.
+                    pending_broadcasts.append(message_event(
+                        str(message_id_to_save),
+                        sender_alias,
+                        content_value,
+                        str(turn_id),
+                        has_meta="tool_calls" in db_message_values["meta"],
+                    ))
 
-                broadcast_timestamp_iso = datetime.now(timezone.utc).isoformat()
-                broadcast_message_payload = {
-                    "id": str(message_id_to_save),
-                    "sender_alias": db_message_values["sender_alias"],
-                    "content": db_message_values["content"], # Already ensured string
-                    "turn_id": str(state["turn_id"]),
-                    "timestamp": broadcast_timestamp_iso,
-                    "meta": db_message_values["meta"],
-                }
-                if "parent_message_id" in db_message_values:
-                    broadcast_message_payload["parent_message_id"] = str(
-                        db_message_values["parent_message_id"]
-                    )
-                
-                logger.debug(
-                    "_persist_new_messages.broadcasting_to_redis",
-                    channel=f"group:{state['group_id']}",
-                    message_id=str(message_id_to_save),
-                    sender=broadcast_message_payload["sender_alias"],
-                    group_id=state.get("group_id"), turn_id=state.get("turn_id")
+            await session.commit()
+
+            # Events are appended only after the commit so that a client
+            # replaying the stream never sees a message the DB rolled back.
+            for event in pending_broadcasts:
+                event_id = await append_group_event(
+                    redis_client,
+                    group_id,
+                    encode_event(event),
+                    coalesce_key=event["id"],
                 )
-                await redis_client.publish(
-                    f"group:{state['group_id']}",
-                    json.dumps(broadcast_message_payload),
+                logger.debug(
+                    "persist_messages.appended_to_group_stream",
+                    stream=group_stream_key(group_id),
+                    event_id=event_id,
+                    message_id=event["id"],
+                    sender=event["sender"],
+                    group_id=group_id, turn_id=turn_id
                 )
-            await session.commit()
+            try:
+                await append_history_entries(redis_client, group_id, history_rows)
+            except Exception as e:
+                # The cache entry expires on its own; history falls back to Postgres.
+                logger.warn("persist_messages.history_cache_write_failed", group_id=group_id, error=str(e))
+            if usage_increments:
+                try:
+                    await record_usage(redis_client, group_id, turn_id, usage_increments)
+                except Exception as e:
+                    # Budgets then undercount this batch; they are a brake, not billing.
+                    logger.warn("persist_messages.usage_record_failed", group_id=group_id, error=str(e))
             logger.info(
-                "_persist_new_messages.batch_success",
-                count=len(new_messages_to_persist),
-                group_id=state["group_id"],
-                turn_id=state["turn_id"],
+                "persist_messages.batch_success",
+                count=len(messages),
+                group_id=group_id,
+                turn_id=turn_id,
                 persisted_ids=persisted_message_ids
             )
     except Exception as e:
         logger.error(
-            "_persist_new_messages.error",
-            group_id=state["group_id"],
-            turn_id=state["turn_id"],
+            "persist_messages.error",
+            group_id=group_id,
+            turn_id=turn_id,
             error=str(e),
             exc_info=True,
         )
@@ -126,6 +221,22 @@ async def _persist_new_messages(state: GraphState) -> dict:
         if redis_client:
             await redis_client.close()
 
+    return persisted_message_ids
+
+
+async def _persist_new_messages(state: GraphState) -> dict:
+    logger.debug("_persist_new_messages.entry", group_id=state.get("group_id"), turn_id=state.get("turn_id"), current_last_saved_index=state.get("last_saved_index", 0), messages_in_state_count=len(state.get("messages", [])))
+    last_saved = state.get("last_saved_index", 0)
+    new_messages_to_persist = state["messages"][last_saved:]
+
+    if not new_messages_to_persist:
+        logger.debug("_persist_new_messages.no_new_messages_to_persist", group_id=state.get("group_id"), turn_id=state.get("turn_id"))
+        return {}
+
+    await persist_messages(
+        state["group_id"], state["turn_id"], new_messages_to_persist,
+        {m.alias: m.model for m in state.get("group_members") or []},
+    )
     updated_last_saved_index = last_saved + len(new_messages_to_persist)
     logger.debug("_persist_new_messages.exit", group_id=state.get("group_id"), turn_id=state.get("turn_id"), updated_last_saved_index=updated_last_saved_index)
     return {"last_saved_index": updated_last_saved_index}
@@ -143,8 +254,21 @@ async def router_node(state: GraphState, config: dict) -> dict:
     )
     
     persistence_update = await _persist_new_messages(state)
-    
-    routing_update = route_logic(state)
+
+    arq_pool = config.get("configurable", {}).get("arq_pool")
+    if await turn_was_cancelled(arq_pool, state.get("group_id"), state.get("turn_id")):
+        # Results that were already on their way are kept, but nobody else
+        # is asked to act; the dispatcher refuses pending tool calls too.
+        logger.info("router_node.turn_cancelled", turn_id=state.get("turn_id"), group_id=state.get("group_id"))
+        return {**persistence_update, "next_actors": []}
+
+    budget_exhausted = await check_budget(arq_pool, state.get("group_id"), state.get("turn_id"))
+    routing_update = route_logic(state, budget_exhausted=budget_exhausted)
+    if routing_update.get("fast_path") and arq_pool is not None:
+        try:
+            await record_orchestrator_call_saved(arq_pool, state["group_id"])
+        except Exception as e:
+            logger.warn("usage.fast_path_record_failed", group_id=state.get("group_id"), error=str(e))
     
     combined_update = {**persistence_update, **routing_update}
     logger.info(
@@ -153,6 +277,40 @@ async def router_node(state: GraphState, config: dict) -> dict:
     return combined_update
 
 
+async def _adopt_speculation(arq_pool: Redis, speculation_id: str, **target) -> bool:
+    """Adopts a speculative agent job. Fails closed: the agent is then dispatched again."""
+    try:
+        return await adopt_speculation(arq_pool, speculation_id, **target)
+    except Exception as e:
+        logger.warn("dispatcher_node.adopt_speculation_failed", speculation_id=speculation_id, error=str(e))
+        return False
+
+
+async def run_inline_tool(call: dict, turn_id: str | None) -> ToolMessage:
+    """
+    Runs an inline tool call in the dispatcher. Like `run_tool`, failures and
+    timeouts become the content of the ToolMessage.
+    """
+    tool_name = call["name"]
+    try:
+        content = str(await asyncio.wait_for(
+            TOOL_REGISTRY[tool_name].ainvoke(call["args"]), timeout=settings.INLINE_TOOL_TIMEOUT_SECONDS
+        ))
+        outcome = "success"
+    except asyncio.TimeoutError:
+        content = f"Error executing tool '{tool_name}': timed out after {settings.INLINE_TOOL_TIMEOUT_SECONDS}s"
+        outcome = "timeout"
+    except Exception as e:
+        content = f"Error executing tool '{tool_name}': {str(e)}"
+        outcome = "error"
+    inline_tool_calls.inc(tool=tool_name, outcome=outcome)
+    logger.info("dispatcher_node.inline_tool_run", tool_name=tool_name, tool_call_id=call["id"], outcome=outcome, turn_id=turn_id)
+    return ToolMessage(
+        content=content, name=tool_name, tool_call_id=call["id"], id=str(uuid.uuid4()),
+        additional_kwargs={"turn_id": turn_id},
+    )
+
+
 async def dispatcher_node(state: GraphState, config: dict) -> dict:
     configurable_config = config.get("configurable", {})
     arq_pool = configurable_config.get("arq_pool")
@@ -177,9 +335,19 @@ async def dispatcher_node(state: GraphState, config: dict) -> dict:
         )
         raise ValueError("arq_pool or thread_id missing from runtime configuration for dispatcher_node.")
 
+    if await turn_was_cancelled(arq_pool, state.get("group_id"), turn_id):
+        logger.info("dispatcher_node.turn_cancelled", turn_id=turn_id, group_id=state.get("group_id"), thread_id=thread_id)
+        return {"inline_tool_results": False}
+
     last_message = state["messages"][-1]
     gathering_id = None
     dispatched_jobs_count = 0
+    dispatched_job_ids = []
+    inline_results = []
+    # Agents already started while the Orchestrator was streaming this message.
+    speculations = {}
+    if getattr(last_message, "name", None) == "Orchestrator":
+        speculations = dict(last_message.additional_kwargs.get("speculations") or {})
 
     # <<< START: FIX FOR turn_id PROPAGATION >>>
     # Add turn_id to all messages in the current state before serializing.
@@ -191,7 +359,21 @@ async def dispatcher_node(state: GraphState, config: dict) -> dict:
 
     if tool_calls := getattr(last_message, "tool_calls", []):
         logger.info("dispatcher_node.processing_tool_calls", tool_calls=tool_calls, group_id=state.get("group_id"), turn_id=turn_id)
+        # Cheap tools run right here; the others go to an execution worker.
+        inline_calls = [call for call in tool_calls if tool_execution_class(call["name"]) == INLINE]
+        inline_ids = {call["id"] for call in inline_calls}
+        queued_calls = [call for call in tool_calls if call["id"] not in inline_ids]
+        if queued_calls:
+            # Only the queued calls keep the turn waiting.
+            await record_turn_status(
+                arq_pool, state.get("group_id"), turn_id, "awaiting_tools",
+                pending=[call["name"] for call in queued_calls], turn_count=state.get("turn_count", 0),
+            )
+        if inline_calls:
+            inline_results = list(await asyncio.gather(*(run_inline_tool(call, turn_id) for call in inline_calls)))
         for call_idx, call in enumerate(tool_calls):
+            if call["id"] in inline_ids:
+                continue
             logger.info(
                 "dispatcher_node.dispatching_tool_call",
                 tool_name=call["name"],
@@ -202,20 +384,23 @@ async def dispatcher_node(state: GraphState, config: dict) -> dict:
                 call_index=call_idx,
                 total_tool_calls=len(tool_calls)
             )
-            await arq_pool.enqueue_job(
+            job = await arq_pool.enqueue_job(
                 "run_tool",
                 tool_name=call["name"],
                 tool_args=call["args"],
                 tool_call_id=call["id"],
                 thread_id=thread_id,
                 gathering_id=None,
+                turn_id=turn_id,
                 _queue_name="execution_queue",
             )
             dispatched_jobs_count += 1
+            if job is not None:
+                dispatched_job_ids.append(job.job_id)
     elif next_actors := state.get("next_actors"):
         if not next_actors:
             logger.info("dispatcher_node.no_next_actors_to_dispatch", thread_id=thread_id, group_id=state.get("group_id"), turn_id=turn_id)
-            return {}
+            return {"inline_tool_results": False}
 
         logger.info("dispatcher_node.processing_next_actors", next_actors=next_actors, group_id=state.get("group_id"), turn_id=turn_id)
         
@@ -238,6 +423,10 @@ async def dispatcher_node(state: GraphState, config: dict) -> dict:
             )
         else:
             logger.info("dispatcher_node.single_actor_dispatch", actor=next_actors[0], thread_id=thread_id, turn_id=turn_id)
+        await record_turn_status(
+            arq_pool, state.get("group_id"), turn_id, "awaiting_agents",
+            pending=list(next_actors), gather_id=gathering_id, turn_count=state.get("turn_count", 0),
+        )
 
         for actor_idx, alias in enumerate(next_actors):
             logger.info(
@@ -249,25 +438,53 @@ async def dispatcher_node(state: GraphState, config: dict) -> dict:
                 actor_index=actor_idx,
                 total_actors_to_dispatch=len(next_actors)
             )
-            await arq_pool.enqueue_job(
+            if alias in speculations and await _adopt_speculation(
+                arq_pool, speculations.pop(alias), thread_id=thread_id, gathering_id=gathering_id, turn_id=turn_id
+            ):
+                logger.info("dispatcher_node.adopted_speculative_agent", alias=alias, thread_id=thread_id, turn_id=turn_id)
+                dispatched_jobs_count += 1
+                continue
+            job = await arq_pool.enqueue_job(
                 "run_agent_llm",
                 alias=alias,
                 messages_dict=messages_dict,
                 group_members_dict=group_members_dict,
                 thread_id=thread_id,
                 gathering_id=gathering_id,
+                turn_id=turn_id,
                 _queue_name="execution_queue",
             )
             dispatched_jobs_count += 1
+            if job is not None:
+                dispatched_job_ids.append(job.job_id)
     else:
         logger.info(
             "dispatcher_node.no_tool_calls_and_no_next_actors_list", thread_id=thread_id, group_id=state.get("group_id"), turn_id=turn_id
         )
 
+    if speculations:
+        # Mentioned and confirmed, but not what the router decided to run.
+        try:
+            await discard_speculations(arq_pool, list(speculations.values()))
+        except Exception as e:
+            logger.warn("dispatcher_node.discard_speculations_failed", turn_id=turn_id, error=str(e))
+
+    if dispatched_job_ids:
+        try:
+            if await register_turn_jobs(arq_pool, turn_id, dispatched_job_ids):
+                logger.info("dispatcher_node.turn_cancelled_during_dispatch", turn_id=turn_id, aborted_job_ids=dispatched_job_ids)
+        except Exception as e:
+            logger.warn("turn_cancel.register_jobs_failed", turn_id=turn_id, group_id=state.get("group_id"), error=str(e))
+
     logger.info(
-        "dispatcher_node.exit", turn_id=turn_id, group_id=state.get("group_id"), thread_id=thread_id, dispatched_jobs_count=dispatched_jobs_count, final_gathering_id_used=gathering_id
+        "dispatcher_node.exit", turn_id=turn_id, group_id=state.get("group_id"), thread_id=thread_id, dispatched_jobs_count=dispatched_jobs_count, final_gathering_id_used=gathering_id,
+        inline_tool_results_count=len(inline_results),
     )
-    return {}
+    if not inline_results:
+        return {"inline_tool_results": False}
+    # With nothing queued, the turn continues in this graph run. Otherwise the
+    # inline results wait in the state for the queued ones.
+    return {"messages": inline_results, "inline_tool_results": dispatched_jobs_count == 0}
 
 
 async def sync_to_postgres_node(state: GraphState, config: dict) -> dict:
@@ -281,6 +498,17 @@ async def sync_to_postgres_node(state: GraphState, config: dict) -> dict:
         last_saved_index=state.get("last_saved_index")
     )
     persistence_update = await _persist_new_messages(state)
+    # The graph only ends here, once nothing is left to dispatch.
+    turn_count = state.get("turn_count", 0)
+    if state.get("stop_reason") in (BUDGET_STOP_REASON, LOOP_STOP_REASON):
+        phase = state["stop_reason"]
+    elif turn_count > MAX_TURNS:
+        phase = "max_turns"
+    else:
+        phase = "completed"
+    arq_pool = config.get("configurable", {}).get("arq_pool")
+    await record_turn_status(arq_pool, state.get("group_id"), state.get("turn_id"), phase, turn_count=turn_count)
+    await end_group_turn(arq_pool, state.get("group_id"), state.get("turn_id"))
     logger.info(
         "sync_to_postgres_node.exit",
         thread_id=thread_id,
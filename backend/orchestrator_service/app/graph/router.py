@@ -1,17 +1,70 @@
 import re
+import uuid
+
+from langchain_core.messages import SystemMessage
+from shared.app.agents.prompts import MENTION_REGEX
+from shared.app.core.config import settings
+from .loop_detection import current_turn_agent_messages, detect_loop
 from .state import GraphState
 import structlog
 
 logger = structlog.get_logger(__name__)
 
-MENTION_REGEX = r'@\[([\w\s.-]+?)\]'
 MAX_TURNS = 20
 
+BUDGET_STOP_REASON = "budget_exhausted"
+LOOP_STOP_REASON = "loop_detected"
+BUDGET_EXHAUSTED_NOTICE = (
+    "The {budget} has been exhausted. No further agents or tools will be called in this turn. "
+    "Orchestrator, conclude now: summarize the progress so far and what remains open for the user."
+)
+
+
+def _agent_aliases(state: GraphState) -> list[str]:
+    return [m.alias for m in state.get("group_members") or [] if m.alias not in ("Orchestrator", "User")]
 
-def route_logic(state: GraphState) -> dict:
+
+def _fast_path(state: GraphState, sender_name: str, mentions: list[str]) -> tuple[str, list[str]] | None:
+    """
+    The rule and actors for dispatching without an Orchestrator call, per the
+    group's `orchestrator_mode`, or None to route as usual.
+    """
+    mode = state.get("orchestrator_mode") or "auto"
+    if mode == "always":
+        return None
+    agents = _agent_aliases(state)
+    if sender_name == "User":
+        mentioned = [alias for alias in dict.fromkeys(mentions) if alias in agents]
+        if mentioned:
+            return "mention", mentioned
+        if len(agents) == 1:
+            return "single_agent", agents
+        return None
+    if mode == "direct" and sender_name in agents and not mentions:
+        # Only agents dispatched by a fast path reply before the Orchestrator
+        # has spoken in the turn.
+        if not any(m.name == "Orchestrator" for m in current_turn_agent_messages(state["messages"])):
+            return "direct_reply", []
+    return None
+
+
+def route_logic(state: GraphState, budget_exhausted: str | None = None) -> dict:
     """
     Runs the routing logic and returns a dictionary of state updates.
     This is no longer a conditional edge function.
+
+    `budget_exhausted` names a spent token or cost budget. The Orchestrator
+    is then asked once to conclude, unless it is ending the turn anyway, and
+    the turn ends with `stop_reason` set after it has spoken.
+
+    A turn whose agents repeat themselves or stagnate (see `loop_detection`)
+    is ended right away with `stop_reason` "loop_detected".
+
+    Unless the group's `orchestrator_mode` is "always", a user message that
+    @mentions agents, or any user message in a group with a single agent,
+    is dispatched without consulting the Orchestrator. In "direct" mode the
+    reply of such an agent also ends the turn. These updates carry the rule
+    used as `fast_path`.
     """
     turn_id = state.get("turn_id")
     group_id = state.get("group_id")
@@ -64,6 +117,35 @@ def route_logic(state: GraphState) -> dict:
         turn_id=turn_id
     )
 
+    wants_more = (
+        sender_name != "Orchestrator"
+        or getattr(last_message, "tool_calls", None)
+        or re.findall(MENTION_REGEX, content_str)
+    )
+    if budget_exhausted or state.get("stop_reason") == BUDGET_STOP_REASON:
+        if state.get("stop_reason") == BUDGET_STOP_REASON or not wants_more:
+            logger.warn("route_logic.budget_exhausted_end_turn", budget=budget_exhausted, sender_name=sender_name, group_id=group_id, turn_id=turn_id)
+            update = {"next_actors": [], "turn_count": turn_count, "stop_reason": BUDGET_STOP_REASON}
+            logger.info("route_logic.decision", reason="budget_exhausted", update=update, group_id=group_id, turn_id=turn_id)
+            return update
+        logger.warn("route_logic.budget_exhausted_conclude", budget=budget_exhausted, sender_name=sender_name, group_id=group_id, turn_id=turn_id)
+        notice = SystemMessage(content=BUDGET_EXHAUSTED_NOTICE.format(budget=budget_exhausted), name="system", id=str(uuid.uuid4()))
+        update = {
+            "messages": [notice],
+            "next_actors": ["Orchestrator"],
+            "turn_count": turn_count,
+            "stop_reason": BUDGET_STOP_REASON,
+        }
+        logger.info("route_logic.decision", reason="budget_exhausted_conclude", next_actors=update["next_actors"], group_id=group_id, turn_id=turn_id)
+        return update
+
+    if wants_more and settings.LOOP_DETECTION_ENABLED and (loop := detect_loop(state["messages"])):
+        logger.warn("route_logic.loop_detected", loop=loop, sender_name=sender_name, turn_count=turn_count, group_id=group_id, turn_id=turn_id)
+        notice = SystemMessage(content=f"This turn was stopped because the conversation is looping ({loop}).", name="system", id=str(uuid.uuid4()))
+        update = {"messages": [notice], "next_actors": [], "turn_count": turn_count, "stop_reason": LOOP_STOP_REASON}
+        logger.info("route_logic.decision", reason="loop_detected", loop=loop, group_id=group_id, turn_id=turn_id)
+        return update
+
     if sender_name == "system_error":
         logger.warn("route_logic.system_error_detected", error_message_content=content_str, group_id=group_id, turn_id=turn_id)
         update = {"next_actors": ["Orchestrator"], "turn_count": turn_count}
@@ -83,6 +165,17 @@ def route_logic(state: GraphState) -> dict:
         return update
 
     mentions = re.findall(MENTION_REGEX, content_str)
+    if fast_path := _fast_path(state, sender_name, mentions):
+        rule, next_actors = fast_path
+        update = {"next_actors": next_actors, "turn_count": turn_count, "fast_path": rule}
+        logger.info("route_logic.decision", reason="fast_path", rule=rule, update=update, group_id=group_id, turn_id=turn_id)
+        return update
+
+    if sender_name == "User" and state.get("orchestrator_mode") == "always":
+        update = {"next_actors": ["Orchestrator"], "turn_count": turn_count}
+        logger.info("route_logic.decision", reason="orchestrator_mode_always", update=update, group_id=group_id, turn_id=turn_id)
+        return update
+
     if mentions:
         unique_mentions = set(m for m in mentions if m != sender_name)
         next_actors = list(unique_mentions)
@@ -32,3 +32,19 @@ class GraphState(TypedDict):
 
     # The ID representing this conversation turn.
     turn_id: str
+
+    # Why the router ended the turn early, e.g. "budget_exhausted". Once set,
+    # pending tool calls are no longer dispatched.
+    stop_reason: str | None
+
+    # The group's orchestrator_mode ("always", "auto" or "direct"), which
+    # decides when the router may dispatch without asking the Orchestrator.
+    orchestrator_mode: str
+
+    # The fast-path rule the router last used in this turn to skip the
+    # Orchestrator ("mention", "single_agent" or "direct_reply"), if any.
+    fast_path: str | None
+
+    # Whether the dispatcher answered all pending tool calls itself (inline
+    # tools), so the turn goes back to the router in the same graph run.
+    inline_tool_results: bool
@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date, datetime, timezone
+
+import structlog
+from sqlalchemy import text
+
+from shared.app.core.config import settings
+from shared.app.core.logging import setup_logging
+from shared.app.db import AsyncSessionLocal, engine
+from shared.app.models.archive import MessageArchive
+from shared.app.utils.message_archive import MonthArchiveWriter, add_months, month_start, partition_name
+
+setup_logging()
+logger = structlog.get_logger(__name__)
+
+EXPORT_BATCH_SIZE = 1000
+ARCHIVE_COLUMNS = "id, group_id, turn_id, sender_alias, content, timestamp, parent_message_id, meta"
+
+
+def partition_ddl(month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF messages "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def months_to_archive(partitions: list[date], current_month: date, hot_months: int) -> list[date]:
+    """Partitions that ended more than ``hot_months`` months ago, oldest first."""
+    if hot_months <= 0:
+        return []
+    cutoff = add_months(current_month, -hot_months)
+    return sorted(month for month in partitions if month < cutoff)
+
+
+async def ensure_message_partitions(session, current_month: date) -> None:
+    for offset in range(settings.MESSAGE_PARTITION_PREMAKE_MONTHS + 1):
+        await session.execute(text(partition_ddl(add_months(current_month, offset))))
+    await session.commit()
+
+
+async def list_message_partitions(session) -> list[date]:
+    result = await session.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'messages'::regclass"
+    ))
+    months = []
+    for name in result.scalars():
+        # messages_pYYYY_MM; anything else was attached by hand and is left alone.
+        try:
+            months.append(datetime.strptime(name, "messages_p%Y_%m").date())
+        except ValueError:
+            logger.warn("partitions.unknown_partition", partition=name)
+    return months
+
+
+async def archive_month(month: date) -> int:
+    """
+    Exports one partition to the archive directory, then records the month
+    and drops the partition in a single transaction. Returns the row count.
+    """
+    name = partition_name(month)
+    writer = MonthArchiveWriter(month)
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(
+            text(f"SELECT {ARCHIVE_COLUMNS} FROM {name} ORDER BY group_id, timestamp, id")
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for batch in result.mappings().partitions(EXPORT_BATCH_SIZE):
+            await asyncio.to_thread(writer.write, [dict(row) for row in batch])
+    await asyncio.to_thread(writer.close)
+
+    async with AsyncSessionLocal() as session:
+        session.add(MessageArchive(month=month, row_count=writer.row_count))
+        await session.execute(text(f"DROP TABLE {name}"))
+        await session.commit()
+    return writer.row_count
+
+
+async def maintain_message_partitions(ctx) -> None:
+    """
+    Nightly arq cron job: creates the coming months' partitions and archives
+    the ones that fell out of the hot range.
+    """
+    if engine.dialect.name != "postgresql":
+        logger.info("maintain_message_partitions.skipped", dialect=engine.dialect.name)
+        return
+    current_month = month_start(datetime.now(timezone.utc))
+    async with AsyncSessionLocal() as session:
+        await ensure_message_partitions(session, current_month)
+        partitions = await list_message_partitions(session)
+
+    for month in months_to_archive(partitions, current_month, settings.MESSAGE_HOT_MONTHS):
+        logger.info("maintain_message_partitions.archiving", partition=partition_name(month))
+        try:
+            row_count = await archive_month(month)
+        except Exception as e:
+            # Partitions are archived oldest first; stop so the archived
+            # months stay contiguous, and retry on the next run.
+            logger.error("maintain_message_partitions.archive_failed", partition=partition_name(month), error=str(e), exc_info=True)
+            break
+        logger.info("maintain_message_partitions.archived", partition=partition_name(month), row_count=row_count)
@@ -1,7 +1,7 @@
 import asyncio
 import json
 import structlog
-from arq import ArqRedis
+from arq import ArqRedis, cron
 from arq.connections import RedisSettings
 from langchain_core.messages import HumanMessage, BaseMessage
 from langgraph.checkpoint.redis.aio import AsyncRedisSaver
@@ -9,12 +9,18 @@ from sqlalchemy import select
 import uuid 
 
 from graph.graph import workflow 
+from graph.nodes import end_group_turn, persist_messages, record_turn_status
+from partitions import maintain_message_partitions
 from shared.app.core.config import settings
+from shared.app.core.job_stream import start_job_stream_consumer
 from shared.app.core.logging import setup_logging
-from shared.app.db import AsyncSessionLocal
-from shared.app.models.chat import GroupMember
+from shared.app.core.metrics import start_metrics_server
+from shared.app.db import AsyncReadSessionLocal, AsyncSessionLocal
+from shared.app.models.chat import ChatGroup, GroupMember
 from shared.app.schemas.groups import GroupMemberRead
 from shared.app.utils.message_serde import deserialize_messages, serialize_messages
+from shared.app.utils.turn_queue import claim_user_messages, enqueue_user_message, refresh_group_turn
+from shared.app.utils.turn_status import resolve_pending
 
 setup_logging()
 logger = structlog.get_logger(__name__)
@@ -31,6 +37,11 @@ async def start_turn(
     message_id: str,
     turn_id: str,
 ):
+    """
+    Queues a user message for the group's next turn. The turn itself starts
+    in `flush_user_messages`: at once for an idle group, else once the
+    group's debounce window has passed and no other turn is in flight.
+    """
     logger.info(
         "start_turn.initiated_by_user_message",
         group_id=group_id,
@@ -39,7 +50,46 @@ async def start_turn(
         turn_id=turn_id,
         message_content_snippet=message_content[:100]+"..."
     )
+    await enqueue_user_message(ctx["redis"], group_id, {
+        "message_id": message_id, "turn_id": turn_id, "user_id": user_id, "content": message_content,
+    }, await load_message_debounce_seconds(group_id))
 
+
+async def load_message_debounce_seconds(group_id: str) -> float | None:
+    """The group's own debounce window, or None for the server default."""
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(
+            select(ChatGroup.message_debounce_seconds).where(ChatGroup.id == group_id)
+        )).scalar_one_or_none()
+
+
+async def flush_user_messages(ctx, group_id: str, last_message_id: str | None = None):
+    """Runs the group's queued user messages as one turn, if it is their time."""
+    arq_pool: ArqRedis = ctx["redis"]
+    user_messages = await claim_user_messages(arq_pool, group_id, last_message_id)
+    if not user_messages:
+        logger.debug("flush_user_messages.nothing_to_run", group_id=group_id, last_message_id=last_message_id)
+        return
+    turn_id = user_messages[0]["turn_id"]
+    try:
+        await run_turn(ctx, group_id, turn_id, user_messages)
+    except Exception:
+        await end_group_turn(arq_pool, group_id, turn_id)
+        raise
+
+
+async def run_turn(ctx, group_id: str, turn_id: str, user_messages: list[dict]):
+    arq_pool: ArqRedis = ctx["redis"]
+    merged_turn_ids = [m["turn_id"] for m in user_messages[1:]]
+    logger.info(
+        "run_turn.start", group_id=group_id, turn_id=turn_id,
+        user_message_ids=[m["message_id"] for m in user_messages], merged_turn_ids=merged_turn_ids,
+    )
+    for merged_turn_id in merged_turn_ids:
+        await record_turn_status(arq_pool, group_id, merged_turn_id, "merged")
+
+    # The turn's agents come from the primary: a group or member created just
+    # before this message may not have reached a lagging replica yet.
     async with AsyncSessionLocal() as session:
         result = await session.execute(
             select(GroupMember).where(GroupMember.group_id == group_id)
@@ -52,24 +102,32 @@ async def start_turn(
             members_schema = [GroupMemberRead.model_validate(m) for m in members_orm]
         
         logger.debug("start_turn.loaded_group_members", group_id=group_id, turn_id=turn_id, member_aliases=[m.alias for m in members_schema], member_count=len(members_schema))
-
-    user_msg = HumanMessage(content=message_content)
-    user_msg.id = message_id 
-    user_msg.name = "User"
-    # Add turn_id to additional_kwargs for logging traceability in run_agent
-    user_msg.additional_kwargs["turn_id"] = turn_id
+        orchestrator_mode = (await session.execute(
+            select(ChatGroup.orchestrator_mode).where(ChatGroup.id == group_id)
+        )).scalar_one_or_none() or "auto"
+
+    user_msgs = []
+    for queued in user_messages:
+        user_msg = HumanMessage(content=queued["content"])
+        user_msg.id = queued["message_id"]
+        user_msg.name = "User"
+        # Add turn_id to additional_kwargs for logging traceability in run_agent
+        user_msg.additional_kwargs["turn_id"] = turn_id
+        user_msgs.append(user_msg)
 
     graph_input = {
-        "messages": [user_msg],
+        "messages": user_msgs,
         "group_id": group_id,
         "group_members": members_schema,
         "turn_count": 0,
         "last_saved_index": 0,
         "turn_id": turn_id,
+        "stop_reason": None,
+        "orchestrator_mode": orchestrator_mode,
+        "fast_path": None,
+        "inline_tool_results": False,
     }
-    logger.debug("start_turn.initial_graph_input", group_id=group_id, turn_id=turn_id, graph_input_details={"message_id": message_id, "turn_id": turn_id, "group_members_count": len(members_schema)})
-
-    arq_pool: ArqRedis = ctx["redis"]
+    logger.debug("start_turn.initial_graph_input", group_id=group_id, turn_id=turn_id, graph_input_details={"message_ids": [m.id for m in user_msgs], "turn_id": turn_id, "group_members_count": len(members_schema)})
 
     async with AsyncRedisSaver.from_conn_string(settings.REDIS_URL) as checkpointer:
         graph_app = workflow.compile(checkpointer=checkpointer)
@@ -80,14 +138,50 @@ async def start_turn(
             }
         }
         logger.info("start_turn.invoking_graph_app.ainvoke", group_id=group_id, turn_id=turn_id, thread_id_for_graph=group_id)
-        await graph_app.ainvoke(graph_input, config=invocation_config)
+        await record_turn_status(arq_pool, group_id, turn_id, "running", turn_count=0)
+        try:
+            await graph_app.ainvoke(graph_input, config=invocation_config)
+        except Exception:
+            await record_turn_status(arq_pool, group_id, turn_id, "failed")
+            raise
     
     logger.info("start_turn.graph_invocation_complete", group_id=group_id, turn_id=turn_id)
 
 
+async def deliver_gathered_message(thread_id: str, turn_id: str, message_dict: dict) -> None:
+    """
+    Persists and publishes one result of a gather as soon as it arrives, so
+    clients see each agent's reply without waiting for the slowest agent.
+    The graph still resumes only once the gather is complete; it skips the
+    row written here. Best-effort: a failure leaves the message to the graph.
+    """
+    try:
+        messages = deserialize_messages([message_dict])
+        async with AsyncReadSessionLocal() as session:
+            models_by_alias = dict((await session.execute(
+                select(GroupMember.alias, GroupMember.model).where(GroupMember.group_id == uuid.UUID(thread_id))
+            )).all())
+        await persist_messages(thread_id, turn_id, messages, models_by_alias)
+    except Exception as e:
+        logger.warn(
+            "process_worker_result.early_delivery_failed",
+            thread_id=thread_id, turn_id=turn_id, error=str(e), exc_info=True,
+        )
+
+
 async def process_worker_result(
-    ctx, thread_id: str, message_dict: dict, gathering_id: str | None = None
+    ctx,
+    thread_id: str,
+    message_dict: dict,
+    gathering_id: str | None = None,
+    turn_id: str | None = None,
+    alias: str | None = None,
 ):
+    """
+    Feeds a worker result back into the graph, or into its gather until every
+    result of the gather has arrived. ``alias`` is the agent alias or tool
+    name the job was dispatched as, which the turn status lists as pending.
+    """
     sender_alias_log = message_dict.get("kwargs", {}).get("name", "N/A")
     message_id_log = message_dict.get("kwargs", {}).get("id", "N/A")
     
@@ -99,14 +193,23 @@ async def process_worker_result(
         gathering_id=gathering_id,
     )
 
+    arq_pool: ArqRedis = ctx["redis"]
+    if turn_id and alias:
+        try:
+            await resolve_pending(arq_pool, thread_id, turn_id, alias)
+        except Exception as e:
+            logger.warn("turn_status.update_failed", group_id=thread_id, turn_id=turn_id, alias=alias, error=str(e))
+
     if not gathering_id:
         logger.info("process_worker_result.handling_single_dispatch_result", thread_id=thread_id, message_id_approx=message_id_log)
         await update_graph_with_messages(
-            ctx, thread_id=thread_id, messages_dict_list=[message_dict]
+            ctx, thread_id=thread_id, messages_dict_list=[message_dict], turn_id=turn_id
         )
         return
 
-    arq_pool: ArqRedis = ctx["redis"]
+    if turn_id:
+        await deliver_gathered_message(thread_id, turn_id, message_dict)
+
     gather_hash_key = f"{GATHER_KEY_PREFIX}:{gathering_id}"
     gather_list_key = f"{gather_hash_key}:messages"
     
@@ -156,13 +259,15 @@ async def process_worker_result(
 
         all_messages_as_dicts = [json.loads(m_str) for m_str in all_message_strs_from_redis]
         await update_graph_with_messages(
-            ctx, thread_id=thread_id, messages_dict_list=all_messages_as_dicts
+            ctx, thread_id=thread_id, messages_dict_list=all_messages_as_dicts, turn_id=turn_id
         )
 
 
-async def update_graph_with_messages(ctx, thread_id: str, messages_dict_list: list[dict]):
+async def update_graph_with_messages(
+    ctx, thread_id: str, messages_dict_list: list[dict], turn_id: str | None = None
+):
     sender_aliases_in_batch = [msg.get("kwargs", {}).get("name", "N/A") for msg in messages_dict_list]
-    turn_id_for_log = "N/A" # Attempt to find a turn_id for logging
+    turn_id_for_log = turn_id or "N/A" # Attempt to find a turn_id for logging
 
     logger.info(
         "update_graph_with_messages.entry",
@@ -177,9 +282,10 @@ async def update_graph_with_messages(ctx, thread_id: str, messages_dict_list: li
         new_lc_messages: list[BaseMessage] = deserialize_messages(messages_dict_list)
         # Find turn_id from the first available message for logging
         for msg in new_lc_messages:
+            if turn_id_for_log != "N/A":
+                break
             if msg.additional_kwargs.get("turn_id"):
                 turn_id_for_log = msg.additional_kwargs.get("turn_id")
-                break
     except Exception as e:
         logger.error(
             "update_graph_with_messages.deserialization_error",
@@ -211,13 +317,24 @@ async def update_graph_with_messages(ctx, thread_id: str, messages_dict_list: li
             }
         }
         logger.info("update_graph_with_messages.invoking_graph_app.ainvoke_to_continue", thread_id=thread_id, turn_id=turn_id_for_log)
-        await graph_app.ainvoke(input_payload_for_graph, config=invocation_config)
+        await record_turn_status(arq_pool, thread_id, turn_id, "running")
+        try:
+            await refresh_group_turn(arq_pool, thread_id)
+        except Exception as e:
+            logger.warn("turn_queue.refresh_failed", group_id=thread_id, turn_id=turn_id, error=str(e))
+        try:
+            await graph_app.ainvoke(input_payload_for_graph, config=invocation_config)
+        except Exception:
+            await record_turn_status(arq_pool, thread_id, turn_id, "failed")
+            await end_group_turn(arq_pool, thread_id, turn_id)
+            raise
 
     logger.info("update_graph_with_messages.graph_continue_invocation_complete", thread_id=thread_id, turn_id=turn_id_for_log)
 
 
 class WorkerSettings:
-    functions = [start_turn, process_worker_result]
+    functions = [start_turn, flush_user_messages, process_worker_result]
+    cron_jobs = [cron(maintain_message_partitions, hour={3}, minute={30}, run_at_startup=True)]
     queue_name = "orchestrator_queue"
     redis_settings = RedisSettings.from_dsn(settings.REDIS_URL)
 
@@ -229,6 +346,18 @@ class WorkerSettings:
             logger.info("orchestrator_worker.startup.checkpointer_setup_verified")
         except Exception as e:
             logger.error("orchestrator_worker.startup.checkpointer_setup_failed", error=str(e), exc_info=True)
+        if settings.WORKER_METRICS_PORT:
+            # Speculative dispatch adoptions and the first-token time they saved.
+            ctx["metrics_server"] = await start_metrics_server(settings.WORKER_METRICS_PORT)
+            logger.info("orchestrator_worker.metrics_server_started", port=settings.WORKER_METRICS_PORT)
+        # With JOB_TRANSPORT="stream", jobs are pushed to this worker instead
+        # of being polled; arq still runs the deferred and cron ones.
+        ctx["job_stream_consumer"] = await start_job_stream_consumer(ctx, WorkerSettings.queue_name, WorkerSettings.functions)
 
     async def on_shutdown(ctx):
+        if consumer := ctx.get("job_stream_consumer"):
+            await consumer.close()
+        if metrics_server := ctx.get("metrics_server"):
+            metrics_server.close()
+            await metrics_server.wait_closed()
         logger.info("orchestrator_worker.shutdown", queue_name=WorkerSettings.queue_name)
\ No newline at end of file
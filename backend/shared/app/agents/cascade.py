@@ -0,0 +1,104 @@
+"""
+Model cascade for the Orchestrator.
+
+Most Orchestrator outputs are short delegations, so a member with a fast
+model configured asks it first. Its output is used unless validation fails:
+the output did not end on the stop sequence (it was truncated or filtered),
+it is empty, it calls an alias that is not an agent of the group, or (for
+providers that return logprobs) its mean token probability is below
+ORCHESTRATOR_CASCADE_MIN_CONFIDENCE. With
+ORCHESTRATOR_CASCADE_REQUIRE_DECISION, an output that neither delegates nor
+completes the task escalates too; by default it is used as a plain reply.
+The strong model then answers instead.
+"""
+import math
+import re
+
+from langchain_core.messages import BaseMessage
+
+from ..core.config import settings
+from ..core.metrics import Counter, Gauge, Histogram
+from ..schemas.groups import GroupMemberRead
+from .prompts import MENTION_REGEX
+
+# Finish reasons of outputs that ended on the stop sequence or on their own:
+# OpenAI and Gemini report "stop", Anthropic "stop_sequence" or "end_turn".
+CLEAN_FINISH_REASONS = frozenset({"stop", "stop_sequence", "end_turn", "tool_calls", "tool_use"})
+
+cascade_calls = Counter(
+    "synapse_orchestrator_cascade_total",
+    "Orchestrator calls answered by the fast model (accepted) or escalated to the strong one, by escalation reason.",
+    ["outcome", "reason"],
+)
+orchestrator_llm_seconds = Histogram(
+    "synapse_orchestrator_llm_seconds", "Orchestrator LLM call latency by cascade tier.", ["tier"]
+)
+cascade_latency_saved = Gauge(
+    "synapse_orchestrator_cascade_latency_saved_seconds",
+    "Net Orchestrator latency saved by the cascade: mean strong-model latency minus the fast call for accepted "
+    "outputs, minus the wasted fast call for escalations.",
+)
+
+
+def finish_reason(message: BaseMessage) -> str | None:
+    metadata = getattr(message, "response_metadata", None) or {}
+    reason = metadata.get("finish_reason") or metadata.get("stop_reason")
+    return str(reason).lower() if reason else None
+
+
+def mean_token_probability(message: BaseMessage) -> float | None:
+    """Mean probability of the output tokens, if the provider returned logprobs."""
+    metadata = getattr(message, "response_metadata", None) or {}
+    tokens = (metadata.get("logprobs") or {}).get("content")
+    if not tokens:
+        return None
+    return sum(math.exp(token["logprob"]) for token in tokens) / len(tokens)
+
+
+def validate_orchestrator_output(
+    message: BaseMessage,
+    content: str,
+    members: list[GroupMemberRead],
+    min_confidence: float | None = None,
+    require_decision: bool | None = None,
+) -> str | None:
+    """
+    Why a fast-model output must be escalated, or None if it can be used.
+    ``content`` is the normalized text of ``message``.
+    """
+    min_confidence = settings.ORCHESTRATOR_CASCADE_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    if require_decision is None:
+        require_decision = settings.ORCHESTRATOR_CASCADE_REQUIRE_DECISION
+    reason = finish_reason(message)
+    if reason is not None and reason not in CLEAN_FINISH_REASONS:
+        return "no_stop_sequence"
+    tool_calls = getattr(message, "tool_calls", None)
+    if not content.strip() and not tool_calls:
+        return "empty"
+    mentions = re.findall(MENTION_REGEX, content)
+    agents = {m.alias for m in members if m.alias not in ("Orchestrator", "User")}
+    if any(mention not in agents for mention in mentions):
+        return "unknown_mention"
+    if require_decision and not mentions and "TASK_COMPLETE" not in content and not tool_calls:
+        return "no_decision"
+    if min_confidence > 0:
+        confidence = mean_token_probability(message)
+        if confidence is not None and confidence < min_confidence:
+            return "low_confidence"
+    return None
+
+
+def record_cascade(reason: str | None, fast_seconds: float, strong_seconds: float | None = None) -> None:
+    """Records one cascaded call; ``reason`` is None if the fast output was used."""
+    orchestrator_llm_seconds.observe(fast_seconds, tier="fast")
+    if reason is None:
+        cascade_calls.inc(outcome="accepted", reason="")
+        strong_calls = orchestrator_llm_seconds.count(tier="strong")
+        if strong_calls:
+            mean_strong = orchestrator_llm_seconds.sum(tier="strong") / strong_calls
+            cascade_latency_saved.inc(mean_strong - fast_seconds)
+        return
+    cascade_calls.inc(outcome="escalated", reason=reason)
+    cascade_latency_saved.dec(fast_seconds)
+    if strong_seconds is not None:
+        orchestrator_llm_seconds.observe(strong_seconds, tier="strong")
@@ -1,6 +1,9 @@
 # Define a constant for the stop sequence to ensure consistency.
 STOP_SEQUENCE = "[MESSAGE_END]"
 
+# How the Orchestrator calls an agent: @[Agent Name].
+MENTION_REGEX = r'@\[([\w\s.-]+?)\]'
+
 ORCHESTRATOR_PROMPT = f"""\
 You are in a group chat with other agents. You are the **Orchestrator** of the group chat. The group contains one *User*, and other assistants like yourself. But the crucial difference is that you are the leader of the group. You are in control of who talks, who does what, and so on. You do not perform any tasks other than administrating the team.
 
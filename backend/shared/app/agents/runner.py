@@ -1,13 +1,15 @@
 import re
+import time
 import uuid
-from typing import List, Union, Dict
+from typing import Awaitable, Callable, List, Union, Dict
 
-from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage, message_chunk_to_message
 from langchain.load.dump import dumpd
 import structlog
 
 from ..core.config import settings
 from ..schemas.groups import GroupMemberRead
+from .cascade import orchestrator_llm_seconds, record_cascade, validate_orchestrator_output
 from .prompts import AGENT_BASE_PROMPT, ORCHESTRATOR_PROMPT, STOP_SEQUENCE
 from .tools import TOOL_REGISTRY
 from ..utils.message_serde import serialize_messages # Import for logging
@@ -56,9 +58,95 @@ def _normalize_and_clean_llm_content(content: Union[str, List[Union[str, Dict[st
     return text_content
 
 
+def _create_llm(provider: str, model: str, temperature: float, alias: str, logprobs: bool = False):
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+        if not settings.OPENAI_API_KEY:
+            raise ValueError(f"OpenAI API key not configured for agent {alias}")
+        extra = {"logprobs": True} if logprobs else {}
+        # Streamed responses (speculative dispatch) report usage only with stream_usage.
+        return ChatOpenAI(
+            model=model, temperature=temperature, api_key=settings.OPENAI_API_KEY, stream_usage=True, **extra
+        )
+    elif provider == "gemini":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        if not settings.GEMINI_API_KEY:
+            raise ValueError(f"Gemini API key not configured for agent {alias}")
+        return ChatGoogleGenerativeAI(model=model, temperature=temperature, google_api_key=settings.GEMINI_API_KEY)
+    elif provider == "claude":
+        from langchain_anthropic import ChatAnthropic
+        if not settings.CLAUDE_API_KEY:
+            raise ValueError(f"Claude API key not configured for agent {alias}")
+        return ChatAnthropic(model=model, temperature=temperature, anthropic_api_key=settings.CLAUDE_API_KEY)
+    raise ValueError(f"Unknown or unsupported LLM provider: {provider} for agent {alias}")
+
+
+async def _complete(llm, prompt: list[BaseMessage], on_text: Callable[[str], Awaitable[None]] | None = None) -> BaseMessage:
+    """Invokes the LLM, streaming it when ``on_text`` wants the text received so far."""
+    if on_text is None:
+        return await llm.ainvoke(prompt)
+    response = None
+    async for chunk in llm.astream(prompt):
+        response = chunk if response is None else response + chunk
+        await on_text(_normalize_and_clean_llm_content(response.content))
+    if response is None:
+        raise ValueError("LLM stream ended without a response")
+    return message_chunk_to_message(response)
+
+
+def _answered_by(response: BaseMessage, model: str) -> BaseMessage:
+    """
+    Records the configured name of the model that answered, which usage is
+    priced by (providers report versioned names such as gpt-4o-2024-08-06).
+    """
+    response.response_metadata["model_name"] = model
+    return response
+
+
+async def _invoke_cascade(
+    fast_llm, strong_llm, prompt: list[BaseMessage], members: list[GroupMemberRead], turn_id_for_log: str,
+    on_text: Callable[[str], Awaitable[None]] | None = None,
+    *, fast_model: str, model: str,
+) -> BaseMessage:
+    """
+    Asks the fast model first and escalates to the strong one if its output
+    fails validation. The usage of a rejected fast output travels with the
+    strong response, so budgets still count it.
+    """
+    started = time.perf_counter()
+    try:
+        fast_response = await _complete(fast_llm, prompt, on_text)
+        reason = validate_orchestrator_output(
+            fast_response, _normalize_and_clean_llm_content(fast_response.content), members
+        )
+    except Exception as e:
+        logger.warn("run_agent.cascade.fast_model_failed", turn_id=turn_id_for_log, error=str(e))
+        fast_response, reason = None, "error"
+    fast_seconds = time.perf_counter() - started
+
+    if reason is None:
+        record_cascade(None, fast_seconds)
+        logger.info("run_agent.cascade.accepted", turn_id=turn_id_for_log, fast_seconds=round(fast_seconds, 3))
+        return _answered_by(fast_response, fast_model)
+
+    logger.info("run_agent.cascade.escalated", turn_id=turn_id_for_log, reason=reason, fast_seconds=round(fast_seconds, 3))
+    started = time.perf_counter()
+    strong_response = await _complete(strong_llm, prompt, on_text)
+    record_cascade(reason, fast_seconds, time.perf_counter() - started)
+    fast_usage = getattr(fast_response, "usage_metadata", None)
+    if fast_usage:
+        strong_response.response_metadata["discarded_usage"] = [{"model": fast_model, **fast_usage}]
+    return _answered_by(strong_response, model)
+
+
 async def run_agent(
-    messages: list[BaseMessage], members: list[GroupMemberRead], alias: str
+    messages: list[BaseMessage], members: list[GroupMemberRead], alias: str,
+    on_text: Callable[[str], Awaitable[None]] | None = None,
 ) -> BaseMessage:
+    """
+    Runs one agent turn. With ``on_text``, the response is streamed and the
+    callback gets the normalized text received so far after every chunk.
+    """
     turn_id_for_log = "N/A"
     if messages and messages[-1].additional_kwargs.get("turn_id"):
         turn_id_for_log = messages[-1].additional_kwargs.get("turn_id")
@@ -120,36 +208,19 @@ async def run_agent(
         provider = getattr(member_config, "provider", "openai")
         model = getattr(member_config, "model", "gpt-4o")
         temperature = getattr(member_config, "temperature", 0.1)
+        fast_provider = getattr(member_config, "fast_provider", None)
+        fast_model = getattr(member_config, "fast_model", None)
         logger.info(
             "run_agent.llm_parameters",
             agent_alias=alias,
             turn_id=turn_id_for_log,
             provider=provider,
             model=model,
+            fast_provider=fast_provider,
+            fast_model=fast_model,
             temperature=temperature,
         )
 
-        llm_instance = None
-        if provider == "openai":
-            from langchain_openai import ChatOpenAI
-            if not settings.OPENAI_API_KEY:
-                raise ValueError(f"OpenAI API key not configured for agent {alias}")
-            llm_instance = ChatOpenAI(model=model, temperature=temperature, api_key=settings.OPENAI_API_KEY)
-        elif provider == "gemini":
-            from langchain_google_genai import ChatGoogleGenerativeAI
-            if not settings.GEMINI_API_KEY:
-                raise ValueError(f"Gemini API key not configured for agent {alias}")
-            llm_instance = ChatGoogleGenerativeAI(model=model, temperature=temperature, google_api_key=settings.GEMINI_API_KEY)
-        elif provider == "claude":
-            from langchain_anthropic import ChatAnthropic
-            if not settings.CLAUDE_API_KEY:
-                raise ValueError(f"Claude API key not configured for agent {alias}")
-            llm_instance = ChatAnthropic(model=model, temperature=temperature, anthropic_api_key=settings.CLAUDE_API_KEY)
-        else:
-            raise ValueError(f"Unknown or unsupported LLM provider: {provider} for agent {alias}")
-        
-        llm_instance = llm_instance.bind(stop=[STOP_SEQUENCE])
-
         allowed_tool_names = member_config.tools or []
         allowed_tools_resolved = [TOOL_REGISTRY[name] for name in allowed_tool_names if name in TOOL_REGISTRY]
         
@@ -157,10 +228,34 @@ async def run_agent(
             unresolved = set(allowed_tool_names) - set(t.name for t in allowed_tools_resolved)
             logger.warn("run_agent.tools_not_found_in_registry", agent_alias=alias, unresolved_tools=list(unresolved))
 
-        llm_with_tools = llm_instance.bind_tools(allowed_tools_resolved) if allowed_tools_resolved else llm_instance
+        def with_tools(llm_instance):
+            llm_instance = llm_instance.bind(stop=[STOP_SEQUENCE])
+            return llm_instance.bind_tools(allowed_tools_resolved) if allowed_tools_resolved else llm_instance
+
+        llm_with_tools = with_tools(_create_llm(provider, model, temperature, alias))
 
         logger.info("run_agent.invoking_llm", agent_alias=alias, turn_id=turn_id_for_log, has_tools_bound=bool(allowed_tools_resolved))
-        raw_llm_response: BaseMessage = await llm_with_tools.ainvoke(prompt_for_llm)
+        fast_llm = None
+        if alias == "Orchestrator" and fast_provider and fast_model:
+            try:
+                fast_llm = with_tools(_create_llm(
+                    fast_provider, fast_model, temperature, alias,
+                    logprobs=settings.ORCHESTRATOR_CASCADE_MIN_CONFIDENCE > 0,
+                ))
+            except ValueError as e:
+                # e.g. no API key for the fast provider: use the strong model alone.
+                logger.warn("run_agent.cascade.fast_model_unavailable", turn_id=turn_id_for_log, fast_provider=fast_provider, error=str(e))
+        if fast_llm is not None:
+            raw_llm_response = await _invoke_cascade(
+                fast_llm, llm_with_tools, prompt_for_llm, members, turn_id_for_log, on_text,
+                fast_model=fast_model, model=model,
+            )
+        else:
+            started = time.perf_counter()
+            raw_llm_response: BaseMessage = _answered_by(await _complete(llm_with_tools, prompt_for_llm, on_text), model)
+            if alias == "Orchestrator":
+                # The strong-model baseline the cascade's savings are measured against.
+                orchestrator_llm_seconds.observe(time.perf_counter() - started, tier="strong")
 
         logger.debug(
             "run_agent.raw_llm_response_received",
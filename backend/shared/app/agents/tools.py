@@ -1,3 +1,6 @@
+import ast
+import operator
+
 from langchain_core.tools import tool
 from tavily import TavilyClient
 from ..core.config import settings
@@ -28,6 +31,77 @@ def web_search(query: str) -> str:
     except Exception as e:
         return f"Error performing web search for '{query}': {e}"
 
+# Execution classes. "queued" tools run as `run_tool` jobs on an execution
+# worker. "inline" tools are cheap and deterministic: the Orchestrator's
+# dispatcher runs them itself within INLINE_TOOL_TIMEOUT_SECONDS and
+# continues the turn in the same graph run. A tool declares its class in its
+# metadata ({"execution": "inline"}); the default is "queued".
+QUEUED = "queued"
+INLINE = "inline"
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+MAX_EXPRESSION_LENGTH = 200
+MAX_EXPONENT = 100
+MAX_INTEGER_BITS = 4096
+
+
+def _evaluate(node: ast.AST) -> int | float:
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        # Keeps the tool cheap: inline tools run in the Orchestrator.
+        if isinstance(node.op, ast.Pow) and (
+            abs(right) > MAX_EXPONENT or (isinstance(left, int) and left.bit_length() * abs(right) > MAX_INTEGER_BITS)
+        ):
+            raise ValueError("the result is too large")
+        result = _OPERATORS[type(node.op)](left, right)
+        if isinstance(result, int) and result.bit_length() > MAX_INTEGER_BITS:
+            raise ValueError("the result is too large")
+        return result
+    raise ValueError(f"unsupported syntax: {ast.dump(node)[:40]}")
+
+
+class CalculatorInput(BaseModel):
+    expression: str = Field(description="An arithmetic expression, e.g. '(1200 * 0.15) / 12'.")
+
+
+@tool(args_schema=CalculatorInput)
+def calculator(expression: str) -> str:
+    """
+    Evaluates an arithmetic expression with numbers, parentheses and the operators + - * / // % **.
+    Use it for exact arithmetic instead of computing in your head.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        return f"Error: expressions are limited to {MAX_EXPRESSION_LENGTH} characters."
+    try:
+        return str(_evaluate(ast.parse(expression, mode="eval").body))
+    except (SyntaxError, ValueError, ArithmeticError) as e:
+        return f"Error evaluating '{expression}': {e}"
+
+
+calculator.metadata = {"execution": INLINE}
+
 TOOL_REGISTRY = {
     "web_search": web_search,
+    "calculator": calculator,
 }
+
+
+def tool_execution_class(tool_name: str) -> str:
+    """``INLINE`` or ``QUEUED``; unknown tools are queued so that `run_tool` reports them."""
+    tool_obj = TOOL_REGISTRY.get(tool_name)
+    metadata = getattr(tool_obj, "metadata", None) or {}
+    return INLINE if metadata.get("execution") == INLINE else QUEUED
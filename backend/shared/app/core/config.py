@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -9,13 +11,192 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "a_default_secret_key_that_must_be_overridden"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 # 24 hours
+    # Verified tokens and user records are cached in-process by the gateway for
+    # this many seconds (0 disables the cache). Changes made through another
+    # gateway process become visible after at most this long.
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_ENTRIES: int = 10_000
+    # (group, user) authorization decisions, including denials, are cached the
+    # same way. 0 disables the cache. Group changes are broadcast to every
+    # gateway process over Redis pub/sub; one that misses the broadcast (Redis
+    # unavailable) keeps allowing a deleted or transferred group for up to
+    # this long.
+    AUTHZ_CACHE_TTL_SECONDS: int = 30
+    AUTHZ_CACHE_MAX_ENTRIES: int = 10_000
+    # bcrypt cost factor (log2 of the rounds) for new hashes. Stored hashes
+    # with a different cost are rehashed on the user's next login.
+    BCRYPT_ROUNDS: int = 12
+    # bcrypt runs in a dedicated thread pool of this size, off the event loop.
+    PASSWORD_HASH_WORKERS: int = 4
+    # Password operations allowed to wait for a worker before new logins and
+    # registrations are rejected with 503.
+    PASSWORD_HASH_MAX_QUEUE: int = 256
 
     # --- Database Settings ---
     DATABASE_URL: str
+    # Optional streaming replica for read-only workloads (history, group
+    # listing and details). Defaults to DATABASE_URL.
+    DATABASE_READ_URL: str | None = None
+    # Connection pool, applied to each engine (ignored for SQLite). With a
+    # replica every process holds up to 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    # connections. The defaults are SQLAlchemy's.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg prepared-statement cache size per connection.
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    # PgBouncer in transaction/statement pooling mode cannot keep prepared
+    # statements across transactions: disables statement caching and gives
+    # every prepared statement a unique name.
+    DB_PGBOUNCER_MODE: bool = False
 
     # --- Redis Settings ---
     REDIS_URL: str
 
+    # --- WebSocket Fan-out Settings ---
+    # Maximum number of outbound frames buffered per WebSocket connection.
+    WS_SEND_QUEUE_SIZE: int = 256
+    # What happens when a connection's queue is full: drop the oldest frame,
+    # coalesce frames that share a key (falling back to dropping the oldest),
+    # or disconnect the client with a resync hint.
+    WS_SLOW_CONSUMER_POLICY: Literal["drop_oldest", "coalesce", "disconnect"] = "drop_oldest"
+    # A single send taking longer than this marks the connection as stalled.
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0
+
+    # --- Group Event Stream Settings ---
+    # Approximate number of recent events kept per group for WebSocket replay.
+    GROUP_EVENT_STREAM_MAXLEN: int = 1000
+    # Idle streams (no new events) are removed after this many seconds.
+    GROUP_EVENT_STREAM_TTL_SECONDS: int = 60 * 60 * 24 * 7 # 7 days
+
+    # --- Recent History Cache Settings ---
+    # Number of newest messages kept per group in a Redis list. First-page
+    # history requests up to this size are served from the cache.
+    HISTORY_CACHE_SIZE: int = 50
+    # Cached lists of inactive groups expire after this many seconds.
+    HISTORY_CACHE_TTL_SECONDS: int = 60 * 60 # 1 hour
+
+    # --- Turn Status Settings ---
+    # Per-turn progress hashes in Redis expire this many seconds after their
+    # last update.
+    TURN_STATUS_TTL_SECONDS: int = 60 * 60 * 24 # 24 hours
+
+    # --- Turn Queue Settings ---
+    # A group runs one turn at a time. A message to an idle group starts a
+    # turn at once; later messages sent within this many seconds of the
+    # previous one, or while a turn is in flight, are merged into the
+    # group's next turn (see utils/turn_queue.py). Groups can override it.
+    USER_MESSAGE_DEBOUNCE_SECONDS: float = 1.0
+    # A turn that stops making progress releases its group after this long.
+    ACTIVE_TURN_TTL_SECONDS: int = 60 * 30 # 30 minutes
+
+    # --- Token Budget Settings ---
+    # Token usage reported by the LLMs is summed per turn and per group and
+    # UTC day in Redis. Once a budget is spent the router stops dispatching
+    # and asks the Orchestrator to conclude (0 disables a budget).
+    TURN_TOKEN_BUDGET: int = 0
+    GROUP_DAILY_TOKEN_BUDGET: int = 0
+    GROUP_DAILY_COST_BUDGET_USD: float = 0.0
+    # USD per million [input, output] tokens, by model name, e.g.
+    # {"gpt-4o": [2.5, 10]}. Models without a price add no cost.
+    LLM_TOKEN_PRICES_USD_PER_MILLION: dict[str, tuple[float, float]] = {}
+    # Days of per-group usage kept for GET /groups/{group_id}/usage.
+    USAGE_RETENTION_DAYS: int = 31
+
+    # --- Loop Detection Settings ---
+    # The router ends a turn whose agents repeat themselves or stop adding
+    # new content. Messages are compared as sets of word shingles.
+    LOOP_DETECTION_ENABLED: bool = True
+    LOOP_SHINGLE_SIZE: int = 3
+    # A message this similar (Jaccard) to LOOP_MAX_REPEATS earlier messages of
+    # the same sender in the turn is a repetition (LOOP_MAX_REPEATS=0 disables
+    # the check).
+    LOOP_SIMILARITY_THRESHOLD: float = 0.9
+    LOOP_MAX_REPEATS: int = 2
+    # The turn stagnates when each of the last LOOP_STAGNATION_WINDOW agent
+    # messages has less than LOOP_MIN_NOVELTY new shingles (0 disables it).
+    LOOP_STAGNATION_WINDOW: int = 4
+    LOOP_MIN_NOVELTY: float = 0.1
+
+    # --- Orchestrator Cascade Settings ---
+    # The Orchestrator of new groups. With a fast model configured, each
+    # Orchestrator call tries it first and escalates to the strong model only
+    # when the fast output fails validation (see agents/cascade.py).
+    ORCHESTRATOR_PROVIDER: str = "gemini"
+    ORCHESTRATOR_MODEL: str = "gemini-2.5-pro"
+    ORCHESTRATOR_FAST_PROVIDER: str | None = "gemini"
+    ORCHESTRATOR_FAST_MODEL: str | None = "gemini-2.5-flash"
+    # Fast outputs whose mean token probability is below this escalate. Only
+    # providers that return logprobs (OpenAI) are checked, so the default
+    # Gemini fast model never is; 0 disables it.
+    ORCHESTRATOR_CASCADE_MIN_CONFIDENCE: float = 0.0
+    # Escalate fast outputs that neither mention an agent nor end the task.
+    # Off by default: such an output is a valid reply to the user.
+    ORCHESTRATOR_CASCADE_REQUIRE_DECISION: bool = False
+
+    # --- Speculative Dispatch Settings ---
+    # Streams the Orchestrator and starts an agent as soon as a completed line
+    # of the stream mentions it, before the router has run. The result is
+    # used if the final message starts with the same text and does not
+    # address the agent again after it, and discarded otherwise (see
+    # utils/speculation.py).
+    SPECULATIVE_DISPATCH_ENABLED: bool = False
+    # Unadopted speculative results are dropped after this many seconds.
+    SPECULATIVE_RESULT_TTL_SECONDS: int = 600
+
+    # --- Worker Metrics Settings ---
+    # The arq workers serve their metrics in Prometheus text format on this
+    # port (0 disables it).
+    WORKER_METRICS_PORT: int = 9101
+
+    # --- Inline Tool Settings ---
+    # Tools declared "inline" (see agents/tools.py) run in the Orchestrator's
+    # dispatcher instead of an execution worker; a call taking longer than
+    # this returns an error as its result.
+    INLINE_TOOL_TIMEOUT_SECONDS: float = 2.0
+
+    # --- Job Transport Settings ---
+    # "arq" leaves every job on arq's polled queues. "stream" sends immediate
+    # jobs through Redis Streams, which the workers consume with blocking
+    # reads instead of polling (see core/job_stream.py). Deferred and cron
+    # jobs stay on arq either way.
+    JOB_TRANSPORT: Literal["arq", "stream"] = "arq"
+    # How long a worker's blocking read waits before it looks for stale entries.
+    JOB_STREAM_BLOCK_MS: int = 5000
+    # Concurrent stream jobs per worker (arq's max_jobs default).
+    JOB_STREAM_MAX_JOBS: int = 10
+    # Entries unacknowledged this long (a dead worker) are redelivered, at
+    # most JOB_STREAM_MAX_DELIVERIES times before going to the dead letters.
+    JOB_STREAM_CLAIM_IDLE_SECONDS: float = 60.0
+    JOB_STREAM_MAX_DELIVERIES: int = 3
+    # How often a running stream job checks whether it was aborted (a
+    # cancelled turn or a discarded speculation).
+    JOB_STREAM_ABORT_POLL_SECONDS: float = 0.5
+    # Approximate number of entries kept per stream.
+    JOB_STREAM_MAXLEN: int = 100000
+    # Jobs enqueued with a `_job_id` are deduplicated for this long.
+    JOB_STREAM_DEDUPE_TTL_SECONDS: int = 86400
+
+    # --- Outbox Relay Settings ---
+    # Maximum outbox rows enqueued into arq per relay pass.
+    OUTBOX_BATCH_SIZE: int = 100
+    # The relay is woken right after each commit; this poll only catches rows
+    # written by other processes or left behind by failed passes.
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+
+    # --- Message Archive Settings ---
+    # `messages` is range-partitioned by month. Partitions whose month ended
+    # more than this many months ago are exported to MESSAGE_ARCHIVE_DIR and
+    # dropped by the Orchestrator's nightly job (0 disables archival).
+    MESSAGE_HOT_MONTHS: int = 6
+    # Partitions are created this many months ahead of the current one.
+    MESSAGE_PARTITION_PREMAKE_MONTHS: int = 3
+    # Gzipped JSONL, one file per group and month. The gateway reads it for
+    # history pages past the hot range, so the directory must be shared.
+    MESSAGE_ARCHIVE_DIR: str = "/var/lib/synapse/message_archive"
+
     # --- LLM Provider Settings ---
     # API keys for external services
     OPENAI_API_KEY: str | None = None
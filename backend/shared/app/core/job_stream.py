@@ -0,0 +1,306 @@
+"""
+Push-based job transport on Redis Streams.
+
+An arq worker polls its queue every ``poll_delay`` (0.5 s by default), so
+every hop of a turn (gateway -> Orchestrator -> execution worker -> back)
+waits on average half a poll before it starts. With JOB_TRANSPORT="stream",
+`StreamArqRedis.enqueue_job` appends immediate jobs to the queue's stream
+(``synapse:jobs:<queue_name>``) instead, and a `JobStreamConsumer` in each
+worker blocks in XREADGROUP, so a job starts as soon as it is added. Job
+functions keep their signatures and are called with a ctx like arq's.
+Deferred jobs (``_defer_by``/``_defer_until``) and cron jobs still go
+through arq, which keeps running next to the consumer.
+
+Delivery is at least once. An entry is acknowledged once its function
+returns or raises; as with arq, a failed job is not retried. While a job
+runs its consumer keeps the entry claimed. Entries of a consumer that died
+are claimed by another one after JOB_STREAM_CLAIM_IDLE_SECONDS and run
+again, up to JOB_STREAM_MAX_DELIVERIES times; then they are moved to the
+queue's dead-letter stream (``...:dead``). Jobs are deduplicated by
+``_job_id`` like arq's, and jobs in arq's abort set are skipped, or
+cancelled within JOB_STREAM_ABORT_POLL_SECONDS while they run.
+"""
+import asyncio
+import os
+import socket
+import time
+import uuid
+from collections.abc import Callable
+
+import structlog
+from arq.connections import ArqRedis
+from arq.constants import abort_jobs_ss
+from arq.jobs import deserialize_job, serialize_job
+from redis.exceptions import ResponseError
+
+from .config import settings
+from .metrics import Counter, Histogram
+
+logger = structlog.get_logger(__name__)
+
+JOB_STREAM_PREFIX = "synapse:jobs"
+CONSUMER_GROUP = "workers"
+
+job_pickup_seconds = Histogram(
+    "synapse_job_pickup_seconds",
+    "Time from enqueuing a stream job to its function starting.",
+    ["queue"],
+)
+job_stream_deliveries = Counter(
+    "synapse_job_stream_deliveries_total",
+    "Stream jobs by outcome: completed, failed, redelivered, aborted or dead-lettered.",
+    ["queue", "outcome"],
+)
+
+
+def job_stream_key(queue_name: str) -> str:
+    return f"{JOB_STREAM_PREFIX}:{queue_name}"
+
+
+def dead_letter_key(queue_name: str) -> str:
+    return f"{JOB_STREAM_PREFIX}:{queue_name}:dead"
+
+
+def job_dedupe_key(job_id: str) -> str:
+    return f"{JOB_STREAM_PREFIX}:dedupe:{job_id}"
+
+
+# Marks the job id as enqueued and adds the entry in one step: a failed or
+# interrupted enqueue leaves no dedupe key behind, so a retry still adds it.
+_ENQUEUE_ONCE_SCRIPT = """
+if redis.call('SET', KEYS[1], 1, 'NX', 'EX', ARGV[1]) then
+    return redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[2], '*', 'job_id', ARGV[3], 'job', ARGV[4])
+end
+return false
+"""
+
+
+def _ms() -> int:
+    return int(time.time() * 1000)
+
+
+class StreamJob:
+    """What `StreamArqRedis.enqueue_job` returns; only ``job_id`` is used by callers."""
+
+    def __init__(self, job_id: str, queue_name: str):
+        self.job_id = job_id
+        self.queue_name = queue_name
+
+
+class StreamArqRedis(ArqRedis):
+    """An arq pool whose immediate jobs go to the queue's stream."""
+
+    async def enqueue_job(
+        self,
+        function: str,
+        *args,
+        _job_id: str | None = None,
+        _queue_name: str | None = None,
+        _defer_until=None,
+        _defer_by=None,
+        _expires=None,
+        _job_try: int | None = None,
+        **kwargs,
+    ):
+        if _defer_until is not None or _defer_by:
+            return await super().enqueue_job(
+                function, *args, _job_id=_job_id, _queue_name=_queue_name, _defer_until=_defer_until,
+                _defer_by=_defer_by, _expires=_expires, _job_try=_job_try, **kwargs,
+            )
+        queue_name = _queue_name or self.default_queue_name
+        job_id = _job_id or uuid.uuid4().hex
+        payload = serialize_job(function, args, kwargs, _job_try, _ms(), serializer=self.job_serializer)
+        if _job_id is None:
+            await self.xadd(
+                job_stream_key(queue_name), {"job_id": job_id, "job": payload},
+                maxlen=settings.JOB_STREAM_MAXLEN, approximate=True,
+            )
+        elif await self.eval(
+            _ENQUEUE_ONCE_SCRIPT, 2, job_dedupe_key(job_id), job_stream_key(queue_name),
+            settings.JOB_STREAM_DEDUPE_TTL_SECONDS, settings.JOB_STREAM_MAXLEN, job_id, payload,
+        ) is None:
+            return None
+        return StreamJob(job_id, queue_name)
+
+
+def with_job_streams(pool: ArqRedis, default_queue_name: str | None = None) -> ArqRedis:
+    """
+    The pool to enqueue with: ``pool`` itself with the arq transport, or a
+    `StreamArqRedis` sharing its connections with the stream transport.
+    """
+    if settings.JOB_TRANSPORT != "stream":
+        return pool
+    stream_pool = StreamArqRedis(
+        pool.connection_pool,
+        job_serializer=pool.job_serializer,
+        job_deserializer=pool.job_deserializer,
+        default_queue_name=default_queue_name or pool.default_queue_name,
+    )
+    # Closing it closes the connections, as closing ``pool`` would.
+    stream_pool.auto_close_connection_pool = pool.auto_close_connection_pool
+    return stream_pool
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class JobStreamConsumer:
+    """Runs one worker's jobs from its queue's stream."""
+
+    def __init__(self, redis: ArqRedis, ctx: dict, queue_name: str, functions: list[Callable], *, max_jobs: int):
+        self.redis = redis
+        self.ctx = ctx
+        self.queue_name = queue_name
+        self.stream = job_stream_key(queue_name)
+        self.functions = {function.__name__: function for function in functions}
+        self.consumer = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.max_jobs = max_jobs
+        self.claim_idle_ms = int(settings.JOB_STREAM_CLAIM_IDLE_SECONDS * 1000)
+        self._running: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        try:
+            await self.redis.xgroup_create(self.stream, CONSUMER_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._task = asyncio.create_task(self._run())
+        logger.info("job_stream.consumer_started", stream=self.stream, consumer=self.consumer)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        # Unfinished entries stay pending and are claimed by another consumer.
+        for task in self._running:
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+        logger.info("job_stream.consumer_stopped", stream=self.stream, consumer=self.consumer)
+
+    async def _run(self) -> None:
+        next_claim = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_claim:
+                    await self.claim_stale()
+                    next_claim = time.monotonic() + settings.JOB_STREAM_CLAIM_IDLE_SECONDS / 2
+                await self.read_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("job_stream.read_failed", stream=self.stream, error=str(e), exc_info=True)
+                await asyncio.sleep(1.0)
+
+    async def _free_slots(self) -> int:
+        while len(self._running) >= self.max_jobs:
+            await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+        return self.max_jobs - len(self._running)
+
+    async def read_once(self) -> int:
+        """Waits up to JOB_STREAM_BLOCK_MS for new entries and starts them."""
+        response = await self.redis.xreadgroup(
+            CONSUMER_GROUP, self.consumer, {self.stream: ">"},
+            count=await self._free_slots(), block=settings.JOB_STREAM_BLOCK_MS,
+        )
+        started = 0
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                self._spawn(entry_id, fields, 1)
+                started += 1
+        return started
+
+    async def claim_stale(self) -> int:
+        """Takes over entries that another consumer left unacknowledged for too long."""
+        pending = await self.redis.xpending_range(
+            self.stream, CONSUMER_GROUP, min="-", max="+", count=await self._free_slots(), idle=self.claim_idle_ms
+        )
+        claimed = 0
+        for entry in pending:
+            deliveries = entry["times_delivered"]
+            entries = await self.redis.xclaim(
+                self.stream, CONSUMER_GROUP, self.consumer, self.claim_idle_ms, [entry["message_id"]]
+            )
+            for entry_id, fields in entries:
+                if not fields:
+                    # Trimmed from the stream: nothing left to run.
+                    await self.redis.xack(self.stream, CONSUMER_GROUP, entry_id)
+                elif deliveries >= settings.JOB_STREAM_MAX_DELIVERIES:
+                    await self._dead_letter(entry_id, fields, deliveries)
+                else:
+                    job_stream_deliveries.inc(queue=self.queue_name, outcome="redelivered")
+                    logger.warn("job_stream.redelivered", stream=self.stream, entry_id=_text(entry_id), deliveries=deliveries + 1)
+                    self._spawn(entry_id, fields, deliveries + 1)
+                    claimed += 1
+        return claimed
+
+    async def _dead_letter(self, entry_id, fields: dict, deliveries: int) -> None:
+        await self.redis.xadd(dead_letter_key(self.queue_name), {**fields, "entry_id": entry_id, "deliveries": deliveries})
+        await self.redis.xack(self.stream, CONSUMER_GROUP, entry_id)
+        job_stream_deliveries.inc(queue=self.queue_name, outcome="dead_lettered")
+        logger.error("job_stream.dead_lettered", stream=self.stream, entry_id=_text(entry_id), deliveries=deliveries)
+
+    def _spawn(self, entry_id, fields: dict, deliveries: int) -> None:
+        task = asyncio.create_task(self.handle(entry_id, fields, deliveries))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def handle(self, entry_id, fields: dict, deliveries: int) -> None:
+        """
+        Runs one entry's job and acknowledges it. A cancelled handler (the
+        worker shutting down) leaves the entry pending for redelivery.
+        """
+        job_id = _text(fields[b"job_id"])
+        try:
+            outcome = await self._execute(entry_id, job_id, fields[b"job"], deliveries)
+        except Exception as e:
+            logger.error("job_stream.job_failed", job_id=job_id, error=str(e), exc_info=True)
+            outcome = "failed"
+        job_stream_deliveries.inc(queue=self.queue_name, outcome=outcome)
+        await self.redis.xack(self.stream, CONSUMER_GROUP, entry_id)
+
+    async def _execute(self, entry_id, job_id: str, payload: bytes, deliveries: int) -> str:
+        if await self.redis.zscore(abort_jobs_ss, job_id) is not None:
+            logger.info("job_stream.job_aborted", job_id=job_id)
+            return "aborted"
+        job = deserialize_job(payload, deserializer=self.redis.job_deserializer)
+        function = self.functions.get(job.function)
+        if function is None:
+            logger.error("job_stream.unknown_function", function=job.function, job_id=job_id)
+            return "failed"
+        job_pickup_seconds.observe(max(time.time() - job.enqueue_time.timestamp(), 0.0), queue=self.queue_name)
+        job_ctx = {**self.ctx, "job_id": job_id, "job_try": deliveries, "enqueue_time": job.enqueue_time, "score": None}
+
+        task = asyncio.create_task(function(job_ctx, *job.args, **job.kwargs))
+        next_heartbeat = time.monotonic() + self.claim_idle_ms / 3000
+        try:
+            while not (await asyncio.wait({task}, timeout=settings.JOB_STREAM_ABORT_POLL_SECONDS))[0]:
+                # Still running: keep the entry from being claimed, and honor aborts.
+                if time.monotonic() >= next_heartbeat:
+                    await self.redis.xclaim(self.stream, CONSUMER_GROUP, self.consumer, 0, [entry_id], justid=True)
+                    next_heartbeat = time.monotonic() + self.claim_idle_ms / 3000
+                if await self.redis.zscore(abort_jobs_ss, job_id) is not None:
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    logger.info("job_stream.job_aborted", job_id=job_id)
+                    return "aborted"
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        await task
+        return "completed"
+
+
+async def start_job_stream_consumer(ctx: dict, queue_name: str, functions: list[Callable]) -> JobStreamConsumer | None:
+    """
+    In a worker's ``on_startup``: with the stream transport, makes the jobs'
+    ``ctx["redis"]`` enqueue through streams and starts consuming
+    ``queue_name``. Returns None with the arq transport.
+    """
+    if settings.JOB_TRANSPORT != "stream":
+        return None
+    ctx["redis"] = with_job_streams(ctx["redis"], queue_name)
+    consumer = JobStreamConsumer(ctx["redis"], ctx, queue_name, functions, max_jobs=settings.JOB_STREAM_MAX_JOBS)
+    await consumer.start()
+    return consumer
@@ -1,9 +1,11 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import uuid
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 from collections.abc import AsyncGenerator
 import structlog
 
-from .core.config import settings
+from .core.config import Settings, settings
 from .core.logging import setup_logging
 
 setup_logging()
@@ -12,11 +14,56 @@ logger = structlog.get_logger(__name__)
 DATABASE_URL = settings.DATABASE_URL
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
+DATABASE_READ_URL = settings.DATABASE_READ_URL or DATABASE_URL
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+def engine_options(url: str, config: Settings = settings) -> dict:
+    """Keyword arguments for `create_async_engine`, derived from the pool settings."""
+    parsed = make_url(url)
+    options: dict = {"pool_pre_ping": config.DB_POOL_PRE_PING}
+    if parsed.get_backend_name() == "sqlite":
+        # SQLite picks its own pool class; sizing arguments do not apply.
+        return options
+
+    options.update(
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=config.DB_POOL_RECYCLE_SECONDS,
+    )
+    if parsed.get_driver_name() == "asyncpg":
+        if config.DB_PGBOUNCER_MODE:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": _unique_statement_name,
+            }
+        else:
+            options["connect_args"] = {
+                "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+            }
+    return options
+
+
+def build_engines(write_url: str, read_url: str | None = None, config: Settings = settings) -> tuple[AsyncEngine, AsyncEngine]:
+    """Creates the primary engine and, when ``read_url`` differs, a replica engine."""
+    write_engine = create_async_engine(write_url, **engine_options(write_url, config))
+    if not read_url or read_url == write_url:
+        return write_engine, write_engine
+    return write_engine, create_async_engine(read_url, **engine_options(read_url, config))
+
 
 try:
-    engine = create_async_engine(DATABASE_URL)
+    engine, read_engine = build_engines(DATABASE_URL, DATABASE_READ_URL)
     AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
-    logger.info("db.engine_created")
+    # Sessions for read-only workloads; the primary when no replica is configured.
+    AsyncReadSessionLocal = async_sessionmaker(read_engine, expire_on_commit=False)
+    logger.info("db.engine_created", read_replica=read_engine is not engine)
 except SQLAlchemyError as e:
     logger.error("db.connection_failed", error=str(e))
     raise RuntimeError(f"Failed to connect to database: {e}")
@@ -25,3 +72,12 @@ async def get_db_session() -> AsyncGenerator[async_sessionmaker, None]:
     """Dependency to get a DB session."""
     logger.debug("db.session_requested")
     yield AsyncSessionLocal
+
+
+async def get_read_db_session() -> AsyncGenerator[async_sessionmaker, None]:
+    """
+    Dependency to get a session on the read replica. Replicas lag slightly,
+    so use it only where a read need not observe the caller's own last write.
+    """
+    logger.debug("db.read_session_requested")
+    yield AsyncReadSessionLocal
@@ -0,0 +1,16 @@
+from datetime import date, datetime
+from sqlalchemy import BigInteger, Date, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+
+class MessageArchive(Base):
+    """
+    A month of messages that was exported to the archive directory. The row is
+    written in the same transaction that drops the month's `messages`
+    partition, so a month is always either in Postgres or listed here.
+    """
+    __tablename__ = "message_archives"
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+    row_count: Mapped[int] = mapped_column(BigInteger)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, func, ForeignKey, JSON, Text, Float # Added Float
+from sqlalchemy import String, DateTime, func, ForeignKey, JSON, Text, Float, Index # Added Float
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .base import Base
 
@@ -21,6 +22,10 @@ class GroupMember(Base):
     provider: Mapped[str] = mapped_column(String(50), default="openai")
     model: Mapped[str] = mapped_column(String(100), default="gpt-4o")
     temperature: Mapped[float] = mapped_column(Float, default=0.1) # Ensured Float type
+    # Orchestrator only: a fast model asked before `model`, which is used only
+    # when the fast output fails validation (see agents/cascade.py).
+    fast_provider: Mapped[str | None] = mapped_column(String(50))
+    fast_model: Mapped[str | None] = mapped_column(String(100))
 
     group: Mapped["ChatGroup"] = relationship(back_populates="members")
 
@@ -30,6 +35,13 @@ class ChatGroup(Base):
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     owner_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id"), index=True)
     name: Mapped[str] = mapped_column(String(255))
+    # When the router may bypass the Orchestrator LLM: "always" consults it,
+    # "auto" dispatches user @mentions and single-agent groups directly,
+    # "direct" also ends such turns with the agent's reply (see route_logic).
+    orchestrator_mode: Mapped[str] = mapped_column(String(20), default="auto", server_default="auto")
+    # Debounce window for bursts of user messages (see utils/turn_queue.py);
+    # NULL uses USER_MESSAGE_DEBOUNCE_SECONDS.
+    message_debounce_seconds: Mapped[float | None] = mapped_column(Float, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
 
@@ -44,15 +56,29 @@ class ChatGroup(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Serves history pages: equality on group_id, then a keyset range scan
+        # over (timestamp, id) in either direction.
+        Index("ix_messages_group_id_timestamp_id", "group_id", "timestamp", "id"),
+        # Monthly partitions, created ahead of time and archived by the
+        # Orchestrator (see orchestrator_service/app/partitions.py).
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+    # Postgres requires the partition key in every unique constraint, so the
+    # primary key is (id, timestamp).
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
-    group_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("chat_groups.id"), index=True)
+    # Covered by the leading column of ix_messages_group_id_timestamp_id.
+    group_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("chat_groups.id"))
     turn_id: Mapped[uuid.UUID] = mapped_column(index=True)
     sender_alias: Mapped[str] = mapped_column(String(100))
     content: Mapped[str] = mapped_column(String)
-    parent_message_id: Mapped[uuid.UUID | None] = mapped_column(
-        ForeignKey("messages.id")
-    )
-    timestamp: Mapped[datetime] = mapped_column(DateTime, default=func.now(), index=True)
-    meta: Mapped[dict | None] = mapped_column(JSON)
+    # Not a foreign key: there is no unique constraint on `id` alone to reference.
+    parent_message_id: Mapped[uuid.UUID | None] = mapped_column()
+    timestamp: Mapped[datetime] = mapped_column(DateTime, primary_key=True, default=func.now(), index=True)
+    # Only what the other columns do not hold (see compact_message_meta).
+    # JSONB on Postgres, with indexes on tool_calls and tool_call_id.
+    meta: Mapped[dict | None] = mapped_column(JSON().with_variant(JSONB, "postgresql"))
+    # Postgres also has a generated `content_tsv` column for search (see the
+    # groups router); it is left unmapped so the ORM never selects it.
 
     group: Mapped["ChatGroup"] = relationship(back_populates="messages")
\ No newline at end of file
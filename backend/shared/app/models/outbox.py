@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Integer, JSON, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+from .base import Base
+
+
+class OutboxEvent(Base):
+    """
+    A job to enqueue into arq, written in the same transaction as the data that
+    triggers it. The gateway's outbox relay enqueues pending rows in batches and
+    deletes them once arq has accepted the job.
+    """
+    __tablename__ = "outbox_events"
+    # BIGSERIAL on Postgres; SQLite only auto-increments INTEGER primary keys.
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    job_name: Mapped[str] = mapped_column(String(100))
+    queue_name: Mapped[str] = mapped_column(String(100))
+    job_kwargs: Mapped[dict] = mapped_column(JSON)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text)
@@ -1,6 +1,6 @@
 import uuid
 from pydantic import BaseModel, Field
-from datetime import datetime # Added for MessageHistoryRead
+from datetime import date, datetime # Added for MessageHistoryRead
 
 class MessageCreate(BaseModel):
     content: str = Field(..., min_length=1, max_length=1000)
@@ -27,4 +27,55 @@ class MessageHistoryRead(BaseModel):
     meta: dict | None = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class MessageSearchResult(BaseModel):
+    """A message matching a history search, with its rank and a highlighted excerpt."""
+    id: uuid.UUID
+    group_id: uuid.UUID
+    turn_id: uuid.UUID
+    sender_alias: str
+    timestamp: datetime
+    rank: float
+    # Matching terms wrapped in <mark>...</mark>.
+    snippet: str
+
+class TurnStatusRead(BaseModel):
+    """Live progress of a conversation turn, as kept by the Orchestrator in Redis."""
+    turn_id: uuid.UUID
+    group_id: uuid.UUID
+    # queued, running, awaiting_agents, awaiting_tools, completed, max_turns,
+    # budget_exhausted, loop_detected, failed, cancelled or merged (its
+    # message was merged into another turn).
+    phase: str
+    # Agent aliases or tool names the turn is waiting on.
+    pending: list[str]
+    gather_id: str | None = None
+    turn_count: int
+    started_at: datetime
+    updated_at: datetime
+    # Increases with every update; clients keep the highest they have seen.
+    version: int
+
+class DailyUsageRead(BaseModel):
+    """LLM token usage of a group on one UTC day."""
+    date: date
+    input_tokens: int
+    output_tokens: int
+    total_tokens: int
+    # Zero for models without a configured price.
+    cost_usd: float
+    # Orchestrator LLM calls the router's fast paths skipped.
+    orchestrator_calls_saved: int = 0
+
+class UsageBudgetsRead(BaseModel):
+    """Configured budgets; None means unlimited."""
+    turn_tokens: int | None = None
+    daily_tokens: int | None = None
+    daily_cost_usd: float | None = None
+
+class GroupUsageRead(BaseModel):
+    group_id: uuid.UUID
+    budgets: UsageBudgetsRead
+    # Newest first, starting with today.
+    days: list[DailyUsageRead]
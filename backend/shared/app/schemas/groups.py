@@ -1,7 +1,11 @@
 import uuid
+from typing import Literal
 from pydantic import BaseModel, Field, validator
 from datetime import datetime
 
+# See ChatGroup.orchestrator_mode.
+OrchestratorMode = Literal["always", "auto", "direct"]
+
 
 class AgentConfigCreate(BaseModel):
     """Configuration for creating a non-user agent member."""
@@ -33,18 +37,39 @@ class AgentConfigUpdate(BaseModel):
             raise ValueError('Alias cannot be "Orchestrator" or "User"')
         return v
 
+class OrchestratorConfig(BaseModel):
+    """
+    Models of a group's Orchestrator. Leaving out the fast model (or setting
+    it to null) disables the cascade. Defaults come from the ORCHESTRATOR_*
+    settings.
+    """
+    provider: str
+    model: str
+    fast_provider: str | None = None
+    fast_model: str | None = None
+
 class GroupCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     members: list[AgentConfigCreate] = Field(default_factory=list)
+    orchestrator_mode: OrchestratorMode = "auto"
+    orchestrator: OrchestratorConfig | None = None
+    # See ChatGroup.message_debounce_seconds; null uses the server default.
+    message_debounce_seconds: float | None = Field(default=None, ge=0.0, le=30.0)
 
 class GroupUpdate(BaseModel):
     """Schema for updating a group's mutable properties (e.g., name)."""
     name: str = Field(..., min_length=1, max_length=100)
+    # Left unchanged when omitted.
+    orchestrator_mode: OrchestratorMode | None = None
+    # Left unchanged when omitted; null restores the server default.
+    message_debounce_seconds: float | None = Field(default=None, ge=0.0, le=30.0)
 
 
 class GroupRead(BaseModel):
     id: uuid.UUID
     name: str
+    orchestrator_mode: OrchestratorMode = "auto"
+    message_debounce_seconds: float | None = None
 
     class Config:
         from_attributes = True
@@ -62,6 +87,8 @@ class GroupMemberRead(BaseModel):
     provider: str
     model: str
     temperature: float
+    fast_provider: str | None = None
+    fast_model: str | None = None
 
     class Config:
         from_attributes = True
@@ -71,6 +98,8 @@ class GroupDetailRead(BaseModel):
     """Detailed information about a chat group, including its members."""
     id: uuid.UUID
     name: str
+    orchestrator_mode: OrchestratorMode = "auto"
+    message_debounce_seconds: float | None = None
     owner_id: uuid.UUID
     created_at: datetime
     updated_at: datetime
@@ -0,0 +1,95 @@
+import json
+
+from redis.asyncio import Redis
+
+from ..core.config import settings
+
+GROUP_EVENT_STREAM_PREFIX = "synapse:events"
+
+
+def encode_event(payload: dict) -> bytes:
+    """Encodes an event once, compactly; the gateway forwards these bytes as they are."""
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def message_event(message_id: str, sender: str, content: str, turn_id: str, has_meta: bool = False) -> dict:
+    """
+    The slim envelope broadcast for a new message. Timestamp, parent and
+    ``meta`` stay out of it: the event id the gateway adds carries the append
+    time, and ``has_meta`` tells clients to fetch the full message from
+    ``GET /groups/{group_id}/messages/{message_id}``.
+    """
+    event = {"id": message_id, "sender": sender, "content": content, "turn": turn_id}
+    if has_meta:
+        event["has_meta"] = True
+    return event
+
+
+def group_stream_key(group_id: str) -> str:
+    """Redis Stream holding the recent events of one chat group."""
+    return f"{GROUP_EVENT_STREAM_PREFIX}:{group_id}"
+
+
+def decode_stream_id(stream_id: str | bytes) -> str:
+    return stream_id.decode("utf-8") if isinstance(stream_id, bytes) else stream_id
+
+
+def parse_stream_id(stream_id: str | bytes) -> tuple[int, int]:
+    """Turns a stream id such as ``1718000000000-3`` into a comparable tuple."""
+    raw = decode_stream_id(stream_id)
+    millis, _, seq = raw.partition("-")
+    return int(millis), int(seq or 0)
+
+
+async def append_group_event(
+    redis: Redis, group_id: str, payload: dict | bytes, coalesce_key: str | None = None
+) -> str:
+    """
+    Appends an event to the group's capped stream and returns its stream id.
+    The stream is trimmed approximately to GROUP_EVENT_STREAM_MAXLEN entries and
+    expires after GROUP_EVENT_STREAM_TTL_SECONDS without new events.
+
+    ``payload`` may already be encoded with ``encode_event``.
+    ``coalesce_key`` identifies events that supersede each other (e.g. updates
+    of the same message) for the gateway's slow-consumer handling.
+    """
+    key = group_stream_key(group_id)
+    fields = {"data": payload if isinstance(payload, bytes) else encode_event(payload)}
+    if coalesce_key:
+        fields["key"] = coalesce_key
+    pipe = redis.pipeline()
+    pipe.xadd(
+        key,
+        fields,
+        maxlen=settings.GROUP_EVENT_STREAM_MAXLEN,
+        approximate=True,
+    )
+    pipe.expire(key, settings.GROUP_EVENT_STREAM_TTL_SECONDS)
+    event_id, _ = await pipe.execute()
+    return decode_stream_id(event_id)
+
+
+def normalize_stream_id(stream_id: str | bytes) -> str:
+    millis, seq = parse_stream_id(stream_id)
+    return f"{millis}-{seq}"
+
+
+def stream_entry_coalesce_key(fields: dict) -> str | None:
+    key = fields.get(b"key", fields.get("key"))
+    return key.decode("utf-8") if isinstance(key, bytes) else key
+
+
+def stream_entry_to_frame(entry_id: str | bytes, fields: dict) -> bytes:
+    """
+    Builds the WebSocket frame for a stream entry by splicing its ``event_id``
+    into the stored JSON object, so the payload is never decoded.
+    """
+    data = fields.get(b"data", fields.get("data"))
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    data = data.rstrip() if data else b""
+    if not data.startswith(b"{") or not data.endswith(b"}") or len(data) < 3:
+        raise ValueError("stream entry data is not a non-empty JSON object")
+    if isinstance(entry_id, str):
+        entry_id = entry_id.encode("utf-8")
+    return b"".join((data[:-1], b',"event_id":"', entry_id, b'"}'))
@@ -0,0 +1,128 @@
+"""
+Write-through cache of the newest messages of each group.
+
+Each group has a Redis list (newest first) of serialized history rows, capped
+at HISTORY_CACHE_SIZE entries, plus a generation counter. Writers bump the
+generation and prepend to the list only if it already exists (LPUSHX), so a
+partial list is never created. A reader that misses loads the rows from
+Postgres and stores them only if the generation has not moved since it
+started, which keeps a slow reader from overwriting newer writes.
+"""
+import json
+import uuid
+from datetime import datetime
+
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+from ..core.config import settings
+
+HISTORY_CACHE_PREFIX = "synapse:history"
+
+
+def history_cache_key(group_id: str | uuid.UUID) -> str:
+    return f"{HISTORY_CACHE_PREFIX}:{group_id}"
+
+
+def history_generation_key(group_id: str | uuid.UUID) -> str:
+    return f"{HISTORY_CACHE_PREFIX}:{group_id}:gen"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def serialize_history_entry(row: dict) -> str:
+    """Serializes a history row (as returned by the history endpoint) for the cache."""
+    return json.dumps(row, default=_json_default)
+
+
+async def append_history_entries(redis: Redis, group_id: str | uuid.UUID, rows: list[dict]) -> None:
+    """
+    Write-through for newly committed messages, given oldest first. A no-op for
+    groups whose history is not currently cached.
+    """
+    if not rows:
+        return
+    key = history_cache_key(group_id)
+    gen_key = history_generation_key(group_id)
+    pipe = redis.pipeline(transaction=True)
+    pipe.incr(gen_key)
+    pipe.expire(gen_key, settings.HISTORY_CACHE_TTL_SECONDS)
+    for row in rows:
+        pipe.lpushx(key, serialize_history_entry(row))
+    pipe.ltrim(key, 0, settings.HISTORY_CACHE_SIZE - 1)
+    await pipe.execute()
+
+
+async def read_history(redis: Redis, group_id: str | uuid.UUID, limit: int) -> list[dict] | None:
+    """
+    Returns the newest ``limit`` cached rows, newest first, or None on a miss.
+    A list shorter than HISTORY_CACHE_SIZE holds the group's complete history.
+    """
+    if limit > settings.HISTORY_CACHE_SIZE:
+        return None
+    raw_entries = await redis.lrange(history_cache_key(group_id), 0, -1)
+    if not raw_entries:
+        return None
+
+    # A writer racing with the initial fill can prepend a row the fill
+    # already contained, so drop repeated ids before slicing.
+    rows, seen = [], set()
+    for raw in raw_entries:
+        row = json.loads(raw)
+        if row["id"] not in seen:
+            seen.add(row["id"])
+            rows.append(row)
+    rows.sort(key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+
+    complete = len(raw_entries) < settings.HISTORY_CACHE_SIZE
+    if len(rows) < limit and not complete:
+        return None
+    return rows[:limit]
+
+
+async def get_history_generation(redis: Redis, group_id: str | uuid.UUID) -> bytes | None:
+    """Snapshot to pass to `fill_history` after loading rows from the database."""
+    return await redis.get(history_generation_key(group_id))
+
+
+async def fill_history(
+    redis: Redis, group_id: str | uuid.UUID, rows: list[dict], generation: bytes | None
+) -> bool:
+    """
+    Stores ``rows`` (newest first) as the group's cached history, unless a
+    writer or an invalidation bumped the generation since ``generation`` was
+    read. Returns whether the cache was filled.
+    """
+    if not rows:
+        return False
+    key = history_cache_key(group_id)
+    gen_key = history_generation_key(group_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        try:
+            await pipe.watch(gen_key)
+            if await pipe.get(gen_key) != generation:
+                return False
+            pipe.multi()
+            pipe.delete(key)
+            pipe.rpush(key, *(serialize_history_entry(row) for row in rows[: settings.HISTORY_CACHE_SIZE]))
+            pipe.expire(key, settings.HISTORY_CACHE_TTL_SECONDS)
+            await pipe.execute()
+            return True
+        except WatchError:
+            return False
+
+
+async def invalidate_history(redis: Redis, group_id: str | uuid.UUID) -> None:
+    """Drops the cached history and fences off fills that are still in flight."""
+    gen_key = history_generation_key(group_id)
+    pipe = redis.pipeline(transaction=True)
+    pipe.incr(gen_key)
+    pipe.expire(gen_key, settings.HISTORY_CACHE_TTL_SECONDS)
+    pipe.delete(history_cache_key(group_id))
+    await pipe.execute()
@@ -0,0 +1,139 @@
+"""
+Cold storage for months of messages that left the hot range.
+
+The Orchestrator exports each expired monthly `messages` partition to
+MESSAGE_ARCHIVE_DIR as one gzipped JSONL file per group
+(`<YYYY-MM>/<group_id>.jsonl.gz`, rows oldest first, in the same shape as
+history cache entries), then records the month in `message_archives` and
+drops the partition in one transaction. The history endpoint continues into
+these files once a page runs past the rows still in Postgres.
+
+File access is blocking; async callers run these functions in a thread.
+"""
+import gzip
+import json
+import os
+import uuid
+from collections import deque
+from datetime import date, datetime
+from pathlib import Path
+
+from ..core.config import settings
+from .history_cache import serialize_history_entry
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"messages_p{month:%Y_%m}"
+
+
+def archive_path(month: date, group_id: str | uuid.UUID, base_dir: str | Path | None = None) -> Path:
+    return Path(base_dir or settings.MESSAGE_ARCHIVE_DIR) / f"{month:%Y-%m}" / f"{group_id}.jsonl.gz"
+
+
+class MonthArchiveWriter:
+    """
+    Writes one month's rows, which must arrive ordered by group. Each group's
+    file is written under a temporary name and renamed once complete, so a
+    crashed export never leaves a truncated archive behind and can be rerun.
+    """
+
+    def __init__(self, month: date, base_dir: str | Path | None = None) -> None:
+        self.month = month
+        self.base_dir = base_dir
+        self.row_count = 0
+        self._group_id: str | None = None
+        self._file = None
+        self._path: Path | None = None
+
+    def write(self, rows: list[dict]) -> None:
+        for row in rows:
+            group_id = str(row["group_id"])
+            if group_id != self._group_id:
+                self._finish_group()
+                self._open_group(group_id)
+            self._file.write(serialize_history_entry(row).encode("utf-8") + b"\n")
+            self.row_count += 1
+
+    def close(self) -> None:
+        self._finish_group()
+
+    def _open_group(self, group_id: str) -> None:
+        self._group_id = group_id
+        self._path = archive_path(self.month, group_id, self.base_dir)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self._path.with_suffix(".tmp"), "wb")
+
+    def _finish_group(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._path.with_suffix(".tmp"), self._path)
+        self._file = None
+
+
+def _row_key(row: dict) -> tuple[datetime, uuid.UUID]:
+    return row["timestamp"], uuid.UUID(row["id"])
+
+
+def read_archived_messages(
+    group_id: str | uuid.UUID,
+    months: list[date],
+    before: datetime | None,
+    before_id: uuid.UUID | None,
+    limit: int,
+    base_dir: str | Path | None = None,
+) -> list[dict]:
+    """
+    Returns up to ``limit`` archived rows of a group from ``months``, newest
+    first, strictly older than the keyset position ``(before, before_id)``
+    (or than ``before`` alone when ``before_id`` is None).
+
+    Files are ordered oldest first, so each one is read only up to the
+    position and only the newest rows still needed for the page are kept;
+    older months are not opened once the page is full.
+    """
+    rows: list[dict] = []
+    for month in sorted(months, reverse=True):
+        if len(rows) >= limit:
+            break
+        if before is not None and month > month_start(before):
+            continue
+        path = archive_path(month, group_id, base_dir)
+        if not path.exists():
+            continue
+        month_rows: deque[dict] = deque(maxlen=limit - len(rows))
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                row = json.loads(line)
+                row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+                if before is not None and (
+                    row["timestamp"] >= before if before_id is None else _row_key(row) >= (before, before_id)
+                ):
+                    break
+                month_rows.append(row)
+        rows.extend(reversed(month_rows))
+    return rows
+
+
+def archived_group_files(group_id: str | uuid.UUID, months: list[date], base_dir: str | Path | None = None) -> list[Path]:
+    """Existing archive files of a group for ``months``, oldest month first."""
+    paths = (archive_path(month, group_id, base_dir) for month in sorted(months))
+    return [path for path in paths if path.exists()]
+
+
+def delete_group_archives(group_id: str | uuid.UUID, base_dir: str | Path | None = None) -> int:
+    """Removes every archived file of a group. Returns the number of files removed."""
+    removed = 0
+    for path in Path(base_dir or settings.MESSAGE_ARCHIVE_DIR).glob(f"*/{group_id}.jsonl.gz"):
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
@@ -22,4 +22,32 @@ def deserialize_messages(messages_dict: list[dict]) -> list[BaseMessage]:
     return [
         load(m) if "lc" in m and m.get("type") == "constructor" else load(m)
         for m in messages_dict
-    ]
\ No newline at end of file
+    ]
+
+def compact_message_meta(message: BaseMessage) -> dict:
+    """
+    The part of a message that `messages` does not already store in its own
+    columns (content, sender alias and id are left out): the message type,
+    tool calls, the answered tool call id, token usage with the model that
+    answered, and the usage of LLM calls whose output was discarded. Empty
+    entries are omitted.
+    """
+    meta = {"type": message.type}
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        meta["tool_calls"] = [
+            {"id": call.get("id"), "name": call["name"], "args": call.get("args", {})}
+            for call in tool_calls
+        ]
+    tool_call_id = getattr(message, "tool_call_id", None)
+    if tool_call_id:
+        meta["tool_call_id"] = tool_call_id
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        meta["usage"] = dict(usage)
+    response_metadata = getattr(message, "response_metadata", None) or {}
+    if response_metadata.get("model_name"):
+        meta["model"] = response_metadata["model_name"]
+    if response_metadata.get("discarded_usage"):
+        meta["discarded_usage"] = response_metadata["discarded_usage"]
+    return meta
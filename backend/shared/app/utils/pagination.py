@@ -0,0 +1,45 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(timestamp: datetime, message_id: uuid.UUID) -> str:
+    """
+    Encodes the keyset position of a message as an opaque, URL-safe cursor.
+    Clients must treat the value as a black box and send it back unchanged.
+    """
+    raw = json.dumps({"ts": timestamp.isoformat(), "id": str(message_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Inverse of `encode_cursor`. Raises `InvalidCursorError` on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["ts"]), uuid.UUID(data["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from e
+
+
+def encode_search_cursor(rank: float, timestamp: datetime, message_id: uuid.UUID) -> str:
+    """Like `encode_cursor`, for search results ordered by rank first."""
+    raw = json.dumps(
+        {"rank": rank, "ts": timestamp.isoformat(), "id": str(message_id)}, separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, datetime, uuid.UUID]:
+    """Inverse of `encode_search_cursor`. Raises `InvalidCursorError` on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return float(data["rank"]), datetime.fromisoformat(data["ts"]), uuid.UUID(data["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from e
@@ -0,0 +1,33 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same result (or exception) instead of repeating
+    the work. Nothing is cached once the call completes.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """Runs ``fn`` for ``key`` and returns ``(result, shared)``, where
+        ``shared`` is True when the result came from another caller's call."""
+        task = self._calls.get(key)
+        if task is not None:
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shielded so that one caller being cancelled does not cancel the
+        # work the others are waiting for.
+        return await asyncio.shield(task), False
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
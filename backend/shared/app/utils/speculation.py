@@ -0,0 +1,270 @@
+"""
+Speculative agent dispatch while the Orchestrator is still streaming.
+
+With SPECULATIVE_DISPATCH_ENABLED, the execution worker running the
+Orchestrator streams its response. Once a line of the stream holding an
+``@[Alias]`` mention of an agent of the group is complete, a speculative
+``run_agent_llm`` job is enqueued for that agent against the history plus
+the Orchestrator's message up to that line. Its result is parked in a
+Redis hash (``synapse:speculation:<id>``) instead of being sent to the
+Orchestrator.
+
+When the Orchestrator's message is final, a speculation is confirmed if
+the message starts with its prefix and the rest of the message neither
+mentions nor names its alias: the agent saw everything addressed to it.
+Confirmed speculations are attached to the message
+(``additional_kwargs["speculations"]``, alias to speculation id); the others
+are aborted and discarded; the tokens of a discarded result still count
+against the budgets. The dispatcher then adopts a confirmed
+speculation instead of enqueuing a fresh job for the alias: whichever side
+comes second, the adoption or the speculative result, delivers the result
+to ``process_worker_result``. Speculations the router never dispatches are
+discarded by the dispatcher or expire after SPECULATIVE_RESULT_TTL_SECONDS.
+"""
+import json
+import re
+import time
+import uuid
+
+import structlog
+from langchain.load.dump import dumpd
+from langchain_core.messages import AIMessage, BaseMessage
+from redis.asyncio import Redis
+
+from ..agents.prompts import MENTION_REGEX
+from ..core.config import settings
+from ..core.metrics import Counter, Histogram
+from .message_serde import compact_message_meta, deserialize_messages
+from .turn_status import abort_jobs, register_turn_jobs
+from .usage import message_usage, record_usage
+
+logger = structlog.get_logger(__name__)
+
+SPECULATION_PREFIX = "synapse:speculation"
+
+speculative_dispatches = Counter(
+    "synapse_speculative_dispatch_total",
+    "Speculative agent jobs by outcome: launched, adopted by the dispatcher, or discarded.",
+    ["outcome"],
+)
+first_token_saved_seconds = Histogram(
+    "synapse_speculative_first_token_saved_seconds",
+    "How much earlier adopted speculative agent jobs started their LLM call than a dispatch after the router.",
+)
+
+
+def speculation_key(speculation_id: str) -> str:
+    return f"{SPECULATION_PREFIX}:{speculation_id}"
+
+
+def _decode(raw: dict) -> dict:
+    return {
+        (k.decode("utf-8") if isinstance(k, bytes) else k): (v.decode("utf-8") if isinstance(v, bytes) else v)
+        for k, v in (raw or {}).items()
+    }
+
+
+def completed_mentions(text: str, agents: set[str]) -> list[tuple[str, str]]:
+    """
+    ``(alias, prefix)`` of the first mention of each agent in the completed
+    lines of a partial message, where ``prefix`` is the message up to the end
+    of the mention's line.
+    """
+    completed = text[:text.rfind("\n") + 1]
+    found: dict[str, str] = {}
+    for match in re.finditer(MENTION_REGEX, completed):
+        alias = match.group(1)
+        if alias in agents and alias not in found:
+            found[alias] = completed[:completed.find("\n", match.end())].strip()
+    return list(found.items())
+
+
+def addresses(text: str, alias: str) -> bool:
+    """Whether ``text`` mentions ``alias`` or names it as a word."""
+    return re.search(rf"(?<!\w){re.escape(alias)}(?!\w)", text) is not None
+
+
+class SpeculativeDispatch:
+    """Launches and settles the speculations of one streamed Orchestrator call."""
+
+    def __init__(
+        self, redis: Redis, *, thread_id: str, turn_id: str, messages_dict: list, group_members_dict: list
+    ):
+        self.redis = redis
+        self.thread_id = thread_id
+        self.turn_id = turn_id
+        self.messages_dict = messages_dict
+        self.group_members_dict = group_members_dict
+        self.agents = {
+            m["alias"] for m in group_members_dict if m.get("alias") not in ("Orchestrator", "User")
+        }
+        self.launched: dict[str, tuple[str, str]] = {}  # alias -> (speculation id, prefix)
+        self._text = ""
+
+    async def on_text(self, text: str) -> None:
+        """Called with the accumulated text after every streamed chunk; never raises."""
+        try:
+            if not text.startswith(self._text):
+                # A new stream (the cascade escalated): earlier prefixes no longer hold.
+                await self.discard(list(self.launched))
+            self._text = text
+            for alias, prefix in completed_mentions(text, self.agents):
+                if alias not in self.launched:
+                    await self._launch(alias, prefix)
+        except Exception as e:
+            logger.warn("speculation.on_text_failed", turn_id=self.turn_id, error=str(e))
+
+    async def _launch(self, alias: str, prefix: str) -> None:
+        speculation_id = str(uuid.uuid4())
+        key = speculation_key(speculation_id)
+        await self.redis.hset(key, mapping={
+            "alias": alias, "group_id": self.thread_id, "turn_id": self.turn_id, "enqueued_at": time.time(),
+        })
+        await self.redis.expire(key, settings.SPECULATIVE_RESULT_TTL_SECONDS)
+        self.launched[alias] = (speculation_id, prefix)
+
+        partial = AIMessage(
+            content=prefix, name="Orchestrator", id=str(uuid.uuid4()), additional_kwargs={"turn_id": self.turn_id}
+        )
+        job = await self.redis.enqueue_job(
+            "run_agent_llm",
+            alias=alias,
+            messages_dict=[*self.messages_dict, dumpd(partial)],
+            group_members_dict=self.group_members_dict,
+            thread_id=self.thread_id,
+            gathering_id=None,
+            turn_id=self.turn_id,
+            speculation_id=speculation_id,
+            _queue_name="execution_queue",
+        )
+        if job is not None:
+            await self.redis.hset(key, mapping={"job_id": job.job_id})
+            await register_turn_jobs(self.redis, self.turn_id, [job.job_id])
+        speculative_dispatches.inc(outcome="launched")
+        logger.info("speculation.launched", alias=alias, turn_id=self.turn_id, speculation_id=speculation_id)
+
+    async def discard(self, aliases: list[str]) -> None:
+        ids = [self.launched.pop(alias)[0] for alias in aliases if alias in self.launched]
+        await discard_speculations(self.redis, ids)
+
+    async def finish(self, message: BaseMessage) -> dict[str, str]:
+        """
+        Discards the speculations the final message does not confirm and returns
+        the confirmed ones as alias -> speculation id. An agent addressed again
+        after its prefix would have answered without those instructions.
+        """
+        content = message.content if isinstance(message, AIMessage) and isinstance(message.content, str) else ""
+        content = content.lstrip()
+        confirmed = {
+            alias: speculation_id for alias, (speculation_id, prefix) in self.launched.items()
+            if content.startswith(prefix) and not addresses(content[len(prefix):], alias)
+        }
+        try:
+            await self.discard([alias for alias in self.launched if alias not in confirmed])
+        except Exception as e:
+            logger.warn("speculation.discard_failed", turn_id=self.turn_id, error=str(e))
+        return confirmed
+
+
+async def record_discarded_usage(redis: Redis, group_id: str, turn_id: str, message_dict: dict) -> None:
+    """
+    Counts the tokens of a speculative result nobody adopts against the turn
+    and group budgets: the LLM call was paid for all the same. Best-effort.
+    """
+    try:
+        message, = deserialize_messages([message_dict])
+        if increment := message_usage(compact_message_meta(message), None):
+            await record_usage(redis, group_id, turn_id, [increment])
+    except Exception as e:
+        logger.warn("speculation.usage_record_failed", group_id=group_id, turn_id=turn_id, error=str(e))
+
+
+async def discard_speculations(redis: Redis, speculation_ids: list[str]) -> None:
+    """Aborts the jobs of speculations nobody will adopt and drops their state."""
+    for speculation_id in speculation_ids:
+        key = speculation_key(speculation_id)
+        fields = _decode(await redis.hgetall(key))
+        await redis.delete(key)
+        if job_id := fields.get("job_id"):
+            await abort_jobs(redis, [job_id])
+        if "result" in fields and "group_id" in fields:
+            await record_discarded_usage(redis, fields["group_id"], fields["turn_id"], json.loads(fields["result"]))
+        speculative_dispatches.inc(outcome="discarded")
+        logger.info("speculation.discarded", speculation_id=speculation_id, alias=fields.get("alias"))
+
+
+async def start_speculation(redis: Redis, speculation_id: str) -> bool:
+    """Marks the speculative job as started; False if it was discarded meanwhile."""
+    key = speculation_key(speculation_id)
+    if not await redis.exists(key):
+        return False
+    await redis.hset(key, mapping={"started_at": time.time()})
+    return True
+
+
+async def _deliver(redis: Redis, speculation_id: str, fields: dict) -> None:
+    # Both the adoption and the result may see the other; only one delivers.
+    if not await redis.hsetnx(speculation_key(speculation_id), "delivered", 1):
+        return
+    target = json.loads(fields["target"])
+    if started_at := fields.get("started_at"):
+        saved = max(target["adopted_at"] - float(started_at), 0.0)
+        first_token_saved_seconds.observe(saved)
+        logger.info(
+            "speculation.adopted", speculation_id=speculation_id, alias=fields["alias"],
+            turn_id=target["turn_id"], first_token_saved_seconds=round(saved, 3),
+        )
+    speculative_dispatches.inc(outcome="adopted")
+    await redis.enqueue_job(
+        "process_worker_result",
+        thread_id=target["thread_id"],
+        message_dict=json.loads(fields["result"]),
+        gathering_id=target["gathering_id"],
+        turn_id=target["turn_id"],
+        alias=fields["alias"],
+        _queue_name="orchestrator_queue",
+    )
+
+
+async def complete_speculation(
+    redis: Redis, speculation_id: str, message_dict: dict, *, group_id: str, turn_id: str
+) -> None:
+    """Parks the result of a speculative job, delivering it if it was adopted already."""
+    key = speculation_key(speculation_id)
+    pipe = redis.pipeline(transaction=True)
+    pipe.hset(key, mapping={"result": json.dumps(message_dict)})
+    pipe.hgetall(key)
+    _, raw = await pipe.execute()
+    fields = _decode(raw)
+    if "alias" not in fields:
+        # Discarded while running.
+        await redis.delete(key)
+        await record_discarded_usage(redis, group_id, turn_id, message_dict)
+        return
+    if "target" in fields:
+        await _deliver(redis, speculation_id, fields)
+
+
+async def adopt_speculation(
+    redis: Redis, speculation_id: str, *, thread_id: str, gathering_id: str | None, turn_id: str
+) -> bool:
+    """
+    Takes over a confirmed speculation as the dispatch of its alias. False if
+    it is gone (discarded or expired) or adopted already; the caller then
+    enqueues a regular job.
+    """
+    key = speculation_key(speculation_id)
+    target = {"thread_id": thread_id, "gathering_id": gathering_id, "turn_id": turn_id, "adopted_at": time.time()}
+    pipe = redis.pipeline(transaction=True)
+    pipe.hsetnx(key, "target", json.dumps(target))
+    pipe.hgetall(key)
+    claimed, raw = await pipe.execute()
+    fields = _decode(raw)
+    if "alias" not in fields:
+        await redis.delete(key)
+        return False
+    if not claimed:
+        return False
+    if "result" in fields:
+        await _deliver(redis, speculation_id, fields)
+    return True
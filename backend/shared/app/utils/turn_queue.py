@@ -0,0 +1,139 @@
+"""
+One turn at a time per group, with bursts of user messages merged.
+
+``start_turn`` no longer runs the graph itself. It appends the user message
+to the group's inbox (``synapse:turn_queue:<group_id>:inbox``) and schedules
+``flush_user_messages``. A message to an idle group, with no turn in flight
+and no other message within the group's debounce window
+(``ChatGroup.message_debounce_seconds``, else
+USER_MESSAGE_DEBOUNCE_SECONDS), is flushed at once. Each message opens the
+window again (``...:window``), and messages inside it are flushed when it
+has passed. A flush starts a turn only if its message is still the newest
+one in the inbox (a later message restarts the window) and no other turn of
+the group is in flight (``...:active`` holds the running turn id). It drains
+the whole inbox into that one turn, which keeps the turn id of its first
+message. The turns of the other messages end with the ``merged`` phase.
+
+Messages arriving while a turn is in flight wait in the inbox. When the turn
+ends (or is cancelled or fails), it releases the group and flushes the
+inbox right away as the next turn. A turn that never ends (a lost worker)
+holds the group for at most ACTIVE_TURN_TTL_SECONDS after its last activity.
+"""
+import json
+import uuid
+
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+from ..core.config import settings
+from .turn_status import is_turn_cancelled
+
+TURN_QUEUE_PREFIX = "synapse:turn_queue"
+_CLAIMING = "claiming"
+
+
+def inbox_key(group_id: str | uuid.UUID) -> str:
+    return f"{TURN_QUEUE_PREFIX}:{group_id}:inbox"
+
+
+def active_turn_key(group_id: str | uuid.UUID) -> str:
+    return f"{TURN_QUEUE_PREFIX}:{group_id}:active"
+
+
+def debounce_window_key(group_id: str | uuid.UUID) -> str:
+    return f"{TURN_QUEUE_PREFIX}:{group_id}:window"
+
+
+def _text(value) -> str | None:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+async def _schedule_flush(redis: Redis, group_id: str, last_message_id: str | None, defer_by: float) -> None:
+    await redis.enqueue_job(
+        "flush_user_messages",
+        group_id=group_id,
+        last_message_id=last_message_id,
+        _defer_by=defer_by,
+        _queue_name="orchestrator_queue",
+    )
+
+
+async def enqueue_user_message(
+    redis: Redis, group_id: str, message: dict, debounce_seconds: float | None = None
+) -> None:
+    """
+    Adds a user message (``message_id``, ``turn_id``, ``user_id``,
+    ``content``) to the group's inbox and schedules its flush: at once if the
+    group is idle, else at the end of the ``debounce_seconds`` window
+    (USER_MESSAGE_DEBOUNCE_SECONDS if None).
+    """
+    window = settings.USER_MESSAGE_DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+    key, window_key = inbox_key(group_id), debounce_window_key(group_id)
+    pipe = redis.pipeline(transaction=True)
+    pipe.rpush(key, json.dumps(message))
+    pipe.expire(key, settings.TURN_STATUS_TTL_SECONDS)
+    pipe.exists(active_turn_key(group_id), window_key)
+    if window > 0:
+        pipe.set(window_key, message["message_id"], px=int(window * 1000))
+    busy = (await pipe.execute())[2]
+    await _schedule_flush(redis, group_id, message["message_id"], window if window > 0 and busy else 0)
+
+
+async def claim_user_messages(redis: Redis, group_id: str, last_message_id: str | None = None) -> list[dict] | None:
+    """
+    Drains the inbox into the group's next turn and marks that turn as in
+    flight. Returns the messages, oldest first, or None if there is nothing
+    to run yet: the inbox is empty, a newer message than ``last_message_id``
+    arrived (its own flush follows), or another turn is in flight. Messages
+    of cancelled turns are dropped.
+    """
+    key, active_key = inbox_key(group_id), active_turn_key(group_id)
+    newest = await redis.lindex(key, -1)
+    if newest is None:
+        return None
+    if last_message_id is not None and json.loads(newest)["message_id"] != last_message_id:
+        return None
+    if not await redis.set(active_key, _CLAIMING, nx=True, ex=settings.ACTIVE_TURN_TTL_SECONDS):
+        return None
+
+    pipe = redis.pipeline(transaction=True)
+    pipe.lrange(key, 0, -1)
+    pipe.delete(key)
+    raw_messages, _ = await pipe.execute()
+    messages = [
+        message for message in (json.loads(raw) for raw in raw_messages)
+        if not await is_turn_cancelled(redis, message["turn_id"])
+    ]
+    if not messages:
+        await redis.delete(active_key)
+        return None
+    await redis.set(active_key, messages[0]["turn_id"], ex=settings.ACTIVE_TURN_TTL_SECONDS)
+    return messages
+
+
+async def refresh_group_turn(redis: Redis, group_id: str) -> None:
+    """Keeps an in-flight turn's hold on the group alive while it makes progress."""
+    await redis.expire(active_turn_key(group_id), settings.ACTIVE_TURN_TTL_SECONDS)
+
+
+async def release_group_turn(redis: Redis, group_id: str | uuid.UUID, turn_id: str | uuid.UUID) -> bool:
+    """
+    Ends ``turn_id``'s hold on the group and starts the next turn if messages
+    are waiting. A no-op, returning False, if the turn does not hold the group.
+    """
+    key = active_turn_key(group_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        try:
+            await pipe.watch(key)
+            if _text(await pipe.get(key)) != str(turn_id):
+                await pipe.unwatch()
+                return False
+            pipe.multi()
+            pipe.delete(key)
+            await pipe.execute()
+        except WatchError:
+            # Someone else took or released the group meanwhile.
+            return False
+    if await redis.llen(inbox_key(group_id)):
+        await _schedule_flush(redis, str(group_id), None, 0)
+    return True
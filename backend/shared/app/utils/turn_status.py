@@ -0,0 +1,229 @@
+"""
+Live progress of each conversation turn.
+
+The Orchestrator keeps one small Redis hash per turn with its phase, the
+aliases it is still waiting on, the gather id, the router's turn count and
+when the turn started. Every change bumps a ``version`` field and is also
+appended to the group's event stream as a ``turn_status`` event, so
+WebSocket clients are pushed the same record the gateway serves from
+``GET /groups/{group_id}/turns/{turn_id}``.
+
+Updates are read-modify-write under WATCH, because results of a parallel
+gather remove their alias from ``pending`` concurrently.
+
+Cancelling a turn sets a flag next to the hash that the dispatcher, the
+router and the execution workers check, and aborts the arq jobs the turn
+has dispatched (queued ones never start, running ones are cancelled by
+execution workers, which allow aborts).
+"""
+import json
+import uuid
+from collections.abc import Callable
+from datetime import datetime, timezone
+
+from arq.constants import abort_jobs_ss
+from arq.utils import timestamp_ms
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+
+from ..core.config import settings
+from .event_stream import append_group_event
+
+TURN_STATUS_PREFIX = "synapse:turn"
+
+# queued -> running -> awaiting_agents / awaiting_tools -> running -> ... -> a terminal phase.
+# A queued turn whose message was merged into another turn ends as "merged".
+TURN_PHASES = (
+    "queued", "running", "awaiting_agents", "awaiting_tools",
+    "completed", "max_turns", "budget_exhausted", "loop_detected", "failed", "cancelled", "merged",
+)
+TERMINAL_TURN_PHASES = frozenset({"completed", "max_turns", "budget_exhausted", "loop_detected", "failed", "cancelled", "merged"})
+
+_MAX_UPDATE_ATTEMPTS = 10
+
+
+def turn_status_key(turn_id: str | uuid.UUID) -> str:
+    return f"{TURN_STATUS_PREFIX}:{turn_id}"
+
+
+def turn_cancel_key(turn_id: str | uuid.UUID) -> str:
+    return f"{TURN_STATUS_PREFIX}:{turn_id}:cancelled"
+
+
+def turn_jobs_key(turn_id: str | uuid.UUID) -> str:
+    """Set of the arq job ids dispatched for a turn."""
+    return f"{TURN_STATUS_PREFIX}:{turn_id}:jobs"
+
+
+def decode_turn_status(raw: dict) -> dict | None:
+    """Turns an HGETALL reply into a status record, or None if the hash does not exist."""
+    if not raw:
+        return None
+    fields = {
+        (k.decode("utf-8") if isinstance(k, bytes) else k): (v.decode("utf-8") if isinstance(v, bytes) else v)
+        for k, v in raw.items()
+    }
+    return {
+        "turn_id": fields.get("turn_id"),
+        "group_id": fields.get("group_id"),
+        "phase": fields.get("phase", "queued"),
+        "pending": json.loads(fields.get("pending") or "[]"),
+        "gather_id": fields.get("gather_id") or None,
+        "turn_count": int(fields.get("turn_count") or 0),
+        "started_at": fields.get("started_at"),
+        "updated_at": fields.get("updated_at"),
+        "version": int(fields.get("version") or 0),
+    }
+
+
+def turn_status_event(status: dict) -> dict:
+    """The ``turn_status`` WebSocket event for a status record."""
+    return {"type": "turn_status", **status}
+
+
+async def read_turn_status(redis: Redis, turn_id: str | uuid.UUID) -> dict | None:
+    return decode_turn_status(await redis.hgetall(turn_status_key(turn_id)))
+
+
+async def _update_turn_status(
+    redis: Redis,
+    group_id: str | uuid.UUID,
+    turn_id: str | uuid.UUID,
+    change: Callable[[dict | None], dict | None],
+) -> dict | None:
+    """
+    Applies ``change`` (current record or None -> fields to write, or None to
+    leave the record alone) atomically, then publishes the new record.
+    Returns it, or None if nothing was written.
+    """
+    key = turn_status_key(turn_id)
+    for _ in range(_MAX_UPDATE_ATTEMPTS):
+        async with redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                current = decode_turn_status(await pipe.hgetall(key))
+                fields = change(current)
+                if fields is None:
+                    return None
+                now = datetime.now(timezone.utc).isoformat()
+                mapping = {"turn_id": str(turn_id), "group_id": str(group_id), "updated_at": now}
+                if current is None:
+                    mapping["started_at"] = now
+                for name, value in fields.items():
+                    if name == "pending":
+                        value = json.dumps(list(value))
+                    mapping[name] = "" if value is None else str(value)
+                pipe.multi()
+                pipe.hset(key, mapping=mapping)
+                pipe.hincrby(key, "version", 1)
+                pipe.expire(key, settings.TURN_STATUS_TTL_SECONDS)
+                pipe.hgetall(key)
+                *_, raw = await pipe.execute()
+                break
+            except WatchError:
+                continue
+    else:
+        raise WatchError(f"Turn status {turn_id} kept changing during {_MAX_UPDATE_ATTEMPTS} update attempts")
+
+    status = decode_turn_status(raw)
+    # Later events of a turn supersede earlier ones for slow consumers.
+    await append_group_event(redis, str(group_id), turn_status_event(status), coalesce_key=f"turn:{turn_id}")
+    return status
+
+
+async def set_turn_status(
+    redis: Redis,
+    group_id: str | uuid.UUID,
+    turn_id: str | uuid.UUID,
+    phase: str,
+    *,
+    pending: list[str] | None = None,
+    gather_id: str | None = None,
+    turn_count: int | None = None,
+) -> dict | None:
+    """
+    Moves a turn to ``phase``. ``pending`` and ``gather_id`` are replaced
+    (cleared when omitted); ``turn_count`` is kept when omitted. A terminal
+    phase is never left again.
+    """
+    if phase not in TURN_PHASES:
+        raise ValueError(f"Unknown turn phase: {phase}")
+
+    def change(current: dict | None) -> dict | None:
+        if current is not None and current["phase"] in TERMINAL_TURN_PHASES:
+            return None
+        fields = {"phase": phase, "pending": pending or [], "gather_id": gather_id}
+        if turn_count is not None:
+            fields["turn_count"] = turn_count
+        return fields
+
+    return await _update_turn_status(redis, group_id, turn_id, change)
+
+
+async def queue_turn(redis: Redis, group_id: str | uuid.UUID, turn_id: str | uuid.UUID) -> dict | None:
+    """Records a new turn as queued, unless the Orchestrator already picked it up."""
+    return await _update_turn_status(
+        redis, group_id, turn_id,
+        lambda current: {"phase": "queued", "pending": [], "turn_count": 0} if current is None else None,
+    )
+
+
+async def resolve_pending(
+    redis: Redis, group_id: str | uuid.UUID, turn_id: str | uuid.UUID, alias: str
+) -> dict | None:
+    """Removes ``alias`` from the turn's pending list once its result arrived."""
+
+    def change(current: dict | None) -> dict | None:
+        if current is None or alias not in current["pending"]:
+            return None
+        pending = list(current["pending"])
+        pending.remove(alias)
+        return {"pending": pending}
+
+    return await _update_turn_status(redis, group_id, turn_id, change)
+
+
+async def is_turn_cancelled(redis: Redis, turn_id: str | uuid.UUID | None) -> bool:
+    if not turn_id:
+        return False
+    return bool(await redis.exists(turn_cancel_key(turn_id)))
+
+
+async def abort_jobs(redis: Redis, job_ids: list[str]) -> None:
+    # What `arq.jobs.Job.abort` does, without waiting for each job's result.
+    if job_ids:
+        await redis.zadd(abort_jobs_ss, {job_id: timestamp_ms() for job_id in job_ids})
+
+
+async def register_turn_jobs(redis: Redis, turn_id: str | uuid.UUID, job_ids: list[str]) -> bool:
+    """
+    Records jobs dispatched for a turn so a cancellation can abort them.
+    Returns True if the turn was cancelled meanwhile, in which case the jobs
+    have been aborted already.
+    """
+    if not job_ids:
+        return False
+    key = turn_jobs_key(turn_id)
+    pipe = redis.pipeline(transaction=True)
+    pipe.sadd(key, *job_ids)
+    pipe.expire(key, settings.TURN_STATUS_TTL_SECONDS)
+    pipe.exists(turn_cancel_key(turn_id))
+    *_, cancelled = await pipe.execute()
+    if cancelled:
+        # The cancellation read the job set before these ids were added.
+        await abort_jobs(redis, job_ids)
+    return bool(cancelled)
+
+
+async def cancel_turn(redis: Redis, group_id: str | uuid.UUID, turn_id: str | uuid.UUID) -> dict | None:
+    """
+    Flags the turn as cancelled, aborts its dispatched jobs and records the
+    ``cancelled`` phase. Returns the new status, or None if the turn had
+    already ended.
+    """
+    pipe = redis.pipeline(transaction=True)
+    pipe.set(turn_cancel_key(turn_id), 1, ex=settings.TURN_STATUS_TTL_SECONDS)
+    pipe.smembers(turn_jobs_key(turn_id))
+    _, job_ids = await pipe.execute()
+    await abort_jobs(redis, sorted(j.decode("utf-8") if isinstance(j, bytes) else j for j in job_ids))
+    return await set_turn_status(redis, group_id, turn_id, "cancelled")
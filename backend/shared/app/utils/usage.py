@@ -0,0 +1,159 @@
+"""
+Token usage accounting and budgets.
+
+The Orchestrator adds the token usage of every LLM response it persists to
+two Redis hashes: one per turn and one per group and UTC day. Cost is
+derived from LLM_TOKEN_PRICES_USD_PER_MILLION and kept in integer
+micro-dollars so it can be summed with HINCRBY.
+
+The router compares the sums with the configured budgets before every
+routing decision, and counts the Orchestrator calls its fast paths saved
+in the daily hash. The gateway serves the daily sums from
+``GET /groups/{group_id}/usage``.
+"""
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from redis.asyncio import Redis
+
+from ..core.config import settings
+
+USAGE_PREFIX = "synapse:usage"
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cost_micro_usd")
+
+
+def turn_usage_key(turn_id: str | uuid.UUID) -> str:
+    return f"{USAGE_PREFIX}:turn:{turn_id}"
+
+
+def group_usage_key(group_id: str | uuid.UUID, day: date) -> str:
+    return f"{USAGE_PREFIX}:group:{group_id}:{day.isoformat()}"
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def usage_increment(usage: dict, model: str | None) -> dict:
+    """Tokens and cost of one LLM call, priced by the model that made it."""
+    input_tokens = int(usage.get("input_tokens") or 0)
+    output_tokens = int(usage.get("output_tokens") or 0)
+    cost = 0
+    price = settings.LLM_TOKEN_PRICES_USD_PER_MILLION.get(model or "")
+    if price:
+        # USD per million tokens is micro-dollars per token.
+        cost = round(input_tokens * price[0] + output_tokens * price[1])
+    return {"input_tokens": input_tokens, "output_tokens": output_tokens, "cost_micro_usd": cost}
+
+
+def message_usage(meta: dict | None, model: str | None) -> dict | None:
+    """
+    Usage increments for a persisted message from its compact meta, or None
+    if the message carries no usage (user and tool messages). Calls are
+    priced by the model recorded in the meta, else by ``model``; discarded
+    calls (a cascade's rejected fast output) are added to the message.
+    """
+    meta = meta or {}
+    calls = [(call, call.get("model")) for call in meta.get("discarded_usage") or []]
+    if meta.get("usage"):
+        calls.append((meta["usage"], meta.get("model") or model))
+    if not calls:
+        return None
+    increments = [usage_increment(usage, call_model) for usage, call_model in calls]
+    return {name: sum(i[name] for i in increments) for name in USAGE_FIELDS}
+
+
+def decode_usage(raw: dict) -> dict:
+    """Turns an HGETALL reply into a usage record; a missing hash is all zeros."""
+    fields = {
+        (k.decode("utf-8") if isinstance(k, bytes) else k): int(v)
+        for k, v in (raw or {}).items()
+    }
+    input_tokens, output_tokens = fields.get("input_tokens", 0), fields.get("output_tokens", 0)
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "cost_usd": fields.get("cost_micro_usd", 0) / 1_000_000,
+        "orchestrator_calls_saved": fields.get("orchestrator_calls_saved", 0),
+    }
+
+
+async def record_usage(
+    redis: Redis,
+    group_id: str | uuid.UUID,
+    turn_id: str | uuid.UUID,
+    increments: list[dict],
+    day: date | None = None,
+) -> None:
+    """Adds the summed ``increments`` to the turn's and the group's daily usage."""
+    totals = {name: sum(i[name] for i in increments) for name in USAGE_FIELDS}
+    if not any(totals.values()):
+        return
+    day = day or utc_today()
+    pipe = redis.pipeline(transaction=False)
+    for key, ttl in (
+        (turn_usage_key(turn_id), settings.TURN_STATUS_TTL_SECONDS),
+        (group_usage_key(group_id, day), settings.USAGE_RETENTION_DAYS * 24 * 60 * 60),
+    ):
+        for name, amount in totals.items():
+            if amount:
+                pipe.hincrby(key, name, amount)
+        pipe.expire(key, ttl)
+    await pipe.execute()
+
+
+async def record_orchestrator_call_saved(redis: Redis, group_id: str | uuid.UUID, day: date | None = None) -> None:
+    key = group_usage_key(group_id, day or utc_today())
+    pipe = redis.pipeline(transaction=False)
+    pipe.hincrby(key, "orchestrator_calls_saved", 1)
+    pipe.expire(key, settings.USAGE_RETENTION_DAYS * 24 * 60 * 60)
+    await pipe.execute()
+
+
+async def read_turn_usage(redis: Redis, turn_id: str | uuid.UUID) -> dict:
+    return decode_usage(await redis.hgetall(turn_usage_key(turn_id)))
+
+
+async def read_group_usage(
+    redis: Redis, group_id: str | uuid.UUID, days: int, today: date | None = None
+) -> list[dict]:
+    """Daily usage of a group for the last ``days`` days, newest first."""
+    today = today or utc_today()
+    dates = [today - timedelta(days=offset) for offset in range(days)]
+    pipe = redis.pipeline(transaction=False)
+    for day in dates:
+        pipe.hgetall(group_usage_key(group_id, day))
+    replies = await pipe.execute()
+    return [{"date": day, **decode_usage(raw)} for day, raw in zip(dates, replies)]
+
+
+def budgets() -> dict:
+    """The configured budgets; None means unlimited."""
+    return {
+        "turn_tokens": settings.TURN_TOKEN_BUDGET or None,
+        "daily_tokens": settings.GROUP_DAILY_TOKEN_BUDGET or None,
+        "daily_cost_usd": settings.GROUP_DAILY_COST_BUDGET_USD or None,
+    }
+
+
+async def exhausted_budget(
+    redis: Redis, group_id: str | uuid.UUID, turn_id: str | uuid.UUID, today: date | None = None
+) -> str | None:
+    """Describes the first budget the turn or the group has spent, or None."""
+    limits = budgets()
+    if not any(limits.values()):
+        return None
+    pipe = redis.pipeline(transaction=False)
+    pipe.hgetall(turn_usage_key(turn_id))
+    pipe.hgetall(group_usage_key(group_id, today or utc_today()))
+    turn_raw, day_raw = await pipe.execute()
+    turn, day = decode_usage(turn_raw), decode_usage(day_raw)
+
+    if limits["turn_tokens"] and turn["total_tokens"] >= limits["turn_tokens"]:
+        return f"turn token budget of {limits['turn_tokens']} tokens ({turn['total_tokens']} used)"
+    if limits["daily_tokens"] and day["total_tokens"] >= limits["daily_tokens"]:
+        return f"daily token budget of {limits['daily_tokens']} tokens ({day['total_tokens']} used)"
+    if limits["daily_cost_usd"] and day["cost_usd"] >= limits["daily_cost_usd"]:
+        return f"daily cost budget of ${limits['daily_cost_usd']:.2f} (${day['cost_usd']:.2f} used)"
+    return None
@@ -0,0 +1,114 @@
+"""
+Load test for authenticated `GET /groups/`.
+
+Every request goes through `get_current_user`. The script runs the same
+workload twice, first with the gateway's auth cache disabled and then
+enabled, and reports throughput and latency percentiles for each run.
+
+In-process (default): the gateway app is driven through httpx's ASGI
+transport against a scratch SQLite database, so there are no network or
+uvicorn costs. Only the handler and database work is measured:
+
+    python benchmarks/auth_groups_load.py --requests 5000 --concurrency 50
+
+Against a running stack (the cache toggle is then not available, so the
+script reports a single run):
+
+    python benchmarks/auth_groups_load.py --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+async def run_load(client: httpx.AsyncClient, token: str, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.get("/groups/", headers={"Authorization": f"Bearer {token}"})
+            latencies.append(time.perf_counter() - started)
+            response.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def report(label: str, stats: dict) -> None:
+    print(f"{label:<22} {stats['rps']:>10.1f} req/s   p50 {stats['p50_ms']:>7.2f} ms   p99 {stats['p99_ms']:>7.2f} ms")
+
+
+async def remote(args) -> None:
+    async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+        email, password = f"load_{uuid.uuid4()}@example.com", "load_test_password"
+        (await client.post("/auth/register", json={"email": email, "password": password})).raise_for_status()
+        login = await client.post("/auth/login", data={"username": email, "password": password})
+        login.raise_for_status()
+        token = login.json()["access_token"]
+        report("remote", await run_load(client, token, args.requests, args.concurrency))
+
+
+async def in_process(args) -> None:
+    db_path = Path(tempfile.mkdtemp()) / "auth_load.db"
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    os.environ.setdefault("TAVILY_API_KEY", "dummy")
+    sys.path[:0] = [str(ROOT / "backend"), str(ROOT / "backend" / "api_gateway")]
+
+    from app.main import app
+    from app.core import security
+    from shared.app.db import AsyncSessionLocal, engine
+    from shared.app.models.base import Base
+    from shared.app.models.chat import ChatGroup, User
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        user = User(email="load@example.com", hashed_password="x")
+        session.add(user)
+        await session.flush()
+        session.add_all(ChatGroup(name=f"group {i}", owner_id=user.id) for i in range(10))
+        await session.commit()
+    token = security.create_access_token({"sub": str(user.id)})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        configured_ttl = security._token_cache.ttl or 30
+        for label, ttl in (("auth cache disabled", 0), ("auth cache enabled", configured_ttl)):
+            security.clear_auth_caches()
+            security._token_cache.ttl = security._user_cache.ttl = ttl
+            await run_load(client, token, min(200, args.requests), args.concurrency)  # warm-up
+            report(label, await run_load(client, token, args.requests, args.concurrency))
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running gateway; omit to run in-process")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(remote(args) if args.url else in_process(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Bytes per WebSocket event and gateway cost per frame, before and after the
+slim broadcast envelope.
+
+"Before" is the payload `_persist_new_messages` used to append (the columns
+plus the compact `meta`; no parent, as graph messages have none), which the gateway decoded, tagged with `event_id`
+and re-encoded for every frame. "After" is `message_event` encoded once by
+the Orchestrator, with the gateway splicing `event_id` into the stored bytes.
+
+The corpus is a synthetic turn mix: user prompts, agent replies with token
+usage, agent tool calls and tool results, in the given proportions.
+
+Usage:
+
+    python benchmarks/broadcast_envelope.py --events 20000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+# Settings are loaded on import; nothing here connects to either.
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://unused/unused")
+os.environ.setdefault("REDIS_URL", "redis://unused:6379/0")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from shared.app.utils.event_stream import encode_event, message_event, stream_entry_to_frame
+from shared.app.utils.message_serde import compact_message_meta
+
+WORDS = "the deploy failed because migration lock timeout on replica staging queue worker retry".split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def make_message(rng: random.Random, kind: str):
+    message_id = str(uuid.uuid4())
+    usage = {"input_tokens": rng.randint(200, 4000), "output_tokens": rng.randint(20, 600)}
+    usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+    if kind == "user":
+        return HumanMessage(content=_text(rng, rng.randint(5, 60)), name="User", id=message_id)
+    if kind == "reply":
+        return AIMessage(content=_text(rng, rng.randint(30, 300)), name="Researcher", id=message_id, usage_metadata=usage)
+    if kind == "tool_call":
+        calls = [
+            {"id": f"call_{uuid.uuid4().hex[:24]}", "name": "web_search", "args": {"query": _text(rng, 6), "max_results": 5}}
+            for _ in range(rng.randint(1, 3))
+        ]
+        return AIMessage(content="", name="Researcher", id=message_id, tool_calls=calls, usage_metadata=usage)
+    return ToolMessage(content=_text(rng, rng.randint(100, 600)), name="web_search", id=message_id, tool_call_id=f"call_{uuid.uuid4().hex[:24]}")
+
+
+def old_payload(message, turn_id: str) -> dict:
+    return {
+        "id": message.id,
+        "sender_alias": message.name,
+        "content": message.content,
+        "turn_id": turn_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "meta": compact_message_meta(message),
+    }
+
+
+def old_frame(entry_id: bytes, fields: dict) -> str:
+    payload = json.loads(fields[b"data"].decode("utf-8"))
+    payload["event_id"] = entry_id.decode("utf-8")
+    return json.dumps(payload)
+
+
+def new_payload(message, turn_id: str) -> dict:
+    meta = compact_message_meta(message)
+    return message_event(message.id, message.name, message.content, turn_id, has_meta="tool_calls" in meta)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--mix", default="user=1,reply=3,tool_call=2,tool=2", help="Relative weights of message kinds")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    weights = dict((k, int(v)) for k, v in (part.split("=") for part in args.mix.split(",")))
+    kinds = rng.choices(list(weights), weights=list(weights.values()), k=args.events)
+    turn_id = str(uuid.uuid4())
+    messages = [(kind, make_message(rng, kind)) for kind in kinds]
+    entry_id = b"1718000000000-42"
+
+    old_entries = [(kind, {b"data": json.dumps(old_payload(m, turn_id)).encode("utf-8")}) for kind, m in messages]
+    new_entries = [(kind, {b"data": encode_event(new_payload(m, turn_id))}) for kind, m in messages]
+
+    print(f"{'kind':<10} {'events':>7} {'before B/event':>15} {'after B/event':>14} {'saved':>7}")
+    for kind in list(weights) + ["all"]:
+        old = [len(old_frame(entry_id, f).encode("utf-8")) for k, f in old_entries if kind in (k, "all")]
+        new = [len(stream_entry_to_frame(entry_id, f)) for k, f in new_entries if kind in (k, "all")]
+        if not old:
+            continue
+        before, after = statistics.mean(old), statistics.mean(new)
+        print(f"{kind:<10} {len(old):>7} {before:>15.0f} {after:>14.0f} {1 - after / before:>7.1%}")
+
+    fetches = sum(1 for _, f in new_entries if b'"has_meta":true' in f[b"data"])
+    print(f"\nevents flagged has_meta (one detail fetch per client): {fetches / len(new_entries):.1%}")
+
+    for label, build, entries in (("before", old_frame, old_entries), ("after", stream_entry_to_frame, new_entries)):
+        started = time.perf_counter()
+        for _, fields in entries:
+            build(entry_id, fields)
+        elapsed = time.perf_counter() - started
+        print(f"gateway frame build {label:<6}: {elapsed / len(entries) * 1e6:.2f} µs/frame")
+
+
+if __name__ == "__main__":
+    main()
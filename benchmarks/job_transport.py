@@ -0,0 +1,106 @@
+"""
+Hop latency of the job transports: time from `enqueue_job` to the job
+function starting, with arq's polled queue and with the Redis Streams
+transport (`shared/app/core/job_stream.py`).
+
+Each transport runs in-process against the same Redis: an arq `Worker`
+with the given `--poll-delay` (0.5 s, arq's default, is what the services
+use) and a `JobStreamConsumer`. Hops are sent one at a time, `--gap` apart,
+as a turn's gateway -> Orchestrator -> execution worker -> Orchestrator
+chain would; p50/p99 are reported per transport. Scratch queues are deleted
+at the end.
+
+Usage (needs a running Redis; use a disposable database):
+
+    REDIS_URL=redis://localhost:6379/15 python benchmarks/job_transport.py --hops 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://unused/unused")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/15")
+
+from arq import create_pool
+from arq.connections import RedisSettings
+from arq.worker import Worker
+
+from shared.app.core.config import settings
+from shared.app.core.job_stream import JobStreamConsumer, StreamArqRedis, dead_letter_key, job_stream_key
+
+_arrivals: asyncio.Queue = asyncio.Queue()
+
+
+async def hop(ctx, sent_at: float) -> None:
+    _arrivals.put_nowait(time.time() - sent_at)
+
+
+async def measure(pool, queue_name: str, hops: int, gap: float) -> list[float]:
+    latencies = []
+    for _ in range(hops):
+        await pool.enqueue_job("hop", sent_at=time.time(), _queue_name=queue_name)
+        latencies.append(await asyncio.wait_for(_arrivals.get(), timeout=30))
+        await asyncio.sleep(gap)
+    return sorted(latencies)
+
+
+async def run_arq(redis_settings: RedisSettings, args) -> list[float]:
+    pool = await create_pool(redis_settings)
+    queue_name = f"bench:arq:{uuid.uuid4().hex}"
+    worker = Worker(
+        functions=[hop], queue_name=queue_name, redis_pool=pool, poll_delay=args.poll_delay,
+        handle_signals=False, keep_result=0, log_results=False,
+    )
+    task = asyncio.create_task(worker.async_run())
+    try:
+        return await measure(pool, queue_name, args.hops, args.gap)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await pool.delete(queue_name)
+        await pool.aclose()
+
+
+async def run_stream(redis_settings: RedisSettings, args) -> list[float]:
+    pool = await create_pool(redis_settings)
+    stream_pool = StreamArqRedis(pool.connection_pool)
+    queue_name = f"bench:stream:{uuid.uuid4().hex}"
+    consumer = JobStreamConsumer(stream_pool, {"redis": stream_pool}, queue_name, [hop], max_jobs=settings.JOB_STREAM_MAX_JOBS)
+    await consumer.start()
+    try:
+        return await measure(stream_pool, queue_name, args.hops, args.gap)
+    finally:
+        await consumer.close()
+        await pool.delete(job_stream_key(queue_name), dead_letter_key(queue_name))
+        await pool.aclose()
+
+
+def report(label: str, latencies: list[float]) -> None:
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000
+    print(f"{label:<26} p50 {p50:>8.2f} ms   p99 {p99:>8.2f} ms   max {latencies[-1] * 1000:>8.2f} ms")
+
+
+async def main_async(args) -> None:
+    redis_settings = RedisSettings.from_dsn(settings.REDIS_URL)
+    print(f"{args.hops} hops, {args.gap * 1000:.0f} ms apart, against {settings.REDIS_URL}\n")
+    report(f"arq (poll_delay={args.poll_delay}s)", await run_arq(redis_settings, args))
+    report("stream (XREADGROUP)", await run_stream(redis_settings, args))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hops", type=int, default=200)
+    parser.add_argument("--gap", type=float, default=0.05, help="Seconds between hops")
+    parser.add_argument("--poll-delay", type=float, default=0.5, help="arq worker poll_delay")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
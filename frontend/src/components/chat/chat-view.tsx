@@ -14,7 +14,7 @@ import { Button } from "../ui/button";
 
 export function ChatView({ group }: { group: GroupDetailRead }) {
   const { toast } = useToast();
-  const { lastMessage, isConnected, error: wsError } = useWebSocket(group.id);
+  const { lastMessage, turnStatus, isConnected, error: wsError } = useWebSocket(group.id);
   const [messages, setMessages] = useState<MessageHistoryRead[]>([]);
   const [isLoading, setIsLoading] = useState(true);
   const [isTurnActive, setIsTurnActive] = useState(false);
@@ -90,14 +90,14 @@ export function ChatView({ group }: { group: GroupDetailRead }) {
   // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [group.id]);
 
+  useEffect(() => {
+    if (turnStatus) {
+      setIsTurnActive(!["completed", "max_turns", "budget_exhausted", "loop_detected", "failed", "cancelled", "merged"].includes(turnStatus.phase));
+    }
+  }, [turnStatus]);
+
   useEffect(() => {
     if (lastMessage) {
-      if (lastMessage.sender_alias === 'User') {
-        setIsTurnActive(true);
-      }
-      if (lastMessage.sender_alias === 'Orchestrator' && lastMessage.content.includes('TASK_COMPLETE')) {
-        setIsTurnActive(false);
-      }
       setMessages((prev) => [...prev, lastMessage]);
       setTimeout(() => {
         scrollAreaRef.current?.scrollTo({ top: scrollAreaRef.current.scrollHeight, behavior: 'smooth' });
@@ -105,6 +105,15 @@ export function ChatView({ group }: { group: GroupDetailRead }) {
     }
   }, [lastMessage]);
 
+  const handleStopTurn = async () => {
+    if (!turnStatus) return;
+    try {
+      await fetchWithAuth(`/groups/${group.id}/turns/${turnStatus.turn_id}/cancel`, { method: "POST" });
+    } catch (error: any) {
+      toast({ variant: "destructive", title: "Failed to stop the turn", description: error.message });
+    }
+  };
+
   const handleLoadMore = () => {
     if (messages.length > 0) {
         fetchHistory(messages[0].timestamp);
@@ -143,6 +152,11 @@ export function ChatView({ group }: { group: GroupDetailRead }) {
         </div>
       </ScrollArea>
       <div className="p-4 border-t">
+        {isTurnActive && turnStatus && (
+          <div className="flex justify-center mb-2">
+            <Button variant="outline" size="sm" onClick={handleStopTurn}>Stop</Button>
+          </div>
+        )}
         <MessageInput groupId={group.id} disabled={isTurnActive || !isConnected} />
       </div>
     </div>
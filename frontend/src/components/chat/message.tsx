@@ -58,7 +58,7 @@ const ToolCall = ({ toolCall }: { toolCall: any }) => (
 
 export function Message({ message }: MessageProps) {
   const isUser = message.sender_alias === "User";
-  const toolCalls = message.meta?.kwargs?.tool_calls;
+  const toolCalls = message.meta?.tool_calls;
 
   return (
     <div className={cn("flex items-start gap-3", isUser && "justify-end")}>
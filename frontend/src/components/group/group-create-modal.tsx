@@ -49,6 +49,7 @@ const agentConfigSchema = z.object({
 const groupCreateSchema = z.object({
   name: z.string().min(1, "Group name is required.").max(100),
   members: z.array(agentConfigSchema).optional(),
+  orchestrator_mode: z.enum(["always", "auto", "direct"]).optional(),
 });
 
 export function GroupCreateModal({ isOpen, onOpenChange, onGroupCreated }: GroupCreateModalProps) {
@@ -81,7 +82,7 @@ export function GroupCreateModal({ isOpen, onOpenChange, onGroupCreated }: Group
 
   const form = useForm<z.infer<typeof groupCreateSchema>>({
     resolver: zodResolver(groupCreateSchema),
-    defaultValues: { name: "", members: [] },
+    defaultValues: { name: "", members: [], orchestrator_mode: "auto" },
   });
 
   const { fields, append, remove } = useFieldArray({
@@ -138,6 +139,29 @@ export function GroupCreateModal({ isOpen, onOpenChange, onGroupCreated }: Group
                   )}
                 />
 
+                <FormField
+                  control={form.control}
+                  name="orchestrator_mode"
+                  render={({ field }) => (
+                    <FormItem>
+                      <FormLabel>Orchestrator</FormLabel>
+                      <Select onValueChange={field.onChange} defaultValue={field.value}>
+                        <FormControl>
+                          <SelectTrigger>
+                            <SelectValue />
+                          </SelectTrigger>
+                        </FormControl>
+                        <SelectContent>
+                          <SelectItem value="always">Always consulted first</SelectItem>
+                          <SelectItem value="auto">Skipped for @mentions and single-agent groups</SelectItem>
+                          <SelectItem value="direct">Skipped, and direct replies end the turn</SelectItem>
+                        </SelectContent>
+                      </Select>
+                      <FormMessage />
+                    </FormItem>
+                  )}
+                />
+
                 <Separator />
 
                 <div>
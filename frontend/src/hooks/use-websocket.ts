@@ -2,13 +2,36 @@
 
 import { useState, useEffect, useRef } from 'react';
 import { WS_BASE_URL, JWT_TOKEN_KEY } from '@/lib/constants';
-import type { MessageHistoryRead } from '@/types';
+import { fetchWithAuth } from '@/lib/api';
+import type { MessageEvent as ChatMessageEvent, MessageHistoryRead, TurnStatus } from '@/types';
+
+const decoder = new TextDecoder();
+
+// Expands the slim broadcast envelope into a history row. The event id is
+// `<append time in ms>-<seq>`, which stands in for the timestamp until the
+// message is next loaded from history.
+function eventToMessage(groupId: string, event: ChatMessageEvent): MessageHistoryRead {
+  return {
+    id: event.id,
+    group_id: groupId,
+    turn_id: event.turn,
+    sender_alias: event.sender,
+    content: event.content,
+    timestamp: new Date(Number(event.event_id.split('-')[0])).toISOString(),
+    parent_message_id: null,
+    meta: null,
+  };
+}
 
 export function useWebSocket(groupId: string | null) {
   const [lastMessage, setLastMessage] = useState<MessageHistoryRead | null>(null);
+  const [turnStatus, setTurnStatus] = useState<TurnStatus | null>(null);
   const [isConnected, setIsConnected] = useState(false);
   const [error, setError] = useState<Event | null>(null);
   const ws = useRef<WebSocket | null>(null);
+  // Position in the group's event stream, sent back on reconnect so the
+  // server replays whatever was missed while disconnected.
+  const lastEventId = useRef<string | null>(null);
 
   useEffect(() => {
     if (!groupId) {
@@ -21,40 +44,87 @@ export function useWebSocket(groupId: string | null) {
         return;
     }
 
-    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = WS_BASE_URL.replace(/^https?:/, protocol) + `/ws/${groupId}?token=${token}`;
-    ws.current = new WebSocket(wsUrl);
+    lastEventId.current = null;
+    let reconnectTimer: ReturnType<typeof setTimeout> | null = null;
+    let disposed = false;
+    let delivery: Promise<void> = Promise.resolve();
 
-    ws.current.onopen = () => {
-      setIsConnected(true);
-      setError(null);
-    };
-
-    ws.current.onmessage = (event) => {
-      try {
-        const messageData = JSON.parse(event.data);
-        setLastMessage(messageData);
-      } catch (e) {
-        console.error('Failed to parse WebSocket message:', e);
+    const connect = () => {
+      const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+      let wsUrl = WS_BASE_URL.replace(/^https?:/, protocol) + `/ws/${groupId}?token=${token}`;
+      if (lastEventId.current) {
+        wsUrl += `&last_event_id=${encodeURIComponent(lastEventId.current)}`;
       }
-    };
+      ws.current = new WebSocket(wsUrl);
+      ws.current.binaryType = 'arraybuffer';
 
-    ws.current.onerror = (event) => {
-      console.error('WebSocket error:', event);
-      setError(event);
-      setIsConnected(false);
-    };
+      ws.current.onopen = () => {
+        setIsConnected(true);
+        setError(null);
+      };
+
+      ws.current.onmessage = (event) => {
+        try {
+          const text = typeof event.data === 'string' ? event.data : decoder.decode(event.data);
+          const messageData = JSON.parse(text);
+          if (messageData.event_id) {
+            lastEventId.current = messageData.event_id;
+          }
+          if (messageData.type === 'turn_status') {
+            // Updates can be delivered out of order; keep the newest.
+            setTurnStatus(prev =>
+              prev && prev.turn_id === messageData.turn_id && prev.version > messageData.version ? prev : messageData);
+            return;
+          }
+          if (messageData.type) {
+            // Control frames (e.g. resync) are not chat messages.
+            return;
+          }
+          const message = eventToMessage(groupId, messageData);
+          // Tool calls are not broadcast; fetch them before rendering. The
+          // chain keeps messages in order while a fetch is in flight.
+          delivery = delivery
+            .then(() => messageData.has_meta
+              ? fetchWithAuth(`/groups/${groupId}/messages/${message.id}`).catch((e: unknown) => {
+                  console.error('Failed to fetch message details:', e);
+                  return message;
+                })
+              : message)
+            .then((resolved: MessageHistoryRead) => {
+              if (!disposed) setLastMessage(resolved);
+            });
+        } catch (e) {
+          console.error('Failed to parse WebSocket message:', e);
+        }
+      };
+
+      ws.current.onerror = (event) => {
+        console.error('WebSocket error:', event);
+        setError(event);
+        setIsConnected(false);
+      };
 
-    ws.current.onclose = () => {
-      setIsConnected(false);
+      ws.current.onclose = (event) => {
+        setIsConnected(false);
+        // 1008 is an auth/authorization failure; retrying will not help.
+        if (!disposed && event.code !== 1008) {
+          reconnectTimer = setTimeout(connect, 1000);
+        }
+      };
     };
 
+    connect();
+
     return () => {
+      disposed = true;
+      if (reconnectTimer) {
+        clearTimeout(reconnectTimer);
+      }
       if (ws.current) {
         ws.current.close();
       }
     };
   }, [groupId]);
 
-  return { lastMessage, isConnected, error };
+  return { lastMessage, turnStatus, isConnected, error };
 }
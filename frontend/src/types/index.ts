@@ -26,18 +26,23 @@ export type AgentConfigCreate = {
 
 export type AgentConfigUpdate = Partial<AgentConfigCreate>;
 
+export type OrchestratorMode = "always" | "auto" | "direct";
+
 export type GroupCreate = {
   name: string;
   members?: AgentConfigCreate[];
+  orchestrator_mode?: OrchestratorMode;
 };
 
 export type GroupUpdate = {
   name: string;
+  orchestrator_mode?: OrchestratorMode;
 };
 
 export type GroupRead = {
   id: string; // UUID
   name: string;
+  orchestrator_mode: OrchestratorMode;
 };
 
 export type GroupMemberRead = {
@@ -49,11 +54,15 @@ export type GroupMemberRead = {
   provider: string;
   model: string;
   temperature: number;
+  // Orchestrator only: the fast model of its cascade.
+  fast_provider?: string | null;
+  fast_model?: string | null;
 };
 
 export type GroupDetailRead = {
   id: string; // UUID
   name: string;
+  orchestrator_mode: OrchestratorMode;
   owner_id: string; // UUID
   created_at: string; // datetime
   updated_at: string; // datetime
@@ -83,6 +92,30 @@ export type MessageHistoryRead = {
   meta: Record<string, any> | null;
 };
 
+// Slim envelope of a new message on the group WebSocket.
+export type MessageEvent = {
+  id: string; // UUID
+  sender: string;
+  content: string;
+  turn: string; // UUID
+  event_id: string;
+  has_meta?: boolean;
+};
+
+// Live progress of a turn, pushed as `turn_status` WebSocket events and
+// served by GET /groups/{group_id}/turns/{turn_id}.
+export type TurnStatus = {
+  turn_id: string; // UUID
+  group_id: string; // UUID
+  phase: "queued" | "running" | "awaiting_agents" | "awaiting_tools" | "completed" | "max_turns" | "budget_exhausted" | "loop_detected" | "failed" | "cancelled" | "merged";
+  pending: string[];
+  gather_id: string | null;
+  turn_count: number;
+  started_at: string; // datetime
+  updated_at: string; // datetime
+  version: number;
+};
+
 // 6.4 System Schemas
 export type ToolInfo = {
   name: string;
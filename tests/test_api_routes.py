@@ -27,6 +27,8 @@ os.environ.setdefault("GEMINI_API_KEY", "dummy_gemini_key")   # For llm-options
 
 from backend.api_gateway.app.main import app # Import the FastAPI app
 from backend.shared.app.models.chat import User, ChatGroup, GroupMember, Message # For direct DB manipulation if needed
+from backend.shared.app.models.outbox import OutboxEvent
+from sqlalchemy import select
 from backend.shared.app.schemas.auth import UserCreate
 from backend.shared.app.schemas.groups import GroupCreate, AgentConfigCreate
 from backend.api_gateway.app.core.security import get_password_hash, create_access_token
@@ -239,13 +241,15 @@ async def test_send_message(authenticated_client: AsyncClient, db_session_fixtur
     assert msg_from_db is not None
     assert msg_from_db.content == message_content
 
-    # Verify job enqueued
-    assert len(mock_pool.enqueued_jobs) == 1
-    enqueued_job = mock_pool.enqueued_jobs[0]
-    assert enqueued_job["args"][0] == "start_turn"
-    assert enqueued_job["kwargs"]["group_id"] == str(group.id)
-    assert enqueued_job["kwargs"]["message_content"] == message_content
-    assert enqueued_job["kwargs"]["message_id"] == sent_message_data["id"]
+    # The start_turn job is written to the outbox in the same transaction;
+    # the request itself never talks to arq.
+    assert mock_pool.enqueued_jobs == []
+    outbox_rows = (await db_session_fixture.execute(select(OutboxEvent))).scalars().all()
+    enqueued_job = next(r for r in outbox_rows if r.job_kwargs["message_id"] == sent_message_data["id"])
+    assert enqueued_job.job_name == "start_turn"
+    assert enqueued_job.queue_name == "orchestrator_queue"
+    assert enqueued_job.job_kwargs["group_id"] == str(group.id)
+    assert enqueued_job.job_kwargs["message_content"] == message_content
 
 
 @pytest.mark.asyncio
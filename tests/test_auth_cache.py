@@ -0,0 +1,115 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import time
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.models.base import Base
+from shared.app.models.chat import User
+from app.core import security
+from app.core.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used_and_expired(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1
+
+    cache.set("short", 4, ttl=1)
+    now[0] += 2
+    assert cache.get("short") is None
+    now[0] += 10
+    assert cache.get("a") is None
+
+
+@pytest_asyncio.fixture
+async def auth_db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    queries = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        user = User(email="cached@example.com", hashed_password="x")
+        session.add(user)
+        await session.commit()
+    security.clear_auth_caches()
+    queries.clear()
+    yield sessionmaker, user, queries
+    security.clear_auth_caches()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_repeat_requests_skip_the_database(auth_db):
+    sessionmaker, user, queries = auth_db
+    token = security.create_access_token({"sub": str(user.id)})
+
+    first = await security.get_current_user(token, sessionmaker)
+    assert len(queries) == 1
+    second = await security.get_current_user(token, sessionmaker)
+    ws_user = await security.get_user_from_token(token, sessionmaker)
+
+    assert len(queries) == 1
+    assert first.id == second.id == ws_user.id == user.id
+    assert second.email == "cached@example.com"
+    assert second is not ws_user
+
+
+@pytest.mark.asyncio
+async def test_user_update_and_delete_invalidate_cache(auth_db):
+    sessionmaker, user, queries = auth_db
+    token = security.create_access_token({"sub": str(user.id)})
+    await security.get_current_user(token, sessionmaker)
+
+    async with sessionmaker() as session:
+        db_user = await session.get(User, user.id)
+        db_user.email = "renamed@example.com"
+        await session.commit()
+    assert (await security.get_current_user(token, sessionmaker)).email == "renamed@example.com"
+
+    async with sessionmaker() as session:
+        await session.delete(await session.get(User, user.id))
+        await session.commit()
+    with pytest.raises(HTTPException) as exc:
+        await security.get_current_user(token, sessionmaker)
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_invalid_and_expired_tokens_are_rejected(auth_db, monkeypatch):
+    sessionmaker, user, _ = auth_db
+    with pytest.raises(HTTPException):
+        await security.get_current_user("not-a-jwt", sessionmaker)
+
+    from jose import jwt
+    expired = jwt.encode(
+        {"sub": str(user.id), "exp": int(time.time()) - 5},
+        security.settings.SECRET_KEY,
+        algorithm=security.settings.ALGORITHM,
+    )
+    with pytest.raises(HTTPException):
+        await security.get_current_user(expired, sessionmaker)
+    assert security._token_cache.get(expired) is None
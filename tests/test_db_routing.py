@@ -0,0 +1,125 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import Response
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from shared.app.core.config import settings
+from shared.app.db import build_engines, engine_options
+from shared.app.models.base import Base
+from shared.app.models.chat import ChatGroup, GroupMember, Message, User
+from app.core import authz
+from backend.api_gateway.app.api.routers import groups as groups_router
+
+
+def test_engine_options_for_postgres_and_sqlite():
+    config = settings.model_copy(update={"DB_POOL_SIZE": 7, "DB_MAX_OVERFLOW": 3, "DB_STATEMENT_CACHE_SIZE": 50})
+    options = engine_options("postgresql+asyncpg://u:p@db/synapse", config)
+    assert options["pool_size"] == 7 and options["max_overflow"] == 3
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"statement_cache_size": 50, "prepared_statement_cache_size": 50}
+
+    bouncer = engine_options("postgresql+asyncpg://u:p@pgbouncer/synapse", config.model_copy(update={"DB_PGBOUNCER_MODE": True}))
+    assert bouncer["connect_args"]["statement_cache_size"] == 0
+    assert bouncer["connect_args"]["prepared_statement_cache_size"] == 0
+    name_func = bouncer["connect_args"]["prepared_statement_name_func"]
+    assert name_func() != name_func()
+
+    assert engine_options("sqlite+aiosqlite:///x.db", config) == {"pool_pre_ping": True}
+
+
+@pytest_asyncio.fixture
+async def primary_and_replica(tmp_path):
+    primary_engine, replica_engine = build_engines(
+        f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}", f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"
+    )
+    assert primary_engine is not replica_engine
+    for engine in (primary_engine, replica_engine):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    primary = async_sessionmaker(primary_engine, expire_on_commit=False)
+    replica = async_sessionmaker(replica_engine, expire_on_commit=False)
+
+    user_id, replicated_id, fresh_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    turn_id = uuid.uuid4()
+    base = datetime(2025, 1, 1)
+    # The replica has everything but the newest group, as if it lagged behind.
+    for sessionmaker, group_ids in ((primary, [replicated_id, fresh_id]), (replica, [replicated_id])):
+        async with sessionmaker() as session:
+            session.add(User(id=user_id, email="owner@example.com", hashed_password="x"))
+            for gid in group_ids:
+                session.add(ChatGroup(id=gid, name=f"group {gid}", owner_id=user_id))
+                session.add(GroupMember(group_id=gid, alias="Researcher", tools=[]))
+            await session.flush()
+            for i in range(4):
+                session.add(Message(group_id=replicated_id, turn_id=turn_id, sender_alias="User",
+                                    content=f"m{i}", timestamp=base + timedelta(seconds=i)))
+            await session.commit()
+
+    authz.clear_access_cache()
+    user = User(id=user_id, email="owner@example.com", hashed_password="x")
+    yield primary, replica, user, replicated_id, fresh_id
+    await primary_engine.dispose()
+    await replica_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_same_url_shares_one_engine(tmp_path):
+    url = f"sqlite+aiosqlite:///{tmp_path / 'only.db'}"
+    write_engine, read_engine = build_engines(url, None)
+    assert write_engine is read_engine
+    assert build_engines(url, url)[1] is not None
+    await write_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_group_listing_reads_from_replica(primary_and_replica):
+    primary, replica, user, replicated_id, _ = primary_and_replica
+    groups = await groups_router.list_groups(read_db=replica, current_user=user)
+    assert [g.id for g in groups] == [replicated_id]
+
+
+@pytest.mark.asyncio
+async def test_group_details_fall_back_to_primary_when_replica_lags(primary_and_replica):
+    primary, replica, user, replicated_id, fresh_id = primary_and_replica
+    details = await groups_router.get_group_details(fresh_id, db=primary, read_db=replica, current_user=user)
+    assert details.id == fresh_id and [m.alias for m in details.members] == ["Researcher"]
+
+    details = await groups_router.get_group_details(replicated_id, db=primary, read_db=replica, current_user=user)
+    assert details.id == replicated_id
+
+
+@pytest.mark.asyncio
+async def test_older_history_pages_read_from_replica(primary_and_replica):
+    primary, replica, user, replicated_id, _ = primary_and_replica
+    async with primary() as session:
+        for i in range(4):
+            await session.execute(
+                Message.__table__.update()
+                .where(Message.content == f"m{i}")
+                .values(content=f"primary m{i}")
+            )
+        await session.commit()
+
+    response = Response()
+    page = await groups_router.get_message_history(
+        replicated_id, response, limit=2, cursor=None,
+        before_timestamp=datetime(2025, 1, 1, 0, 0, 3), fields=None,
+        db=primary, read_db=replica, arq_pool=None, current_user=user,
+    )
+    assert [m["content"] for m in page] == ["m1", "m2"]
@@ -0,0 +1,155 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "orchestrator_service" / "app"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import uuid
+
+import pytest
+import pytest_asyncio
+from langchain.load.dump import dumpd
+from langchain_core.messages import AIMessage
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.models.base import Base
+from shared.app.models.chat import ChatGroup, GroupMember, Message, User
+from shared.app.utils.message_serde import deserialize_messages
+import worker as orchestrator_worker
+from graph import nodes as graph_nodes
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.lists: dict[str, list[str]] = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def hmset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    async def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, 0)) + amount)
+        return int(fields[field])
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def hsetnx(self, key, field, value):
+        fields = self.hashes.setdefault(key, {})
+        if field in fields:
+            return False
+        fields[field] = str(value)
+        return True
+
+    async def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+
+    async def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    async def delete(self, key):
+        self.hashes.pop(key, None)
+        self.lists.pop(key, None)
+
+    async def close(self):
+        pass
+
+
+@pytest_asyncio.fixture
+async def gather_db(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        owner = User(email="owner@example.com", hashed_password="x")
+        session.add(owner)
+        await session.flush()
+        group = ChatGroup(name="g", owner_id=owner.id)
+        session.add(group)
+        await session.flush()
+        session.add_all([
+            GroupMember(group_id=group.id, alias=alias, system_prompt="", tools=[], provider="openai", model="gpt-4o")
+            for alias in ("Coder", "Critic")
+        ])
+        await session.commit()
+
+    events = []
+
+    async def append_group_event(redis, group_id, payload, coalesce_key=None):
+        events.append(coalesce_key)
+        return f"1000-{len(events)}"
+
+    async def ignore(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(graph_nodes, "AsyncSessionLocal", sessionmaker)
+    monkeypatch.setattr(orchestrator_worker, "AsyncReadSessionLocal", sessionmaker)
+    monkeypatch.setattr(graph_nodes.Redis, "from_url", lambda *a, **kw: FakeRedis())
+    monkeypatch.setattr(graph_nodes, "append_group_event", append_group_event)
+    monkeypatch.setattr(graph_nodes, "append_history_entries", ignore)
+    monkeypatch.setattr(graph_nodes, "record_usage", ignore)
+    yield sessionmaker, group, events
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_gathered_messages_are_published_on_arrival_and_only_once(gather_db, monkeypatch):
+    sessionmaker, group, events = gather_db
+    group_id, turn_id, gathering_id = str(group.id), str(uuid.uuid4()), "g1"
+    resumed = []
+
+    async def update_graph_with_messages(ctx, thread_id, messages_dict_list, turn_id=None):
+        resumed.append(messages_dict_list)
+
+    monkeypatch.setattr(orchestrator_worker, "update_graph_with_messages", update_graph_with_messages)
+    redis = FakeRedis()
+    await redis.hmset(f"synapse:gather:{gathering_id}", {"expected": 2, "received": 0})
+    replies = [AIMessage(content=f"{alias} here", name=alias, id=str(uuid.uuid4())) for alias in ("Critic", "Coder")]
+
+    await orchestrator_worker.process_worker_result(
+        {"redis": redis}, thread_id=group_id, message_dict=dumpd(replies[0]),
+        gathering_id=gathering_id, turn_id=turn_id, alias="Critic",
+    )
+    # The fastest agent is visible before the gather completes.
+    assert events == [replies[0].id] and resumed == []
+
+    await orchestrator_worker.process_worker_result(
+        {"redis": redis}, thread_id=group_id, message_dict=dumpd(replies[1]),
+        gathering_id=gathering_id, turn_id=turn_id, alias="Coder",
+    )
+    assert events == [replies[0].id, replies[1].id] and len(resumed) == 1
+
+    # The resumed graph persists the whole gather: nothing is written or published twice.
+    await graph_nodes.persist_messages(group_id, turn_id, deserialize_messages(resumed[0]))
+    assert events == [replies[0].id, replies[1].id]
+    async with sessionmaker() as session:
+        assert (await session.execute(select(func.count()).select_from(Message))).scalar_one() == 2
@@ -0,0 +1,176 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import asyncio
+import uuid
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.models.base import Base
+from shared.app.models.chat import ChatGroup, GroupMember, User
+from app.core import authz
+from backend.api_gateway.app.api.routers import groups as groups_router
+
+
+@pytest_asyncio.fixture
+async def authz_db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    queries = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        owner = User(email="owner@example.com", hashed_password="x")
+        other = User(email="other@example.com", hashed_password="x")
+        session.add_all([owner, other])
+        await session.flush()
+        group = ChatGroup(name="g", owner_id=owner.id)
+        session.add(group)
+        await session.flush()
+        session.add_all(GroupMember(group_id=group.id, alias=f"a{i}", tools=[]) for i in range(3))
+        await session.commit()
+    authz.clear_access_cache()
+    queries.clear()
+    yield sessionmaker, owner, other, group, queries
+    authz.clear_access_cache()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_repeat_checks_hit_the_cache_without_loading_the_group(authz_db):
+    sessionmaker, owner, _, group, queries = authz_db
+    async with sessionmaker() as session:
+        await authz.authorize_group(group.id, session, owner)
+        await authz.authorize_group(group.id, session, owner)
+    assert len(queries) == 1
+    assert "chat_groups.name" not in queries[0]
+
+
+@pytest.mark.asyncio
+async def test_denials_are_cached(authz_db):
+    sessionmaker, owner, other, group, queries = authz_db
+    missing = uuid.uuid4()
+    async with sessionmaker() as session:
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc:
+                await authz.authorize_group(group.id, session, other)
+            assert exc.value.status_code == 403
+            with pytest.raises(HTTPException) as exc:
+                await authz.authorize_group(missing, session, owner)
+            assert exc.value.status_code == 404
+            # The entity-loading helper honours cached denials as well.
+            with pytest.raises(HTTPException):
+                await groups_router.get_group_and_authorize(group.id, session, other)
+    assert len(queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_ownership_change_and_delete_invalidate(authz_db):
+    sessionmaker, owner, other, group, _ = authz_db
+    async with sessionmaker() as session:
+        await authz.authorize_group(group.id, session, owner)
+        db_group = await session.get(ChatGroup, group.id)
+        db_group.owner_id = other.id
+        await session.commit()
+
+    async with sessionmaker() as session:
+        await authz.authorize_group(group.id, session, other)
+        with pytest.raises(HTTPException) as exc:
+            await authz.authorize_group(group.id, session, owner)
+        assert exc.value.status_code == 403
+
+        await session.delete(await session.get(ChatGroup, group.id))
+        await session.commit()
+
+    async with sessionmaker() as session:
+        with pytest.raises(HTTPException) as exc:
+            await authz.authorize_group(group.id, session, other)
+        assert exc.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_group_details_load_members_in_one_query(authz_db):
+    sessionmaker, owner, _, group, queries = authz_db
+    details = await groups_router.get_group_details(group.id, db=sessionmaker, read_db=sessionmaker, current_user=owner)
+    assert sorted(m.alias for m in details.members) == ["a0", "a1", "a2"]
+    # The ownership check, then the group and its members in one joined query.
+    assert len(queries) == 2
+    assert "group_members" in queries[1] and "JOIN" in queries[1]
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def subscribe(self, channel):
+        self.redis.subscribed.append(channel)
+
+    async def listen(self):
+        for channel, data in self.redis.published:
+            yield {"type": "message", "channel": channel, "data": data.encode()}
+        await asyncio.Event().wait()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.published = []
+        self.subscribed = []
+
+    async def publish(self, channel, data):
+        self.published.append((channel, data))
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+
+@pytest.mark.asyncio
+async def test_committed_group_changes_reach_other_gateway_processes(authz_db):
+    sessionmaker, owner, other, group, _ = authz_db
+    redis = FakeRedis()
+    authz.start_access_invalidation(redis)
+    try:
+        async with sessionmaker() as session:
+            db_group = await session.get(ChatGroup, group.id)
+            db_group.name = "renamed"
+            await session.flush()
+            await session.rollback()
+            await session.commit()
+            await asyncio.sleep(0)
+            assert redis.published == []
+
+            db_group = await session.get(ChatGroup, group.id)
+            db_group.owner_id = other.id
+            await session.commit()
+        await asyncio.sleep(0)
+        assert redis.published == [(authz.INVALIDATION_CHANNEL, str(group.id))]
+
+        # Another process still holding the old decision drops it on the broadcast.
+        authz.record_group_access(group.id, owner.id, owner.id)
+        await authz.stop_access_invalidation()
+        authz.start_access_invalidation(redis)
+        await asyncio.sleep(0.01)
+        assert authz.cached_group_access(group.id, owner.id) is None
+    finally:
+        await authz.stop_access_invalidation()
@@ -0,0 +1,248 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import Response
+from redis.exceptions import WatchError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.models.base import Base
+from shared.app.models.chat import ChatGroup, Message, User
+from shared.app.utils.history_cache import (
+    append_history_entries,
+    fill_history,
+    get_history_generation,
+    history_cache_key,
+    invalidate_history,
+    read_history,
+)
+from shared.app.utils.singleflight import SingleFlight
+from backend.api_gateway.app.api.routers import groups as groups_router
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+        self.watched = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def watch(self, *keys):
+        self.watched = {k: self.redis.versions.get(k, 0) for k in keys}
+
+    async def get(self, key):
+        return await self.redis.get(key)
+
+    def multi(self):
+        pass
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        if any(self.redis.versions.get(k, 0) != v for k, v in self.watched.items()):
+            raise WatchError()
+        results = []
+        for name, args, kwargs in self.commands:
+            results.append(await getattr(self.redis, name)(*args, **kwargs))
+        return results
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.versions = {}
+
+    def _touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def incr(self, key):
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        self._touch(key)
+        return value
+
+    async def expire(self, key, seconds):
+        return key in self.data
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self._touch(key)
+
+    async def lpushx(self, key, value):
+        if key not in self.data:
+            return 0
+        self.data[key].insert(0, value.encode())
+        return len(self.data[key])
+
+    async def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(v.encode() for v in values)
+        return len(self.data[key])
+
+    async def ltrim(self, key, start, end):
+        if key in self.data:
+            self.data[key] = self.data[key][start:end + 1]
+
+    async def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+
+def _row(i, group_id, base=datetime(2025, 1, 1, 12, 0, 0)):
+    return {
+        "id": str(uuid.UUID(int=i)),
+        "group_id": str(group_id),
+        "turn_id": str(uuid.UUID(int=0)),
+        "sender_alias": "User",
+        "content": f"m{i}",
+        "timestamp": base + timedelta(seconds=i),
+        "parent_message_id": None,
+        "meta": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_write_through_only_updates_warm_lists():
+    redis, gid = FakeRedis(), uuid.uuid4()
+    await append_history_entries(redis, gid, [_row(1, gid)])
+    assert await read_history(redis, gid, 10) is None
+
+    generation = await get_history_generation(redis, gid)
+    assert await fill_history(redis, gid, [_row(1, gid)], generation)
+    await append_history_entries(redis, gid, [_row(2, gid), _row(3, gid)])
+
+    rows = await read_history(redis, gid, 10)
+    assert [r["content"] for r in rows] == ["m3", "m2", "m1"]
+
+
+@pytest.mark.asyncio
+async def test_fill_is_rejected_when_a_write_raced_it():
+    redis, gid = FakeRedis(), uuid.uuid4()
+    generation = await get_history_generation(redis, gid)
+    # A message is committed while the reader is still querying Postgres.
+    await append_history_entries(redis, gid, [_row(2, gid)])
+    assert not await fill_history(redis, gid, [_row(1, gid)], generation)
+    assert await read_history(redis, gid, 10) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidation_fences_in_flight_fill_after_group_delete():
+    redis, gid = FakeRedis(), uuid.uuid4()
+    generation = await get_history_generation(redis, gid)
+    await fill_history(redis, gid, [_row(1, gid)], generation)
+    stale_generation = await get_history_generation(redis, gid)
+
+    await invalidate_history(redis, gid)
+
+    assert history_cache_key(gid) not in redis.data
+    assert not await fill_history(redis, gid, [_row(1, gid)], stale_generation)
+    # A late write from the orchestrator must not resurrect the list.
+    await append_history_entries(redis, gid, [_row(2, gid)])
+    assert await read_history(redis, gid, 10) is None
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls():
+    flight, calls = SingleFlight(), 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [calls]
+
+    results = await asyncio.gather(*(flight.do("k", load) for _ in range(5)))
+    assert calls == 1
+    assert [r for r, _ in results] == [[1]] * 5
+    assert sum(shared for _, shared in results) == 4
+    assert not flight.in_flight("k")
+
+
+@pytest_asyncio.fixture
+async def gateway_db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        user = User(email="owner@example.com", hashed_password="x")
+        session.add(user)
+        await session.flush()
+        group = ChatGroup(name="g", owner_id=user.id)
+        session.add(group)
+        await session.flush()
+        for i in range(3):
+            session.add(Message(
+                group_id=group.id, turn_id=uuid.uuid4(), sender_alias="User",
+                content=f"m{i}", timestamp=datetime(2025, 1, 1) + timedelta(seconds=i),
+            ))
+        await session.commit()
+    yield sessionmaker, user, group
+    await engine.dispose()
+
+
+async def _first_page(sessionmaker, user, group, redis):
+    return await groups_router.get_message_history(
+        group.id, Response(), limit=50, cursor=None, before_timestamp=None, fields=None,
+        db=sessionmaker, read_db=sessionmaker, arq_pool=redis, current_user=user,
+    )
+
+
+@pytest.mark.asyncio
+async def test_history_endpoint_misses_then_hits(gateway_db):
+    sessionmaker, user, group = gateway_db
+    redis = FakeRedis()
+    hits = groups_router.history_cache_hits.value()
+    misses = groups_router.history_cache_misses.value()
+
+    cold = await _first_page(sessionmaker, user, group, redis)
+    warm = await _first_page(sessionmaker, user, group, redis)
+
+    assert [m["content"] for m in cold] == [m["content"] for m in warm] == ["m0", "m1", "m2"]
+    assert groups_router.history_cache_misses.value() == misses + 1
+    assert groups_router.history_cache_hits.value() == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_history_cache_is_gone_after_group_delete(gateway_db):
+    sessionmaker, user, group = gateway_db
+    redis = FakeRedis()
+    await _first_page(sessionmaker, user, group, redis)
+    assert history_cache_key(group.id) in redis.data
+
+    await groups_router.delete_group(group.id, db=sessionmaker, arq_pool=redis, current_user=user)
+
+    assert history_cache_key(group.id) not in redis.data
+    async with sessionmaker() as session:
+        assert await session.get(ChatGroup, group.id) is None
@@ -0,0 +1,106 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.graph import END
+
+from shared.app.agents.tools import INLINE, QUEUED, TOOL_REGISTRY, calculator, tool_execution_class
+from shared.app.core.config import settings
+from backend.orchestrator_service.app.graph import nodes
+from backend.orchestrator_service.app.graph.graph import should_route_or_end
+
+
+class FakeJob:
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+
+class FakeArq:
+    def __init__(self):
+        self.jobs = []
+
+    async def enqueue_job(self, function, **kwargs):
+        self.jobs.append((function, kwargs))
+        return FakeJob(f"job-{len(self.jobs)}")
+
+
+class SlowTool:
+    metadata = {"execution": INLINE}
+
+    async def ainvoke(self, args):
+        await asyncio.sleep(10)
+
+
+def _state(*calls):
+    message = AIMessage(content="", name="Analyst", tool_calls=[{"name": n, "id": i, "args": a} for n, i, a in calls])
+    return {
+        "messages": [message], "group_id": "g", "group_members": [], "next_actors": [],
+        "turn_count": 1, "last_saved_index": 1, "turn_id": "t",
+    }
+
+
+def test_tools_declare_their_execution_class():
+    assert tool_execution_class("calculator") == INLINE
+    assert tool_execution_class("web_search") == QUEUED
+    assert tool_execution_class("missing") == QUEUED
+    assert calculator.invoke({"expression": "(1200 * 0.15) / 12"}) == "15.0"
+    assert calculator.invoke({"expression": "__import__('os')"}).startswith("Error")
+    assert "too large" in calculator.invoke({"expression": "9**9**9"})
+
+
+def _record_statuses(monkeypatch):
+    statuses = []
+
+    async def record_turn_status(redis, group_id, turn_id, phase, **fields):
+        statuses.append((phase, fields.get("pending")))
+
+    monkeypatch.setattr(nodes, "record_turn_status", record_turn_status)
+    return statuses
+
+
+@pytest.mark.asyncio
+async def test_inline_tool_results_continue_the_same_graph_run(monkeypatch):
+    statuses = _record_statuses(monkeypatch)
+    arq = FakeArq()
+    state = _state(("calculator", "c1", {"expression": "6*7"}), ("calculator", "c2", {"expression": "1/0"}))
+    update = await nodes.dispatcher_node(state, {"configurable": {"arq_pool": arq, "thread_id": "g"}})
+
+    assert arq.jobs == []
+    assert [(m.tool_call_id, m.content) for m in update["messages"]] == [
+        ("c1", "42"), ("c2", "Error evaluating '1/0': division by zero"),
+    ]
+    assert all(isinstance(m, ToolMessage) and m.additional_kwargs["turn_id"] == "t" for m in update["messages"])
+    assert should_route_or_end({**state, **update}) == "router"
+    # Nothing is queued, so the turn never waits on tools.
+    assert statuses == []
+
+
+@pytest.mark.asyncio
+async def test_queued_tools_still_go_to_the_execution_queue(monkeypatch):
+    monkeypatch.setattr(settings, "INLINE_TOOL_TIMEOUT_SECONDS", 0.01)
+    monkeypatch.setitem(TOOL_REGISTRY, "slow_lookup", SlowTool())
+    statuses = _record_statuses(monkeypatch)
+    timeouts = nodes.inline_tool_calls.value(tool="slow_lookup", outcome="timeout")
+    arq = FakeArq()
+    state = _state(("web_search", "w1", {"query": "arq"}), ("slow_lookup", "s1", {}))
+    update = await nodes.dispatcher_node(state, {"configurable": {"arq_pool": arq, "thread_id": "g"}})
+
+    assert [(f, kw["tool_name"], kw["tool_call_id"]) for f, kw in arq.jobs] == [("run_tool", "web_search", "w1")]
+    # The inline result waits in the state for the queued one.
+    assert [m.tool_call_id for m in update["messages"]] == ["s1"]
+    assert "timed out" in update["messages"][0].content
+    assert nodes.inline_tool_calls.value(tool="slow_lookup", outcome="timeout") == timeouts + 1
+    assert should_route_or_end({**state, **update}) == END
+    assert statuses == [("awaiting_tools", ["web_search"])]
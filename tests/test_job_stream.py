@@ -0,0 +1,216 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import asyncio
+
+import pytest
+from arq.connections import ArqRedis
+from arq.constants import abort_jobs_ss
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.core.config import settings
+from shared.app.core.job_stream import (
+    CONSUMER_GROUP,
+    JobStreamConsumer,
+    StreamArqRedis,
+    dead_letter_key,
+    job_pickup_seconds,
+    job_stream_key,
+)
+from shared.app.models.base import Base
+from shared.app.models.outbox import OutboxEvent
+from app.core.outbox_relay import OutboxRelay
+
+
+class FakeStreamRedis(StreamArqRedis):
+    """Streams with one consumer group, pending entries and a settable clock."""
+
+    def __init__(self):
+        super().__init__(default_queue_name="execution_queue")
+        self.now_ms = 0
+        self.streams: dict[str, list[tuple[bytes, dict]]] = {}
+        self.cursors: dict[str, int] = {}
+        self.pending: dict[bytes, dict] = {}
+        self.strings: dict[str, bytes] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.failing_enqueues = 0
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = str(value).encode()
+        return True
+
+    async def eval(self, script, numkeys, *keys_and_args):
+        # The dedupe-and-add script, which Redis runs atomically.
+        dedupe_key, stream, _, _, job_id, payload = keys_and_args
+        if self.failing_enqueues:
+            self.failing_enqueues -= 1
+            raise ConnectionError("connection reset")
+        if dedupe_key in self.strings:
+            return None
+        self.strings[dedupe_key] = b"1"
+        return await self.xadd(stream, {"job_id": job_id, "job": payload})
+
+    async def zscore(self, key, member):
+        return self.zsets.get(key, {}).get(member)
+
+    async def xadd(self, name, fields, maxlen=None, approximate=True):
+        entries = self.streams.setdefault(name, [])
+        entry_id = f"{len(entries) + 1}-0".encode()
+        entries.append((entry_id, {k.encode() if isinstance(k, str) else k: v.encode() if isinstance(v, str) else v for k, v in fields.items()}))
+        return entry_id
+
+    async def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        self.streams.setdefault(name, [])
+
+    async def xreadgroup(self, groupname, consumername, streams, count=None, block=None):
+        (name, _), = streams.items()
+        start = self.cursors.get(name, 0)
+        entries = self.streams.get(name, [])[start:start + count]
+        self.cursors[name] = start + len(entries)
+        for entry_id, _ in entries:
+            self.pending[entry_id] = {"consumer": consumername, "delivered": 1, "at": self.now_ms}
+        return [[name.encode(), entries]] if entries else []
+
+    async def xack(self, name, groupname, *ids):
+        return sum(self.pending.pop(i, None) is not None for i in ids)
+
+    async def xpending_range(self, name, groupname, min, max, count, idle=None):
+        return [
+            {"message_id": i, "consumer": p["consumer"], "time_since_delivered": self.now_ms - p["at"], "times_delivered": p["delivered"]}
+            for i, p in self.pending.items() if self.now_ms - p["at"] >= (idle or 0)
+        ][:count]
+
+    async def xclaim(self, name, groupname, consumername, min_idle_time, message_ids, justid=False):
+        claimed = []
+        for i in message_ids:
+            p = self.pending.get(i)
+            if p is None or self.now_ms - p["at"] < min_idle_time:
+                continue
+            p.update(consumer=consumername, at=self.now_ms, delivered=p["delivered"] + (0 if justid else 1))
+            claimed.append(i if justid else (i, dict(self.streams[name])[i]))
+        return claimed
+
+
+def _consumer(redis, calls, fail=False):
+    async def run_tool(ctx, **kwargs):
+        calls.append((ctx["job_id"], ctx["job_try"], kwargs))
+        if fail:
+            raise RuntimeError("tool failed")
+
+    return JobStreamConsumer(redis, {"redis": redis}, "execution_queue", [run_tool], max_jobs=2)
+
+
+async def _drain(consumer):
+    await asyncio.gather(*consumer._running)
+
+
+@pytest.mark.asyncio
+async def test_stream_jobs_run_with_the_same_signature_and_are_acknowledged(monkeypatch):
+    redis, calls = FakeStreamRedis(), []
+    consumer = _consumer(redis, calls, fail=True)
+    picked_up = job_pickup_seconds.count(queue="execution_queue")
+
+    job = await redis.enqueue_job("run_tool", tool_name="web_search", _job_id="outbox-1", _queue_name="execution_queue")
+    assert await redis.enqueue_job("run_tool", tool_name="web_search", _job_id="outbox-1", _queue_name="execution_queue") is None
+    assert len(redis.streams[job_stream_key("execution_queue")]) == 1
+
+    assert await consumer.read_once() == 1
+    await _drain(consumer)
+    # A failed job is acknowledged, not retried, as with arq.
+    assert calls == [("outbox-1", 1, {"tool_name": "web_search"})]
+    assert redis.pending == {}
+    assert job_pickup_seconds.count(queue="execution_queue") == picked_up + 1
+
+    # Deferred jobs stay on arq.
+    deferred = []
+
+    async def arq_enqueue(self, function, *args, **kwargs):
+        deferred.append((function, kwargs["_defer_by"]))
+
+    monkeypatch.setattr(ArqRedis, "enqueue_job", arq_enqueue)
+    await redis.enqueue_job("flush_user_messages", _defer_by=1.0, _queue_name="orchestrator_queue")
+    assert deferred == [("flush_user_messages", 1.0)] and job_stream_key("orchestrator_queue") not in redis.streams
+
+
+@pytest.mark.asyncio
+async def test_entries_of_a_dead_consumer_are_redelivered_then_dead_lettered(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_STREAM_MAX_DELIVERIES", 2)
+    redis, calls = FakeStreamRedis(), []
+    stream = job_stream_key("execution_queue")
+    await redis.enqueue_job("run_tool", tool_name="a")
+    await redis.enqueue_job("run_tool", tool_name="b")
+    # A worker reads both entries and dies before acknowledging them.
+    await redis.xreadgroup(CONSUMER_GROUP, "dead-worker", {stream: ">"}, count=2)
+    redis.pending[b"2-0"]["delivered"] = 2
+
+    consumer = _consumer(redis, calls)
+    assert await consumer.claim_stale() == 0
+    redis.now_ms += int(settings.JOB_STREAM_CLAIM_IDLE_SECONDS * 1000)
+    assert await consumer.claim_stale() == 1
+    await _drain(consumer)
+
+    assert [(job_try, kwargs) for _, job_try, kwargs in calls] == [(2, {"tool_name": "a"})]
+    dead = redis.streams[dead_letter_key("execution_queue")]
+    assert [(fields[b"entry_id"], fields[b"deliveries"]) for _, fields in dead] == [(b"2-0", 2)]
+    assert redis.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_aborted_jobs_are_skipped_or_cancelled(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_STREAM_ABORT_POLL_SECONDS", 0.01)
+    redis, started = FakeStreamRedis(), []
+
+    async def run_agent_llm(ctx, **kwargs):
+        started.append(ctx["job_id"])
+        await asyncio.sleep(10)
+
+    consumer = JobStreamConsumer(redis, {"redis": redis}, "execution_queue", [run_agent_llm], max_jobs=2)
+    skipped = await redis.enqueue_job("run_agent_llm", alias="Coder")
+    running = await redis.enqueue_job("run_agent_llm", alias="Critic")
+    redis.zsets[abort_jobs_ss] = {skipped.job_id: 1.0}
+
+    assert await consumer.read_once() == 2
+    await asyncio.sleep(0.01)
+    assert started == [running.job_id]
+    redis.zsets[abort_jobs_ss][running.job_id] = 1.0
+    await asyncio.wait_for(_drain(consumer), timeout=1)
+    assert redis.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_a_failed_enqueue_is_retried_by_the_outbox_relay():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        session.add(OutboxEvent(job_name="start_turn", queue_name="orchestrator_queue", job_kwargs={"group_id": "g"}))
+        await session.commit()
+
+    redis = FakeStreamRedis()
+    redis.failing_enqueues = 1
+    relay = OutboxRelay(redis, sessionmaker=sessionmaker)
+    # The lost write leaves no dedupe key behind, so the retry is not mistaken for a duplicate.
+    assert await relay.relay_once() == 0
+    assert job_stream_key("orchestrator_queue") not in redis.streams
+    assert await relay.relay_once() == 1
+
+    (_, fields), = redis.streams[job_stream_key("orchestrator_queue")]
+    assert fields[b"job_id"].startswith(b"outbox:")
+    async with sessionmaker() as session:
+        assert (await session.execute(select(OutboxEvent))).scalars().all() == []
+    await engine.dispose()
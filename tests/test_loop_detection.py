@@ -0,0 +1,106 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from backend.orchestrator_service.app.graph.loop_detection import detect_loop, jaccard, message_fingerprint
+from backend.orchestrator_service.app.graph.router import route_logic
+from backend.orchestrator_service.app.graph.state import GraphState
+
+ASK = "@[Coder] please fix the failing migration test and report back with the diff"
+ANSWER = "I looked at the migration test but I need more details about which database is used"
+
+
+def _turn(*messages):
+    return [HumanMessage(content="fix the build", name="User"), *messages]
+
+
+def test_fingerprint_ignores_case_and_whitespace_and_covers_tool_calls():
+    a = AIMessage(content="Please  run the TESTS now", name="Coder")
+    b = AIMessage(content="please run the tests now", name="Coder")
+    assert message_fingerprint(a, 3) == message_fingerprint(b, 3)
+
+    search = lambda q: AIMessage(content="", name="Coder", tool_calls=[{"name": "web_search", "id": "1", "args": {"query": q}}])
+    assert jaccard(message_fingerprint(search("arq retries"), 3), message_fingerprint(search("arq retries"), 3)) == 1.0
+    assert jaccard(message_fingerprint(search("arq retries"), 3), message_fingerprint(search("redis streams"), 3)) < 0.5
+
+
+def test_ping_pong_between_orchestrator_and_agent_is_detected():
+    messages = _turn()
+    reasons = []
+    for round_ in range(4):
+        messages.append(AIMessage(content=ASK, name="Orchestrator"))
+        reasons.append(detect_loop(messages))
+        # The agent paraphrases only slightly.
+        messages.append(AIMessage(content=ANSWER + (" again" if round_ % 2 else ""), name="Coder"))
+        reasons.append(detect_loop(messages))
+    # The Orchestrator's third identical request is the first repetition.
+    assert reasons[:4] == [None] * 4
+    assert reasons[4].startswith("repetition: Orchestrator sent a near-identical message 3 times")
+
+
+def test_repeated_tool_calls_are_detected():
+    call = AIMessage(content="", name="Researcher", tool_calls=[{"name": "web_search", "id": "x", "args": {"query": "synapse"}}])
+    result = ToolMessage(content="no results", name="web_search", tool_call_id="x")
+    messages = _turn(call, result, call, result, call)
+    assert detect_loop(messages).startswith("repetition: Researcher")
+    # The tool result is not an agent message, so nothing is evaluated on it.
+    assert detect_loop([*messages, result]) is None
+
+
+def test_stagnating_paraphrases_are_detected():
+    base = (
+        "the deploy failed because the migration lock timed out on the replica while the queue worker "
+        "kept retrying the same job and the staging database never released its advisory lock"
+    )
+    variants = [
+        f"Coder: {base}", f"Critic: agreed, {base}", f"Coder: yes {base}",
+        f"Critic: right, {base}", f"Coder: so {base}",
+    ]
+    messages = _turn(*(AIMessage(content=text, name=text.split(":")[0]) for text in variants))
+    reason = detect_loop(messages, max_repeats=0)
+    assert reason.startswith("stagnation: the last 4 messages")
+    assert detect_loop(messages, max_repeats=0, stagnation_window=0) is None
+
+
+def test_progressing_conversation_and_previous_turns_are_not_flagged():
+    topics = ["schema", "indexes", "partitions", "archival", "cursor pagination", "replica routing"]
+    progressing = _turn(*(
+        AIMessage(content=f"Next I reviewed the {topic} changes and found {i} distinct issues worth fixing", name="Coder")
+        for i, topic in enumerate(topics)
+    ))
+    assert detect_loop(progressing) is None
+
+    # Repeats from an earlier turn do not count against the new one.
+    earlier = _turn(*(AIMessage(content=ASK, name="Orchestrator") for _ in range(3)))
+    assert detect_loop(earlier) is not None
+    assert detect_loop([*earlier, HumanMessage(content="new task", name="User"), AIMessage(content=ASK, name="Orchestrator")]) is None
+
+
+def test_route_logic_ends_a_looping_turn():
+    messages = _turn(*(AIMessage(content=ASK, name="Orchestrator") for _ in range(3)))
+    state = GraphState(
+        messages=messages,
+        group_id="g",
+        group_members=[],
+        next_actors=[],
+        turn_count=6,
+        last_saved_index=0,
+        turn_id="t",
+    )
+    update = route_logic(state)
+    assert update["next_actors"] == [] and update["stop_reason"] == "loop_detected"
+    assert "repetition" in update["messages"][0].content
+
+    # An Orchestrator ending the turn on its own is not labelled a loop.
+    state["messages"] = _turn(*(AIMessage(content="All done, thanks.", name="Orchestrator") for _ in range(3)))
+    assert "stop_reason" not in route_logic(state)
@@ -0,0 +1,159 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import json
+import uuid
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from fastapi import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.core.config import settings
+from shared.app.models.archive import MessageArchive
+from shared.app.models.base import Base
+from shared.app.models.chat import ChatGroup, Message, User
+from shared.app.utils import message_archive
+from shared.app.utils.message_archive import (
+    MonthArchiveWriter,
+    archive_path,
+    delete_group_archives,
+    read_archived_messages,
+)
+from backend.api_gateway.app.api.routers import groups as groups_router
+from backend.orchestrator_service.app.partitions import months_to_archive, partition_ddl
+
+
+def _row(group_id, ts, content):
+    return {
+        "id": str(uuid.uuid4()), "group_id": str(group_id), "turn_id": str(uuid.uuid4()),
+        "sender_alias": "User", "content": content, "timestamp": ts,
+        "parent_message_id": None, "meta": None,
+    }
+
+
+def test_partition_ddl_and_archive_selection():
+    assert partition_ddl(date(2025, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS messages_p2025_12 PARTITION OF messages "
+        "FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')"
+    )
+    partitions = [date(2025, m, 1) for m in range(1, 13)]
+    assert months_to_archive(partitions, date(2025, 9, 1), hot_months=6) == [date(2025, 1, 1), date(2025, 2, 1)]
+    assert months_to_archive(partitions, date(2025, 9, 1), hot_months=0) == []
+
+
+def test_writer_round_trip_with_keyset_filter(tmp_path, monkeypatch):
+    g1, g2 = uuid.uuid4(), uuid.uuid4()
+    month = date(2025, 1, 1)
+    base = datetime(2025, 1, 10)
+    g1_rows = [_row(g1, base + timedelta(minutes=i // 2), f"g1-{i}") for i in range(6)]
+    writer = MonthArchiveWriter(month, base_dir=tmp_path)
+    writer.write(sorted(g1_rows, key=lambda r: (r["timestamp"], r["id"])))
+    writer.write([_row(g2, base, "g2-0")])
+    writer.close()
+    assert writer.row_count == 7
+    assert archive_path(month, g1, tmp_path).exists() and archive_path(month, g2, tmp_path).exists()
+    assert not list(tmp_path.rglob("*.tmp"))
+
+    newest_first = sorted(g1_rows, key=lambda r: (r["timestamp"], uuid.UUID(r["id"])), reverse=True)
+    rows = read_archived_messages(g1, [month], None, None, limit=4, base_dir=tmp_path)
+    assert [r["content"] for r in rows] == [r["content"] for r in newest_first[:4]]
+
+    # Keyset position inside a pair of rows sharing a timestamp.
+    pivot = newest_first[2]
+    parsed = []
+    monkeypatch.setattr(message_archive, "json", SimpleNamespace(loads=lambda line: parsed.append(line) or json.loads(line)))
+    rows = read_archived_messages(g1, [month], pivot["timestamp"], uuid.UUID(pivot["id"]), limit=10, base_dir=tmp_path)
+    assert [r["content"] for r in rows] == [r["content"] for r in newest_first[3:]]
+    # The file is read up to the position only.
+    assert len(parsed) == 4
+
+    assert delete_group_archives(g1, base_dir=tmp_path) == 1
+    assert read_archived_messages(g1, [month], None, None, limit=10, base_dir=tmp_path) == []
+
+
+@pytest_asyncio.fixture
+async def archived_group(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MESSAGE_ARCHIVE_DIR", str(tmp_path))
+    groups_router._archived_months.clear()
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    user = User(email="owner@example.com", hashed_password="x")
+    async with sessionmaker() as session:
+        session.add(user)
+        await session.flush()
+        group = ChatGroup(name="g", owner_id=user.id)
+        session.add(group)
+        await session.flush()
+        # Three messages in each of Jan and Feb (archived) and Mar (hot).
+        for month in (1, 2):
+            writer = MonthArchiveWriter(date(2025, month, 1))
+            writer.write([_row(group.id, datetime(2025, month, 5 + i), f"{month}-{i}") for i in range(3)])
+            writer.close()
+            session.add(MessageArchive(month=date(2025, month, 1), row_count=3))
+        for i in range(3):
+            session.add(Message(group_id=group.id, turn_id=uuid.uuid4(), sender_alias="User",
+                                content=f"3-{i}", timestamp=datetime(2025, 3, 5 + i)))
+        await session.commit()
+
+    yield sessionmaker, user, group
+    groups_router._archived_months.clear()
+    await engine.dispose()
+
+
+async def _page(sessionmaker, user, group, **kwargs):
+    response = Response()
+    params = {"limit": 4, "cursor": None, "before_timestamp": None, "fields": None}
+    params.update(kwargs)
+    rows = await groups_router.get_message_history(
+        group.id, response, db=sessionmaker, read_db=sessionmaker, arq_pool=None, current_user=user, **params
+    )
+    return [r["content"] for r in rows], response.headers.get("X-Next-Cursor")
+
+
+@pytest.mark.asyncio
+async def test_history_pages_read_through_to_the_archive(archived_group):
+    sessionmaker, user, group = archived_group
+
+    first, cursor = await _page(sessionmaker, user, group)
+    assert first == ["2-2", "3-0", "3-1", "3-2"]
+    second, cursor = await _page(sessionmaker, user, group, cursor=cursor)
+    assert second == ["1-1", "1-2", "2-0", "2-1"]
+    third, cursor = await _page(sessionmaker, user, group, cursor=cursor)
+    assert third == ["1-0"] and cursor is None
+
+    older, _ = await _page(sessionmaker, user, group, limit=10, before_timestamp=datetime(2025, 2, 6))
+    assert older == ["1-0", "1-1", "1-2", "2-0"]
+
+
+@pytest.mark.asyncio
+async def test_month_archived_mid_request_is_not_returned_twice(archived_group):
+    sessionmaker, user, group = archived_group
+    # March was exported and recorded but the page still saw its rows.
+    writer = MonthArchiveWriter(date(2025, 3, 1))
+    async with sessionmaker() as session:
+        rows = (await session.execute(select(Message).order_by(Message.timestamp))).scalars().all()
+        writer.write([_row(group.id, m.timestamp, m.content) for m in rows])
+        session.add(MessageArchive(month=date(2025, 3, 1), row_count=3))
+        await session.commit()
+    writer.close()
+
+    contents, _ = await _page(sessionmaker, user, group, limit=20)
+    assert contents == ["1-0", "1-1", "1-2", "2-0", "2-1", "2-2", "3-0", "3-1", "3-2"]
@@ -0,0 +1,136 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.models.base import Base
+from shared.app.models.chat import ChatGroup, Message, User
+from shared.app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from backend.api_gateway.app.api.routers.groups import get_message, get_message_history
+
+
+@pytest_asyncio.fixture
+async def history_db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+
+    user = User(email="owner@example.com", hashed_password="x")
+    group = ChatGroup(name="g")
+    async with sessionmaker() as session:
+        session.add(user)
+        await session.flush()
+        group.owner_id = user.id
+        session.add(group)
+        await session.flush()
+        base = datetime(2025, 1, 1, 12, 0, 0)
+        turn_id = uuid.uuid4()
+        # Five messages share each timestamp, which the old before_timestamp
+        # paging would partially skip at page boundaries.
+        for i in range(20):
+            session.add(Message(
+                group_id=group.id,
+                turn_id=turn_id,
+                sender_alias="User",
+                content=f"m{i}",
+                timestamp=base + timedelta(seconds=i // 5),
+                meta={"usage": {"total_tokens": i}},
+            ))
+        await session.commit()
+
+    yield sessionmaker, user, group
+    await engine.dispose()
+
+
+async def _page(sessionmaker, user, group, **kwargs):
+    response = Response()
+    params = {"limit": 50, "cursor": None, "before_timestamp": None, "fields": None}
+    params.update(kwargs)
+    rows = await get_message_history(group.id, response, db=sessionmaker, read_db=sessionmaker, arq_pool=None, current_user=user, **params)
+    return rows, response.headers.get("X-Next-Cursor")
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    ts, mid = datetime(2025, 1, 1, 12, 0, 0, 123456), uuid.uuid4()
+    assert decode_cursor(encode_cursor(ts, mid)) == (ts, mid)
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_every_message_once(history_db):
+    sessionmaker, user, group = history_db
+    seen, cursor = [], None
+    while True:
+        rows, cursor = await _page(sessionmaker, user, group, limit=3, cursor=cursor)
+        seen = [r["content"] for r in rows] + seen
+        if cursor is None:
+            break
+
+    assert sorted(seen, key=lambda c: int(c[1:])) == [f"m{i}" for i in range(20)]
+    assert len(seen) == len(set(seen)) == 20
+
+
+@pytest.mark.asyncio
+async def test_fields_projection_omits_meta(history_db):
+    sessionmaker, user, group = history_db
+    rows, _ = await _page(sessionmaker, user, group, limit=5, fields="id,content")
+    assert rows and all("meta" not in r and "parent_message_id" not in r for r in rows)
+    assert {"id", "content", "timestamp", "sender_alias"} <= set(rows[0])
+
+    rows, _ = await _page(sessionmaker, user, group, limit=5)
+    assert all("meta" in r for r in rows)
+
+
+@pytest.mark.asyncio
+async def test_unknown_field_and_bad_cursor_are_rejected(history_db):
+    sessionmaker, user, group = history_db
+    with pytest.raises(HTTPException) as exc:
+        await _page(sessionmaker, user, group, fields="id,password")
+    assert exc.value.status_code == 400
+    with pytest.raises(HTTPException) as exc:
+        await _page(sessionmaker, user, group, cursor="@@@")
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_single_message_falls_back_to_primary_and_404s_elsewhere(history_db):
+    sessionmaker, user, group = history_db
+    # A replica that has not applied any insert yet.
+    replica = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with replica.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with sessionmaker() as session:
+        message = (await session.execute(select(Message).limit(1))).scalars().first()
+
+    fetched = await get_message(
+        group.id, message.id, db=sessionmaker, read_db=async_sessionmaker(replica), current_user=user
+    )
+    assert fetched.id == message.id and fetched.meta == message.meta
+
+    with pytest.raises(HTTPException) as exc:
+        await get_message(uuid.uuid4(), message.id, db=sessionmaker, read_db=sessionmaker, current_user=user)
+    assert exc.value.status_code in (403, 404)
+    with pytest.raises(HTTPException) as exc:
+        await get_message(group.id, uuid.uuid4(), db=sessionmaker, read_db=sessionmaker, current_user=user)
+    assert exc.value.status_code == 404
+    await replica.dispose()
@@ -0,0 +1,46 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from shared.app.utils.message_serde import compact_message_meta
+
+
+def _ai_message():
+    return AIMessage(
+        content="Let me look that up. " * 20,
+        name="Researcher",
+        id="0b8f7e36-5f55-4a4c-9c1b-111111111111",
+        tool_calls=[{"id": "call_1", "name": "web_search", "args": {"query": "pgvector release notes"}}],
+        usage_metadata={"input_tokens": 812, "output_tokens": 64, "total_tokens": 876},
+        response_metadata={"model_name": "gpt-4o", "system_fingerprint": "fp_" + "x" * 40, "finish_reason": "tool_calls"},
+    )
+
+
+def test_compact_meta_keeps_only_what_columns_do_not_hold():
+    meta = compact_message_meta(_ai_message())
+    assert meta == {
+        "type": "ai",
+        "tool_calls": [{"id": "call_1", "name": "web_search", "args": {"query": "pgvector release notes"}}],
+        "usage": {"input_tokens": 812, "output_tokens": 64, "total_tokens": 876},
+        "model": "gpt-4o",
+    }
+
+    tool_meta = compact_message_meta(ToolMessage(content="results...", tool_call_id="call_1", name="web_search"))
+    assert tool_meta == {"type": "tool", "tool_call_id": "call_1"}
+    assert compact_message_meta(HumanMessage(content="hi", name="User")) == {"type": "human"}
+
+
+def test_compact_meta_is_a_fraction_of_the_full_dump():
+    message = _ai_message()
+    full = len(json.dumps(message.model_dump()))
+    compact = len(json.dumps(compact_message_meta(message)))
+    # The full dump repeats the content, which dominates; the compact form
+    # is independent of content length.
+    assert compact < full / 4
+    assert len(json.dumps(compact_message_meta(ToolMessage(content="x" * 5000, tool_call_id="c")))) < 64
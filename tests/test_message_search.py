@@ -0,0 +1,147 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import uuid
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException, Response
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.models.base import Base
+from shared.app.models.chat import ChatGroup, User
+from shared.app.utils.pagination import InvalidCursorError, decode_search_cursor, encode_search_cursor
+from app.core import authz
+from backend.api_gateway.app.api.routers.groups import build_search_query, search_messages
+
+
+def test_search_cursor_round_trip_and_rejects_garbage():
+    position = (0.0333333, datetime(2025, 1, 1, 12, 0, 0, 5), uuid.uuid4())
+    assert decode_search_cursor(encode_search_cursor(*position)) == position
+    with pytest.raises(InvalidCursorError):
+        decode_search_cursor("garbage")
+
+
+def test_search_query_filters_and_highlights_only_the_page():
+    after = (0.5, datetime(2025, 1, 1), uuid.uuid4())
+    query = build_search_query(uuid.uuid4(), "deploy -staging", 20, sender_alias="Researcher", turn_id=uuid.uuid4(), after=after)
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    outer, inner = sql.split("FROM (", 1)
+
+    assert "messages.content_tsv @@ websearch_to_tsquery(CAST(" in inner
+    assert "messages.sender_alias = " in inner and "messages.turn_id = " in inner
+    assert "(ts_rank_cd(messages.content_tsv" in inner and "messages.timestamp, messages.id) < (" in inner
+    assert "LIMIT" in inner and "ts_headline" not in inner
+    assert "ts_headline(" in outer
+
+    unfiltered = str(build_search_query(uuid.uuid4(), "deploy", 20).compile(dialect=postgresql.dialect()))
+    assert "sender_alias =" not in unfiltered and ") < (" not in unfiltered
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class FakeReadSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.statements = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.rows)
+
+
+@pytest_asyncio.fixture
+async def search_db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        owner = User(email="owner@example.com", hashed_password="x")
+        other = User(email="other@example.com", hashed_password="x")
+        session.add_all([owner, other])
+        await session.flush()
+        group = ChatGroup(name="g", owner_id=owner.id)
+        session.add(group)
+        await session.commit()
+    authz.clear_access_cache()
+    yield sessionmaker, owner, other, group
+    await engine.dispose()
+
+
+def _result(rank, ts):
+    return {
+        "id": uuid.uuid4(), "group_id": uuid.uuid4(), "turn_id": uuid.uuid4(), "sender_alias": "Researcher",
+        "timestamp": ts, "rank": rank, "snippet": "the <mark>deploy</mark> failed",
+    }
+
+
+@pytest.mark.asyncio
+async def test_full_page_returns_cursor_of_last_result(search_db):
+    sessionmaker, owner, _, group = search_db
+    rows = [_result(0.9, datetime(2025, 1, 2)), _result(0.4, datetime(2025, 1, 1))]
+    read_session = FakeReadSession(rows)
+    response = Response()
+
+    results = await search_messages(
+        group.id, response, q="deploy", sender_alias=None, turn_id=None, limit=2, cursor=None,
+        db=sessionmaker, read_db=lambda: read_session, current_user=owner,
+    )
+    assert results == rows
+    assert decode_search_cursor(response.headers["X-Next-Cursor"]) == (0.4, rows[1]["timestamp"], rows[1]["id"])
+
+    response = Response()
+    await search_messages(
+        group.id, response, q="deploy", sender_alias=None, turn_id=None, limit=5, cursor=encode_search_cursor(0.4, rows[1]["timestamp"], rows[1]["id"]),
+        db=sessionmaker, read_db=lambda: read_session, current_user=owner,
+    )
+    assert "X-Next-Cursor" not in response.headers
+    assert len(read_session.statements) == 2
+
+
+@pytest.mark.asyncio
+async def test_search_rejects_bad_cursor_and_foreign_groups(search_db):
+    sessionmaker, owner, other, group = search_db
+    read_session = FakeReadSession([])
+    with pytest.raises(HTTPException) as exc:
+        await search_messages(
+            group.id, Response(), q="deploy", sender_alias=None, turn_id=None, limit=20, cursor="garbage",
+            db=sessionmaker, read_db=lambda: read_session, current_user=owner,
+        )
+    assert exc.value.status_code == 400
+
+    with pytest.raises(HTTPException) as exc:
+        await search_messages(
+            group.id, Response(), q="deploy", sender_alias=None, turn_id=None, limit=20, cursor=None,
+            db=sessionmaker, read_db=lambda: read_session, current_user=other,
+        )
+    assert exc.value.status_code == 403
+    assert read_session.statements == []
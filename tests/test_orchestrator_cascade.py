@@ -0,0 +1,132 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import asyncio
+import math
+import uuid
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from shared.app.agents import cascade, runner
+from shared.app.agents.cascade import validate_orchestrator_output
+from shared.app.core.metrics import start_metrics_server
+from shared.app.schemas.groups import GroupMemberRead
+
+
+def _member(alias, **overrides):
+    fields = dict(
+        id=uuid.uuid4(), group_id=uuid.uuid4(), alias=alias, system_prompt="{available_team_members}",
+        tools=[], provider="gemini", model="gemini-2.5-pro", temperature=0.1,
+    )
+    return GroupMemberRead(**{**fields, **overrides})
+
+
+MEMBERS = [_member("Orchestrator", fast_provider="gemini", fast_model="gemini-2.5-flash"), _member("Coder"), _member("Critic")]
+
+
+def _output(content, finish_reason="STOP", logprobs=None):
+    metadata = {"finish_reason": finish_reason}
+    if logprobs is not None:
+        metadata["logprobs"] = {"content": [{"token": "x", "logprob": lp} for lp in logprobs]}
+    return AIMessage(content=content, response_metadata=metadata)
+
+
+@pytest.mark.parametrize(
+    "message, reason",
+    [
+        (_output("@[Coder] please implement the parser"), None),
+        (_output("Here is the answer. TASK_COMPLETE"), None),
+        (_output("@[Coder] and @[Reviewer] take a look"), "unknown_mention"),
+        (_output("@[Coder] please implement the", finish_reason="MAX_TOKENS"), "no_stop_sequence"),
+        (_output("I think we should look into this."), None),
+        (_output("  "), "empty"),
+        (_output("@[Critic] review", logprobs=[math.log(0.3), math.log(0.4)]), "low_confidence"),
+    ],
+)
+def test_validate_orchestrator_output(message, reason):
+    assert validate_orchestrator_output(message, message.content, MEMBERS, min_confidence=0.5) == reason
+
+
+def test_outputs_without_a_decision_escalate_only_when_required():
+    message = _output("I think we should look into this.")
+    assert validate_orchestrator_output(message, message.content, MEMBERS, require_decision=True) == "no_decision"
+    assert validate_orchestrator_output(message, message.content, MEMBERS, require_decision=False) is None
+
+
+class FakeLLM:
+    def __init__(self, name, responses, calls):
+        self.name, self.responses, self.calls = name, list(responses), calls
+
+    def bind(self, **kwargs):
+        return self
+
+    def bind_tools(self, tools):
+        return self
+
+    async def ainvoke(self, prompt):
+        self.calls.append(self.name)
+        return self.responses.pop(0)
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_cascade_accepts_or_escalates(monkeypatch):
+    calls = []
+    rejected = _output("@[Nobody] help")
+    rejected.usage_metadata = {"input_tokens": 500, "output_tokens": 5, "total_tokens": 505}
+    fast = FakeLLM("fast", [_output("@[Coder] write the tests"), rejected], calls)
+    strong = FakeLLM("strong", [_output("@[Critic] review the plan")], calls)
+    monkeypatch.setattr(runner, "_create_llm", lambda provider, model, *a, **kw: fast if model == "gemini-2.5-flash" else strong)
+
+    accepted_before = cascade.cascade_calls.value(outcome="accepted", reason="")
+    escalated_before = cascade.cascade_calls.value(outcome="escalated", reason="unknown_mention")
+    history = [HumanMessage(content="build it", name="User")]
+
+    reply = await runner.run_agent(history, MEMBERS, "Orchestrator")
+    assert reply.content == "@[Coder] write the tests" and calls == ["fast"]
+    # Usage is priced by the model that answered, not the member's strong model.
+    assert reply.response_metadata["model_name"] == "gemini-2.5-flash"
+    reply = await runner.run_agent(history, MEMBERS, "Orchestrator")
+    assert reply.content == "@[Critic] review the plan" and calls == ["fast", "fast", "strong"]
+    assert reply.name == "Orchestrator"
+    assert reply.response_metadata["model_name"] == "gemini-2.5-pro"
+    assert reply.response_metadata["discarded_usage"] == [
+        {"model": "gemini-2.5-flash", "input_tokens": 500, "output_tokens": 5, "total_tokens": 505}
+    ]
+
+    assert cascade.cascade_calls.value(outcome="accepted", reason="") == accepted_before + 1
+    assert cascade.cascade_calls.value(outcome="escalated", reason="unknown_mention") == escalated_before + 1
+
+    # Agents and Orchestrators without a fast model call their model directly.
+    calls.clear()
+    strong.responses = [_output("done"), _output("@[Coder] go")]
+    await runner.run_agent(history, MEMBERS, "Coder")
+    await runner.run_agent(history, [_member("Orchestrator"), _member("Coder")], "Orchestrator")
+    assert calls == ["strong", "strong"]
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_serves_the_registry():
+    server = await start_metrics_server(0, host="127.0.0.1")
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+    head, body = response.split(b"\r\n\r\n", 1)
+    assert head.startswith(b"HTTP/1.1 200 OK")
+    assert b"# TYPE synapse_orchestrator_cascade_total counter" in body
@@ -0,0 +1,157 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import asyncio
+import time
+import uuid
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.models.base import Base
+from shared.app.models.chat import ChatGroup, Message, User
+from shared.app.models.outbox import OutboxEvent
+from shared.app.schemas.chat import MessageCreate
+from app.core.outbox_relay import OutboxRelay, outbox_job_id
+from backend.api_gateway.app.api.routers.groups import send_message
+
+
+class FakeArq:
+    def __init__(self, fail_for=(), delay=0.0):
+        self.jobs = {}
+        self.fail_for = set(fail_for)
+        self.delay = delay
+
+    async def enqueue_job(self, function, *args, _job_id=None, _queue_name=None, **kwargs):
+        await asyncio.sleep(self.delay)
+        if kwargs.get("message_id") in self.fail_for:
+            raise ConnectionError("redis unavailable")
+        if _job_id in self.jobs:
+            return None
+        self.jobs[_job_id] = (function, _queue_name, kwargs)
+        return _job_id
+
+
+@pytest_asyncio.fixture
+async def outbox_db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        owner = User(email="owner@example.com", hashed_password="x")
+        intruder = User(email="intruder@example.com", hashed_password="x")
+        session.add_all([owner, intruder])
+        await session.flush()
+        group = ChatGroup(name="g", owner_id=owner.id)
+        session.add(group)
+        await session.commit()
+    yield sessionmaker, owner, intruder, group
+    await engine.dispose()
+
+
+async def _rows(sessionmaker, model):
+    async with sessionmaker() as session:
+        return (await session.execute(select(model))).scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_send_message_writes_message_and_outbox_row_without_touching_arq(outbox_db):
+    sessionmaker, owner, _, group = outbox_db
+    slow_arq = FakeArq(delay=5)
+
+    started = time.perf_counter()
+    result = await send_message(group.id, MessageCreate(content="hi"), db=sessionmaker, arq_pool=slow_arq, current_user=owner)
+    assert time.perf_counter() - started < 1
+
+    assert slow_arq.jobs == {}
+    [message] = await _rows(sessionmaker, Message)
+    [event] = await _rows(sessionmaker, OutboxEvent)
+    assert message.id == result["id"] and message.timestamp == result["timestamp"]
+    assert event.job_name == "start_turn" and event.queue_name == "orchestrator_queue"
+    assert event.job_kwargs == {
+        "group_id": str(group.id),
+        "message_content": "hi",
+        "user_id": str(owner.id),
+        "message_id": str(message.id),
+        "turn_id": str(message.turn_id),
+    }
+
+
+@pytest.mark.asyncio
+async def test_unauthorized_send_leaves_no_outbox_row(outbox_db):
+    sessionmaker, _, intruder, group = outbox_db
+    with pytest.raises(HTTPException):
+        await send_message(group.id, MessageCreate(content="hi"), db=sessionmaker, arq_pool=FakeArq(), current_user=intruder)
+    assert await _rows(sessionmaker, Message) == []
+    assert await _rows(sessionmaker, OutboxEvent) == []
+
+
+@pytest.mark.asyncio
+async def test_relay_enqueues_batches_and_retries_failures(outbox_db):
+    sessionmaker, owner, _, group = outbox_db
+    for i in range(5):
+        await send_message(group.id, MessageCreate(content=f"m{i}"), db=sessionmaker, arq_pool=FakeArq(), current_user=owner)
+    events = await _rows(sessionmaker, OutboxEvent)
+    failing = events[2].job_kwargs["message_id"]
+
+    arq = FakeArq(fail_for={failing})
+    relay = OutboxRelay(arq, sessionmaker=sessionmaker, batch_size=3)
+    assert await relay.relay_once() == 2
+    assert await relay.relay_once() == 2
+    assert set(arq.jobs) == {outbox_job_id(e.id) for e in events if e.job_kwargs["message_id"] != failing}
+
+    [left] = await _rows(sessionmaker, OutboxEvent)
+    assert left.job_kwargs["message_id"] == failing
+    assert left.attempts == 2 and "redis unavailable" in left.last_error
+
+    arq.fail_for.clear()
+    assert await relay.relay_once() == 1
+    assert await _rows(sessionmaker, OutboxEvent) == []
+    assert all(job[0] == "start_turn" and job[1] == "orchestrator_queue" for job in arq.jobs.values())
+
+
+@pytest.mark.asyncio
+async def test_relaying_a_row_twice_yields_one_job(outbox_db):
+    sessionmaker, owner, _, group = outbox_db
+    await send_message(group.id, MessageCreate(content="hi"), db=sessionmaker, arq_pool=FakeArq(), current_user=owner)
+    [event] = await _rows(sessionmaker, OutboxEvent)
+    arq = FakeArq()
+    # Simulates a relay that enqueued the job but died before deleting the row.
+    await arq.enqueue_job(event.job_name, _job_id=outbox_job_id(event.id), _queue_name=event.queue_name, **event.job_kwargs)
+
+    assert await OutboxRelay(arq, sessionmaker=sessionmaker).relay_once() == 1
+    assert len(arq.jobs) == 1
+    assert await _rows(sessionmaker, OutboxEvent) == []
+
+
+@pytest.mark.asyncio
+async def test_notify_wakes_the_running_relay(outbox_db):
+    sessionmaker, owner, _, group = outbox_db
+    arq = FakeArq()
+    relay = OutboxRelay(arq, sessionmaker=sessionmaker, poll_interval=60)
+    relay.start()
+    try:
+        await send_message(group.id, MessageCreate(content="hi"), db=sessionmaker, arq_pool=FakeArq(), current_user=owner)
+        relay.notify()
+        for _ in range(100):
+            if arq.jobs:
+                break
+            await asyncio.sleep(0.01)
+        assert len(arq.jobs) == 1
+    finally:
+        await relay.stop()
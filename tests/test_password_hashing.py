@@ -0,0 +1,129 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.models.base import Base
+from shared.app.models.chat import User
+from app.core import security
+from app.api.routers.auth import login_for_access_token
+
+PASSWORD = "correct horse battery staple"
+
+
+@pytest_asyncio.fixture
+async def login_db(monkeypatch):
+    # Cheap enough for a test run, yet far slower than a healthy loop tick.
+    monkeypatch.setattr(security.settings, "BCRYPT_ROUNDS", 8)
+    monkeypatch.setattr(security, "pwd_context", security.build_password_context())
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        user = User(email="login@example.com", hashed_password=security.pwd_context.hash(PASSWORD))
+        session.add(user)
+        await session.commit()
+    yield sessionmaker, user
+    await engine.dispose()
+
+
+def _form(password=PASSWORD):
+    return SimpleNamespace(username="login@example.com", password=password)
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_during_login_burst(login_db):
+    sessionmaker, _ = login_db
+    started = time.perf_counter()
+    security.pwd_context.verify(PASSWORD, security.pwd_context.hash(PASSWORD))
+    single_verify = time.perf_counter() - started
+
+    lags, done = [], asyncio.Event()
+
+    async def probe():
+        loop = asyncio.get_running_loop()
+        while not done.is_set():
+            scheduled = loop.time()
+            await asyncio.sleep(0.005)
+            lags.append(loop.time() - scheduled - 0.005)
+
+    probe_task = asyncio.create_task(probe())
+    results = await asyncio.gather(*(login_for_access_token(_form(), sessionmaker) for _ in range(100)))
+    done.set()
+    await probe_task
+
+    assert all(r["access_token"] for r in results)
+    # Inline bcrypt would stall every tick of the burst by at least one full
+    # verify; offloaded, the typical tick is barely late.
+    lags.sort()
+    assert lags[len(lags) // 2] < 0.005
+    assert lags[int(len(lags) * 0.95)] < single_verify / 2
+    assert security.password_hash_queue_depth.value() == 0
+    assert security.password_hash_in_progress.value() == 0
+
+
+@pytest.mark.asyncio
+async def test_outdated_hash_is_upgraded_on_login(login_db):
+    sessionmaker, user = login_db
+    async with sessionmaker() as session:
+        db_user = await session.get(User, user.id)
+        db_user.hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash(PASSWORD)
+        await session.commit()
+
+    await login_for_access_token(_form(), sessionmaker)
+
+    async with sessionmaker() as session:
+        upgraded = (await session.get(User, user.id)).hashed_password
+    assert upgraded.startswith("$2b$08$")
+    assert security.pwd_context.verify(PASSWORD, upgraded)
+
+
+@pytest.mark.asyncio
+async def test_raising_bcrypt_rounds_upgrades_hashes_on_next_login(login_db, monkeypatch):
+    sessionmaker, user = login_db
+    monkeypatch.setattr(security.settings, "BCRYPT_ROUNDS", 9)
+    monkeypatch.setattr(security, "pwd_context", security.build_password_context())
+
+    await login_for_access_token(_form(), sessionmaker)
+
+    async with sessionmaker() as session:
+        assert (await session.get(User, user.id)).hashed_password.startswith("$2b$09$")
+
+
+@pytest.mark.asyncio
+async def test_wrong_password_and_unknown_user_are_rejected(login_db):
+    sessionmaker, _ = login_db
+    with pytest.raises(HTTPException) as exc:
+        await login_for_access_token(_form("wrong"), sessionmaker)
+    assert exc.value.status_code == 401
+    with pytest.raises(HTTPException) as exc:
+        await login_for_access_token(SimpleNamespace(username="nobody@example.com", password="x"), sessionmaker)
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_with_503(monkeypatch):
+    monkeypatch.setattr(security.settings, "PASSWORD_HASH_MAX_QUEUE", 0)
+    with pytest.raises(HTTPException) as exc:
+        await security.hash_password("x")
+    assert exc.value.status_code == 503
@@ -59,3 +59,101 @@ async def test_route_logic_system_error():
     update = route_logic(state)
     assert update["next_actors"] == ["Orchestrator"]
     assert update["turn_count"] == 3
+
+@pytest.mark.asyncio
+async def test_route_logic_budget_exhausted_asks_orchestrator_to_conclude_once():
+    from backend.orchestrator_service.app.graph.graph import should_dispatch_or_end
+
+    state = GraphState(
+        messages=[AIMessage(content="next @[Critic]", name="Coder")],
+        group_id="g",
+        group_members=[],
+        next_actors=[],
+        turn_count=3,
+        last_saved_index=0,
+        turn_id="t",
+    )
+    update = route_logic(state, budget_exhausted="turn token budget of 100 tokens (120 used)")
+    assert update["next_actors"] == ["Orchestrator"]
+    assert update["stop_reason"] == "budget_exhausted"
+    assert "turn token budget" in update["messages"][0].content
+
+    # Whatever the Orchestrator answers, nothing else is dispatched.
+    state["messages"] = [*state["messages"], *update["messages"], AIMessage(
+        content="@[Critic] one more look", name="Orchestrator", tool_calls=[{"name": "web_search", "id": "1", "args": {}}],
+    )]
+    state["stop_reason"] = update["stop_reason"]
+    update = route_logic(state, budget_exhausted="turn token budget of 100 tokens (180 used)")
+    assert update == {"next_actors": [], "turn_count": 4, "stop_reason": "budget_exhausted"}
+    assert should_dispatch_or_end({**state, **update}) == "sync_to_postgres"
+
+@pytest.mark.asyncio
+async def test_route_logic_budget_exhausted_on_orchestrator_conclusion_ends_directly():
+    state = GraphState(
+        messages=[AIMessage(content="Here is the summary.", name="Orchestrator")],
+        group_id="g",
+        group_members=[],
+        next_actors=[],
+        turn_count=1,
+        last_saved_index=0,
+        turn_id="t",
+    )
+    update = route_logic(state, budget_exhausted="daily token budget of 10 tokens (12 used)")
+    assert update["next_actors"] == [] and "messages" not in update
+
+def _members(*aliases):
+    import uuid
+    from shared.app.schemas.groups import GroupMemberRead
+
+    return [
+        GroupMemberRead(id=uuid.uuid4(), group_id=uuid.uuid4(), alias=alias, system_prompt="", tools=[], provider="openai", model="gpt-4o", temperature=0.1)
+        for alias in ("Orchestrator", *aliases)
+    ]
+
+@pytest.mark.asyncio
+async def test_route_logic_fast_paths_skip_the_orchestrator():
+    from langchain_core.messages import HumanMessage
+
+    def user_state(content, members, mode="auto"):
+        return GraphState(
+            messages=[HumanMessage(content=content, name="User")],
+            group_id="g",
+            group_members=_members(*members),
+            next_actors=[],
+            turn_count=0,
+            last_saved_index=0,
+            turn_id="t",
+            orchestrator_mode=mode,
+        )
+
+    update = route_logic(user_state("@[Critic] and @[Coder] and @[Nobody], review this", ["Coder", "Critic"]))
+    assert update["next_actors"] == ["Critic", "Coder"] and update["fast_path"] == "mention"
+    update = route_logic(user_state("review this", ["Coder"]))
+    assert update["next_actors"] == ["Coder"] and update["fast_path"] == "single_agent"
+
+    # Several agents and no mention, or a group that always consults the Orchestrator.
+    assert route_logic(user_state("review this", ["Coder", "Critic"])) == {"next_actors": ["Orchestrator"], "turn_count": 1}
+    assert route_logic(user_state("@[Coder] review this", ["Coder"], mode="always")) == {"next_actors": ["Orchestrator"], "turn_count": 1}
+
+@pytest.mark.asyncio
+async def test_route_logic_direct_mode_ends_turn_with_the_agents_reply():
+    from langchain_core.messages import HumanMessage
+
+    state = GraphState(
+        messages=[HumanMessage(content="review this", name="User"), AIMessage(content="Looks good.", name="Coder")],
+        group_id="g",
+        group_members=_members("Coder"),
+        next_actors=[],
+        turn_count=1,
+        last_saved_index=0,
+        turn_id="t",
+        orchestrator_mode="direct",
+        fast_path="single_agent",
+    )
+    assert route_logic(state) == {"next_actors": [], "turn_count": 2, "fast_path": "direct_reply"}
+
+    # In "auto" mode the Orchestrator reviews the reply.
+    assert route_logic({**state, "orchestrator_mode": "auto"})["next_actors"] == ["Orchestrator"]
+    # So it does once it has taken over the turn.
+    state["messages"] = [*state["messages"], AIMessage(content="@[Coder] add tests", name="Orchestrator"), AIMessage(content="Added.", name="Coder")]
+    assert route_logic(state)["next_actors"] == ["Orchestrator"]
@@ -0,0 +1,255 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import uuid
+
+import pytest
+from arq.constants import abort_jobs_ss
+from langchain.load.dump import dumpd
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+
+from shared.app.agents import runner
+from shared.app.core.config import settings
+from shared.app.schemas.groups import GroupMemberRead
+from shared.app.utils import speculation
+from shared.app.utils.message_serde import deserialize_messages
+from shared.app.utils.speculation import adopt_speculation, complete_speculation, completed_mentions, discard_speculations
+from shared.app.utils.usage import read_turn_usage
+from backend.orchestrator_service.app.graph import nodes
+from backend.execution_workers.app import worker as execution_worker
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeJob:
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.sets: dict[str, set[bytes]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.jobs: list[tuple[str, dict]] = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k.encode(): str(v).encode() for k, v in mapping.items()})
+
+    async def hsetnx(self, key, field, value):
+        fields = self.hashes.setdefault(key, {})
+        if field.encode() in fields:
+            return False
+        fields[field.encode()] = str(value).encode()
+        return True
+
+    async def hmset(self, key, mapping):
+        await self.hset(key, mapping)
+
+    async def delete(self, *keys):
+        return sum(self.hashes.pop(k, None) is not None for k in keys)
+
+    async def exists(self, *keys):
+        return sum(k in self.hashes for k in keys)
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(m.encode() for m in members)
+
+    async def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field.encode()] = str(int(fields.get(field.encode(), 0)) + amount).encode()
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def enqueue_job(self, function, **kwargs):
+        self.jobs.append((function, kwargs))
+        return FakeJob(f"job-{len(self.jobs)}")
+
+
+class StreamingLLM:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def bind(self, **kwargs):
+        return self
+
+    def bind_tools(self, tools):
+        return self
+
+    async def astream(self, prompt):
+        for chunk in self.chunks:
+            yield AIMessageChunk(content=chunk, response_metadata={"finish_reason": "STOP"})
+
+
+def _member(alias, **overrides):
+    fields = dict(
+        id=uuid.uuid4(), group_id=uuid.uuid4(), alias=alias, system_prompt="{available_team_members}",
+        tools=[], provider="gemini", model="gemini-2.5-pro", temperature=0.1,
+    )
+    return GroupMemberRead(**{**fields, **overrides})
+
+
+MEMBERS = [_member("Orchestrator"), _member("Coder"), _member("Critic"), _member("Writer")]
+
+
+@pytest.fixture
+def speculative_settings(monkeypatch):
+    monkeypatch.setattr(settings, "SPECULATIVE_DISPATCH_ENABLED", True)
+    monkeypatch.setattr(settings, "WORKER_METRICS_PORT", 0)
+    return settings
+
+
+def test_completed_mentions_wait_for_the_end_of_the_line():
+    agents = {"Coder", "Critic"}
+    assert completed_mentions("@[Coder] write the par", agents) == []
+    assert completed_mentions("@[Coder] write the parser.\n@[Critic] rev", agents) == [("Coder", "@[Coder] write the parser.")]
+    text = "Plan:\n@[Coder] and @[Critic], parse it.\n@[Nobody] hi\n@[Coder] also test.\n"
+    assert completed_mentions(text, agents) == [
+        ("Coder", "Plan:\n@[Coder] and @[Critic], parse it."), ("Critic", "Plan:\n@[Coder] and @[Critic], parse it."),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_confirmed_speculation_is_adopted_and_the_rest_discarded(monkeypatch, speculative_settings):
+    redis, group_id, turn_id = FakeRedis(), str(uuid.uuid4()), str(uuid.uuid4())
+    chunks = ["@[Coder] write", " the parser.\n@[Critic] review", " it.\n@[Writer] docs", " please."]
+    monkeypatch.setattr(runner, "_create_llm", lambda *a, **kw: StreamingLLM(chunks))
+    history = [dumpd(HumanMessage(content="build a parser", name="User", id=str(uuid.uuid4()), additional_kwargs={"turn_id": turn_id}))]
+    members = [m.model_dump() for m in MEMBERS]
+
+    await execution_worker.run_agent_llm(
+        {"redis": redis}, alias="Orchestrator", messages_dict=history, group_members_dict=members,
+        thread_id=group_id, turn_id=turn_id,
+    )
+    # Coder and Critic started mid-stream; Writer's line only ended with the stream.
+    speculative = [kwargs for function, kwargs in redis.jobs if function == "run_agent_llm"]
+    assert [job["alias"] for job in speculative] == ["Coder", "Critic"]
+    assert deserialize_messages(speculative[0]["messages_dict"])[-1].content == "@[Coder] write the parser."
+    function, result = redis.jobs[-1]
+    orchestrator_message = deserialize_messages([result["message_dict"]])[0]
+    assert function == "process_worker_result"
+    assert set(orchestrator_message.additional_kwargs["speculations"]) == {"Coder", "Critic"}
+
+    # The Coder finishes before the router has run: its result is held back.
+    async def coder(messages, members, alias, on_text=None):
+        return AIMessage(content="def parse(): ...", name=alias, id=str(uuid.uuid4()))
+
+    monkeypatch.setattr(execution_worker, "run_agent", coder)
+    jobs_before = len(redis.jobs)
+    await execution_worker.run_agent_llm({"redis": redis}, **{k: v for k, v in speculative[0].items() if k != "_queue_name"})
+    assert len(redis.jobs) == jobs_before
+
+    adopted_before = speculation.speculative_dispatches.value(outcome="adopted")
+    state = {
+        "messages": [HumanMessage(content="build a parser", name="User", id=str(uuid.uuid4())), orchestrator_message],
+        "group_id": group_id, "group_members": MEMBERS, "next_actors": ["Coder", "Writer"],
+        "turn_count": 1, "last_saved_index": 2, "turn_id": turn_id,
+    }
+    await nodes.dispatcher_node(state, {"configurable": {"arq_pool": redis, "thread_id": group_id}})
+
+    dispatched = redis.jobs[jobs_before:]
+    delivered = [kwargs for function, kwargs in dispatched if function == "process_worker_result"]
+    assert [d["alias"] for d in delivered] == ["Coder"] and delivered[0]["gathering_id"] is not None
+    assert [kwargs["alias"] for function, kwargs in dispatched if function == "run_agent_llm"] == ["Writer"]
+    assert speculation.speculative_dispatches.value(outcome="adopted") == adopted_before + 1
+    # The router did not pick the Critic: its job is aborted and its state dropped.
+    critic_job = f"job-{redis.jobs.index(('run_agent_llm', speculative[1])) + 1}"
+    assert critic_job in redis.zsets[abort_jobs_ss]
+    assert speculation.speculation_key(speculative[1]["speculation_id"]) not in redis.hashes
+
+
+@pytest.mark.asyncio
+async def test_agents_addressed_after_their_prefix_are_not_confirmed():
+    redis = FakeRedis()
+    dispatch = speculation.SpeculativeDispatch(
+        redis, thread_id="g", turn_id="t", messages_dict=[], group_members_dict=[m.model_dump() for m in MEMBERS]
+    )
+    await dispatch.on_text("@[Coder] write the parser.\n@[Critic] review it.\n@[Writer] draft docs.\n")
+    assert set(dispatch.launched) == {"Coder", "Critic", "Writer"}
+    speculation_ids = {alias: speculation_id for alias, (speculation_id, _) in dispatch.launched.items()}
+
+    final = AIMessage(content=(
+        "@[Coder] write the parser.\n@[Critic] review it.\n@[Writer] draft docs.\n"
+        "@[Coder] also add tests.\nWriter, keep it short."
+    ))
+    assert await dispatch.finish(final) == {"Critic": speculation_ids["Critic"]}
+    assert speculation.speculation_key(speculation_ids["Coder"]) not in redis.hashes
+    assert speculation.speculation_key(speculation_ids["Writer"]) not in redis.hashes
+
+
+@pytest.mark.asyncio
+async def test_adoption_before_the_result_delivers_exactly_once(monkeypatch):
+    redis = FakeRedis()
+    key = speculation.speculation_key("s1")
+    await redis.hset(key, mapping={"alias": "Coder", "turn_id": "t", "started_at": 1.0})
+    target = dict(thread_id="g", gathering_id=None, turn_id="t")
+
+    assert await adopt_speculation(redis, "s1", **target) is True
+    assert await adopt_speculation(redis, "s1", **target) is False
+    assert redis.jobs == []
+    await complete_speculation(redis, "s1", {"content": "done"}, group_id="g", turn_id="t")
+    assert [(f, kw["alias"], kw["message_dict"]) for f, kw in redis.jobs] == [("process_worker_result", "Coder", {"content": "done"})]
+
+    # A discarded speculation is never adopted, and its late result goes nowhere.
+    assert await adopt_speculation(redis, "gone", **target) is False
+    await complete_speculation(redis, "gone", {"content": "late"}, group_id="g", turn_id="t")
+    assert len(redis.jobs) == 1 and speculation.speculation_key("gone") not in redis.hashes
+
+
+def test_streamed_openai_responses_report_usage(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    assert runner._create_llm("openai", "gpt-4o", 0.1, "Orchestrator").stream_usage is True
+
+
+@pytest.mark.asyncio
+async def test_discarded_speculations_still_count_their_tokens():
+    redis = FakeRedis()
+
+    def result(tokens):
+        message = AIMessage(
+            content="def parse(): ...", name="Coder", id=str(uuid.uuid4()),
+            usage_metadata={"input_tokens": tokens, "output_tokens": 10, "total_tokens": tokens + 10},
+        )
+        return dumpd(message)
+
+    # Finished before the router discarded it.
+    await redis.hset(speculation.speculation_key("s1"), mapping={"alias": "Coder", "group_id": "g", "turn_id": "t"})
+    await complete_speculation(redis, "s1", result(100), group_id="g", turn_id="t")
+    await discard_speculations(redis, ["s1"])
+    # Discarded while its LLM call was still running.
+    await complete_speculation(redis, "s2", result(200), group_id="g", turn_id="t")
+
+    usage = await read_turn_usage(redis, "t")
+    assert (usage["input_tokens"], usage["output_tokens"]) == (300, 20)
@@ -0,0 +1,197 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "orchestrator_service" / "app"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import uuid
+
+import pytest
+
+from shared.app.core.config import settings
+from shared.app.utils.turn_queue import (
+    active_turn_key,
+    claim_user_messages,
+    debounce_window_key,
+    enqueue_user_message,
+    release_group_turn,
+)
+import worker as orchestrator_worker
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+        self.buffered = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def watch(self, *keys):
+        self.buffered = False
+
+    async def unwatch(self):
+        self.buffered = True
+
+    def multi(self):
+        self.buffered = True
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            if not self.buffered:
+                return getattr(self.redis, name)(*args, **kwargs)
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.lists: dict[str, list[bytes]] = {}
+        self.strings: dict[str, bytes] = {}
+        self.jobs: list[tuple[str, dict]] = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value.encode())
+
+    async def lindex(self, key, index):
+        values = self.lists.get(key, [])
+        return values[index] if values else None
+
+    async def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    async def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    async def get(self, key):
+        return self.strings.get(key)
+
+    async def set(self, key, value, nx=False, ex=None, px=None):
+        if nx and key in self.strings:
+            return None
+        self.strings[key] = str(value).encode()
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.lists.pop(key, None)
+            self.strings.pop(key, None)
+
+    async def exists(self, *keys):
+        return sum(k in self.strings for k in keys)
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def enqueue_job(self, function, **kwargs):
+        self.jobs.append((function, kwargs))
+
+
+def _message(content):
+    return {"message_id": str(uuid.uuid4()), "turn_id": str(uuid.uuid4()), "user_id": "u", "content": content}
+
+
+@pytest.mark.asyncio
+async def test_burst_of_messages_becomes_one_turn_after_the_window(monkeypatch):
+    monkeypatch.setattr(settings, "USER_MESSAGE_DEBOUNCE_SECONDS", 2.0)
+    redis, group_id = FakeRedis(), str(uuid.uuid4())
+    burst = [_message("fix the parser"), _message("and the tests"), _message("thanks")]
+    for message in burst:
+        await enqueue_user_message(redis, group_id, message)
+
+    flushes = [kwargs for function, kwargs in redis.jobs if function == "flush_user_messages"]
+    assert [f["last_message_id"] for f in flushes] == [m["message_id"] for m in burst]
+    # The first message finds the group idle; the others fall inside its window.
+    assert [f["_defer_by"] for f in flushes] == [0, 2.0, 2.0]
+    # Earlier flushes see a newer message and leave it to the last one.
+    for flush in flushes[:-1]:
+        assert await claim_user_messages(redis, group_id, flush["last_message_id"]) is None
+    assert await claim_user_messages(redis, group_id, flushes[-1]["last_message_id"]) == burst
+    assert (await redis.get(active_turn_key(group_id))).decode() == burst[0]["turn_id"]
+
+
+@pytest.mark.asyncio
+async def test_idle_group_starts_at_once_and_groups_can_set_their_window(monkeypatch):
+    monkeypatch.setattr(settings, "USER_MESSAGE_DEBOUNCE_SECONDS", 2.0)
+    redis, group_id = FakeRedis(), str(uuid.uuid4())
+    first, second, later = _message("hi"), _message("one more"), _message("new topic")
+    await enqueue_user_message(redis, group_id, first, debounce_seconds=0.5)
+    assert await claim_user_messages(redis, group_id, first["message_id"]) == [first]
+    await release_group_turn(redis, group_id, first["turn_id"])
+
+    # Still inside the group's window: merged with whatever follows it.
+    await enqueue_user_message(redis, group_id, second, debounce_seconds=0.5)
+    # The window passes with the group idle.
+    await redis.delete(debounce_window_key(group_id))
+    await enqueue_user_message(redis, group_id, later, debounce_seconds=0.5)
+    # A window of 0 never waits.
+    await enqueue_user_message(redis, group_id, _message("now"), debounce_seconds=0)
+
+    flushes = [kwargs["_defer_by"] for function, kwargs in redis.jobs if function == "flush_user_messages"]
+    assert flushes == [0, 0.5, 0, 0]
+
+
+@pytest.mark.asyncio
+async def test_messages_during_a_turn_wait_for_it_to_end():
+    redis, group_id = FakeRedis(), str(uuid.uuid4())
+    first, second, cancelled = _message("build it"), _message("also docs"), _message("never mind")
+    await enqueue_user_message(redis, group_id, first)
+    assert await claim_user_messages(redis, group_id, first["message_id"]) == [first]
+
+    await enqueue_user_message(redis, group_id, second)
+    await enqueue_user_message(redis, group_id, cancelled)
+    await redis.set(f"synapse:turn:{cancelled['turn_id']}:cancelled", 1)
+    assert await claim_user_messages(redis, group_id, cancelled["message_id"]) is None
+
+    # Only the turn holding the group can release it.
+    assert await release_group_turn(redis, group_id, second["turn_id"]) is False
+    jobs_before = len(redis.jobs)
+    assert await release_group_turn(redis, group_id, first["turn_id"]) is True
+    function, flush = redis.jobs[jobs_before]
+    assert function == "flush_user_messages" and flush["last_message_id"] is None and flush["_defer_by"] == 0
+    assert await claim_user_messages(redis, group_id, None) == [second]
+
+
+@pytest.mark.asyncio
+async def test_flush_runs_merged_turn_and_releases_the_group_on_failure(monkeypatch):
+    redis, group_id = FakeRedis(), str(uuid.uuid4())
+    burst = [_message("one"), _message("two")]
+    runs = []
+
+    async def run_turn(ctx, group_id, turn_id, user_messages):
+        runs.append((turn_id, [m["content"] for m in user_messages]))
+        raise RuntimeError("graph failed")
+
+    async def load_message_debounce_seconds(group_id):
+        return None
+
+    monkeypatch.setattr(orchestrator_worker, "run_turn", run_turn)
+    monkeypatch.setattr(orchestrator_worker, "load_message_debounce_seconds", load_message_debounce_seconds)
+    for message in burst:
+        await orchestrator_worker.start_turn(
+            {"redis": redis}, group_id=group_id, message_content=message["content"], user_id="u",
+            message_id=message["message_id"], turn_id=message["turn_id"],
+        )
+    with pytest.raises(RuntimeError):
+        await orchestrator_worker.flush_user_messages({"redis": redis}, group_id, burst[-1]["message_id"])
+
+    assert runs == [(burst[0]["turn_id"], ["one", "two"])]
+    assert await redis.get(active_turn_key(group_id)) is None
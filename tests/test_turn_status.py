@@ -0,0 +1,286 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import asyncio
+import uuid
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from redis.exceptions import WatchError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.models.base import Base
+from shared.app.models.chat import ChatGroup, User
+from shared.app.utils.event_stream import group_stream_key
+from langchain_core.messages import AIMessage, HumanMessage
+from arq.constants import abort_jobs_ss
+
+from shared.app.schemas.groups import GroupMemberRead
+from shared.app.utils.turn_status import (
+    cancel_turn,
+    is_turn_cancelled,
+    queue_turn,
+    read_turn_status,
+    register_turn_jobs,
+    resolve_pending,
+    set_turn_status,
+)
+from app.core import authz
+from backend.api_gateway.app.api.routers.groups import cancel_group_turn, get_turn_status
+from backend.orchestrator_service.app.graph import nodes
+from backend.execution_workers.app import worker as execution_worker
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+        self.watched = {}
+        self.buffered = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def watch(self, *keys):
+        self.watched = {k: self.redis.versions.get(k, 0) for k in keys}
+        self.buffered = False
+
+    def hgetall(self, key):
+        if self.buffered:
+            self.commands.append(("hgetall", (key,), {}))
+            return self
+        return self._read_now(key)
+
+    async def _read_now(self, key):
+        value = await self.redis.hgetall(key)
+        # Let a concurrent updater run between the read and the write.
+        await asyncio.sleep(0)
+        return value
+
+    def multi(self):
+        self.buffered = True
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        if any(self.redis.versions.get(k, 0) != v for k, v in self.watched.items()):
+            raise WatchError()
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.strings: dict[str, bytes] = {}
+        self.sets: dict[str, set[bytes]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.versions: dict[str, int] = {}
+        self.events: list[tuple[str, dict]] = []
+        self.jobs: list[tuple[str, dict]] = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k.encode(): str(v).encode() for k, v in mapping.items()})
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    async def hincrby(self, key, field, amount):
+        value = int(self.hashes[key].get(field.encode(), b"0")) + amount
+        self.hashes[key][field.encode()] = str(value).encode()
+        return value
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def set(self, key, value, ex=None):
+        self.strings[key] = str(value).encode()
+
+    async def exists(self, *keys):
+        return sum(k in self.strings or k in self.hashes or k in self.sets for k in keys)
+
+    async def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(m.encode() for m in members)
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    async def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    async def enqueue_job(self, function, **kwargs):
+        self.jobs.append((function, kwargs))
+        return FakeJob(f"job-{len(self.jobs)}")
+
+
+class FakeJob:
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+
+async def _append_group_event(redis, group_id, payload, coalesce_key=None):
+    redis.events.append((group_stream_key(group_id), {"data": payload, "key": coalesce_key}))
+    return f"1000-{len(redis.events)}"
+
+
+@pytest.fixture(autouse=True)
+def fake_event_stream(monkeypatch):
+    monkeypatch.setattr("shared.app.utils.turn_status.append_group_event", _append_group_event)
+
+
+@pytest.mark.asyncio
+async def test_turn_progress_is_recorded_and_pushed():
+    redis, group_id, turn_id = FakeRedis(), str(uuid.uuid4()), str(uuid.uuid4())
+
+    await queue_turn(redis, group_id, turn_id)
+    await set_turn_status(redis, group_id, turn_id, "running", turn_count=0)
+    # A late "queued" write never moves the turn back.
+    assert await queue_turn(redis, group_id, turn_id) is None
+    await set_turn_status(redis, group_id, turn_id, "awaiting_agents", pending=["Coder", "Critic"], gather_id="g1", turn_count=2)
+
+    status = await read_turn_status(redis, turn_id)
+    assert status["phase"] == "awaiting_agents" and status["pending"] == ["Coder", "Critic"]
+    assert status["gather_id"] == "g1" and status["turn_count"] == 2 and status["version"] == 3
+    assert status["started_at"] <= status["updated_at"]
+
+    await set_turn_status(redis, group_id, turn_id, "completed", turn_count=3)
+    assert await set_turn_status(redis, group_id, turn_id, "running") is None
+    final = await read_turn_status(redis, turn_id)
+    assert final["phase"] == "completed" and final["pending"] == [] and final["gather_id"] is None
+
+    pushed = [fields["data"] for _, fields in redis.events]
+    assert [e["phase"] for e in pushed] == ["queued", "running", "awaiting_agents", "completed"]
+    assert all(e["type"] == "turn_status" and e["turn_id"] == turn_id for e in pushed)
+    assert {fields["key"] for _, fields in redis.events} == {f"turn:{turn_id}"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gather_results_each_clear_their_alias():
+    redis, group_id, turn_id = FakeRedis(), str(uuid.uuid4()), str(uuid.uuid4())
+    await set_turn_status(redis, group_id, turn_id, "awaiting_agents", pending=["A", "B", "C"], gather_id="g")
+
+    await asyncio.gather(*(resolve_pending(redis, group_id, turn_id, alias) for alias in ("A", "B", "C")))
+    assert (await read_turn_status(redis, turn_id))["pending"] == []
+    # Unknown or already resolved aliases change nothing.
+    assert await resolve_pending(redis, group_id, turn_id, "A") is None
+
+
+@pytest_asyncio.fixture
+async def turn_db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        owner = User(email="owner@example.com", hashed_password="x")
+        session.add(owner)
+        await session.flush()
+        groups = [ChatGroup(name="a", owner_id=owner.id), ChatGroup(name="b", owner_id=owner.id)]
+        session.add_all(groups)
+        await session.commit()
+    authz.clear_access_cache()
+    yield sessionmaker, owner, groups
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_endpoint_serves_status_of_the_groups_own_turns(turn_db):
+    sessionmaker, owner, (group, other_group) = turn_db
+    redis, turn_id = FakeRedis(), uuid.uuid4()
+    await set_turn_status(redis, str(group.id), str(turn_id), "awaiting_tools", pending=["web_search"], turn_count=1)
+
+    status = await get_turn_status(group.id, turn_id, db=sessionmaker, arq_pool=redis, current_user=owner)
+    assert status["phase"] == "awaiting_tools" and status["pending"] == ["web_search"]
+
+    for group_id, unknown_turn in ((other_group.id, turn_id), (group.id, uuid.uuid4())):
+        with pytest.raises(HTTPException) as exc:
+            await get_turn_status(group_id, unknown_turn, db=sessionmaker, arq_pool=redis, current_user=owner)
+        assert exc.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_cancel_aborts_dispatched_jobs_and_stops_further_dispatch():
+    redis, group_id, turn_id = FakeRedis(), str(uuid.uuid4()), str(uuid.uuid4())
+    member = GroupMemberRead(id=uuid.uuid4(), group_id=uuid.UUID(group_id), alias="Coder", system_prompt="", tools=[], provider="openai", model="gpt-4o", temperature=0.1)
+    state = {
+        "messages": [HumanMessage(content="go", name="User", id=str(uuid.uuid4()))], "group_id": group_id,
+        "group_members": [member], "next_actors": ["Coder"], "turn_count": 1, "last_saved_index": 1, "turn_id": turn_id,
+    }
+    config = {"configurable": {"arq_pool": redis, "thread_id": group_id}}
+    await nodes.dispatcher_node(state, config)
+    assert [f for f, _ in redis.jobs] == ["run_agent_llm"]
+
+    status = await cancel_turn(redis, group_id, turn_id)
+    assert status["phase"] == "cancelled" and await is_turn_cancelled(redis, turn_id)
+    assert set(redis.zsets[abort_jobs_ss]) == {"job-1"}
+
+    # Neither the dispatcher nor the router asks anyone else to act.
+    state["messages"].append(AIMessage(content="", name="Coder", tool_calls=[{"name": "web_search", "id": "1", "args": {}}]))
+    await nodes.dispatcher_node(state, config)
+    assert len(redis.jobs) == 1
+    assert (await nodes.router_node({**state, "last_saved_index": 2}, config))["next_actors"] == []
+    # A late status write cannot revive the turn.
+    assert await set_turn_status(redis, group_id, turn_id, "awaiting_tools") is None
+
+    # Jobs registered after the cancellation read the job set are aborted too.
+    assert await register_turn_jobs(redis, turn_id, ["job-late"]) is True
+    assert "job-late" in redis.zsets[abort_jobs_ss]
+
+
+@pytest.mark.asyncio
+async def test_queued_jobs_of_a_cancelled_turn_never_run(monkeypatch):
+    redis, turn_id = FakeRedis(), str(uuid.uuid4())
+    await redis.set(f"synapse:turn:{turn_id}:cancelled", 1)
+    calls = []
+
+    async def runner(*args):
+        calls.append(args)
+        raise AssertionError("the LLM must not be called")
+
+    monkeypatch.setattr(execution_worker, "run_agent", runner)
+    await execution_worker.run_agent_llm(
+        {"redis": redis}, alias="Coder", messages_dict=[], group_members_dict=[], thread_id="g", turn_id=turn_id
+    )
+    await execution_worker.run_tool(
+        {"redis": redis}, tool_name="web_search", tool_args={}, thread_id="g", tool_call_id="1", turn_id=turn_id
+    )
+    assert calls == [] and redis.jobs == []
+
+
+@pytest.mark.asyncio
+async def test_only_running_turns_of_the_group_can_be_cancelled(turn_db):
+    sessionmaker, owner, (group, other_group) = turn_db
+    redis, turn_id = FakeRedis(), uuid.uuid4()
+    await set_turn_status(redis, str(group.id), str(turn_id), "awaiting_agents", pending=["Coder"])
+
+    with pytest.raises(HTTPException) as exc:
+        await cancel_group_turn(other_group.id, turn_id, db=sessionmaker, arq_pool=redis, current_user=owner)
+    assert exc.value.status_code == 404
+
+    status = await cancel_group_turn(group.id, turn_id, db=sessionmaker, arq_pool=redis, current_user=owner)
+    assert status["phase"] == "cancelled" and status["pending"] == []
+    with pytest.raises(HTTPException) as exc:
+        await cancel_group_turn(group.id, turn_id, db=sessionmaker, arq_pool=redis, current_user=owner)
+    assert exc.value.status_code == 409
@@ -0,0 +1,152 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import uuid
+from datetime import date
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from shared.app.core.config import settings
+from shared.app.models.base import Base
+from shared.app.models.chat import ChatGroup, User
+from shared.app.utils.usage import exhausted_budget, message_usage, read_turn_usage, record_orchestrator_call_saved, record_usage
+from app.core import authz
+from backend.api_gateway.app.api.routers.groups import get_group_usage
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.ttls: dict[str, int] = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        value = int(fields.get(field.encode(), b"0")) + amount
+        fields[field.encode()] = str(value).encode()
+        return value
+
+    async def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return True
+
+
+@pytest.fixture
+def budget_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_TOKEN_PRICES_USD_PER_MILLION", {"gpt-4o": (2.5, 10.0)})
+    monkeypatch.setattr(settings, "TURN_TOKEN_BUDGET", 0)
+    monkeypatch.setattr(settings, "GROUP_DAILY_TOKEN_BUDGET", 0)
+    monkeypatch.setattr(settings, "GROUP_DAILY_COST_BUDGET_USD", 0.0)
+    return settings
+
+
+@pytest.mark.asyncio
+async def test_usage_is_summed_per_turn_and_group_day(budget_settings):
+    redis, group_id, turn_id, day = FakeRedis(), str(uuid.uuid4()), str(uuid.uuid4()), date(2025, 7, 1)
+    usage = {"input_tokens": 1000, "output_tokens": 200, "total_tokens": 1200}
+
+    increments = [message_usage({"usage": usage}, "gpt-4o"), message_usage({"usage": usage}, "unpriced-model")]
+    assert message_usage({"type": "tool"}, "gpt-4o") is None
+    # The recorded answering model wins, and a discarded fast call is added.
+    cascaded = message_usage({
+        "usage": usage, "model": "unpriced-model",
+        "discarded_usage": [{"model": "gpt-4o", "input_tokens": 400, "output_tokens": 0}],
+    }, "gpt-4o")
+    assert cascaded == {"input_tokens": 1400, "output_tokens": 200, "cost_micro_usd": 1000}
+    await record_usage(redis, group_id, turn_id, increments, day=day)
+    await record_usage(redis, group_id, str(uuid.uuid4()), increments[:1], day=day)
+
+    turn = await read_turn_usage(redis, turn_id)
+    assert turn == {"input_tokens": 2000, "output_tokens": 400, "total_tokens": 2400, "cost_usd": 0.0045, "orchestrator_calls_saved": 0}
+    daily = f"synapse:usage:group:{group_id}:2025-07-01"
+    assert redis.hashes[daily][b"input_tokens"] == b"3000"
+    assert redis.ttls[daily] == settings.USAGE_RETENTION_DAYS * 86400
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_checks_turn_then_day(budget_settings):
+    redis, group_id, turn_id, day = FakeRedis(), str(uuid.uuid4()), str(uuid.uuid4()), date(2025, 7, 1)
+    assert await exhausted_budget(redis, group_id, turn_id, today=day) is None
+
+    await record_usage(redis, group_id, turn_id, [message_usage({"usage": {"input_tokens": 900, "output_tokens": 100}}, "gpt-4o")], day=day)
+    budget_settings.GROUP_DAILY_COST_BUDGET_USD = 0.01
+    assert await exhausted_budget(redis, group_id, turn_id, today=day) is None
+    budget_settings.GROUP_DAILY_TOKEN_BUDGET = 1000
+    assert (await exhausted_budget(redis, group_id, turn_id, today=day)).startswith("daily token budget")
+    budget_settings.TURN_TOKEN_BUDGET = 500
+    assert (await exhausted_budget(redis, group_id, turn_id, today=day)).startswith("turn token budget")
+    # A new day starts from zero.
+    assert await exhausted_budget(redis, group_id, str(uuid.uuid4()), today=date(2025, 7, 2)) is None
+
+
+@pytest_asyncio.fixture
+async def usage_db():
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    async with sessionmaker() as session:
+        owner = User(email="owner@example.com", hashed_password="x")
+        outsider = User(email="outsider@example.com", hashed_password="x")
+        session.add_all([owner, outsider])
+        await session.flush()
+        group = ChatGroup(name="a", owner_id=owner.id)
+        session.add(group)
+        await session.commit()
+    authz.clear_access_cache()
+    yield sessionmaker, owner, outsider, group
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_usage_endpoint_lists_recent_days(usage_db, budget_settings):
+    sessionmaker, owner, outsider, group = usage_db
+    redis = FakeRedis()
+    budget_settings.GROUP_DAILY_TOKEN_BUDGET = 50_000
+    await record_usage(redis, group.id, uuid.uuid4(), [message_usage({"usage": {"input_tokens": 10, "output_tokens": 5}}, "gpt-4o")])
+
+    await record_orchestrator_call_saved(redis, group.id)
+
+    usage = await get_group_usage(group.id, days=3, db=sessionmaker, arq_pool=redis, current_user=owner)
+    assert [d["total_tokens"] for d in usage["days"]] == [15, 0, 0]
+    assert [d["orchestrator_calls_saved"] for d in usage["days"]] == [1, 0, 0]
+    assert usage["days"][0]["date"] > usage["days"][1]["date"]
+    assert usage["budgets"] == {"turn_tokens": None, "daily_tokens": 50_000, "daily_cost_usd": None}
+
+    with pytest.raises(HTTPException) as exc:
+        await get_group_usage(group.id, days=3, db=sessionmaker, arq_pool=redis, current_user=outsider)
+    assert exc.value.status_code == 403
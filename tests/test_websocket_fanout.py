@@ -0,0 +1,309 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+sys.path.insert(0, str(ROOT / "backend" / "api_gateway"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///file::memory:?cache=shared")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "testsecret")
+os.environ.setdefault("TAVILY_API_KEY", "dummy")
+
+import asyncio
+import json
+
+import pytest
+
+from backend.api_gateway.app.api.websockets import ConnectionManager, RESYNC_CLOSE_REASON
+from backend.shared.app.utils.event_stream import (
+    encode_event,
+    group_stream_key,
+    message_event,
+    parse_stream_id,
+    stream_entry_to_frame,
+)
+
+
+class FakeWebSocket:
+    def __init__(self, send_delay: float = 0.0, block: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.send_delay = send_delay
+        self.unblock = asyncio.Event()
+        if not block:
+            self.unblock.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        await self.unblock.wait()
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.sent.append(message)
+
+    send_bytes = send_text
+
+    async def close(self, code=1000, reason=None):
+        self.closed_with = (code, reason)
+
+
+async def _drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_delay_others():
+    manager = ConnectionManager(max_queue_size=10, policy="drop_oldest")
+    slow, fast = FakeWebSocket(block=True), FakeWebSocket()
+    slow_conn = await manager.connect(slow, "g")
+    fast_conn = await manager.connect(fast, "g")
+
+    delivered = await manager.broadcast_to_group("g", "m1")
+    await _drain()
+
+    assert delivered == 2
+    assert fast.sent == ["m1"]
+    assert slow.sent == []
+
+    slow.unblock.set()
+    await _drain()
+    assert slow.sent == ["m1"]
+    await manager.disconnect(slow_conn)
+    await manager.disconnect(fast_conn)
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_policy_keeps_newest_frames():
+    manager = ConnectionManager(max_queue_size=2, policy="drop_oldest")
+    ws = FakeWebSocket(block=True)
+    conn = await manager.connect(ws, "g")
+    await _drain()
+
+    for i in range(4):
+        await manager.broadcast_to_group("g", f"m{i}")
+    assert [m for _, m in conn.queue] == ["m2", "m3"]
+
+    ws.unblock.set()
+    await _drain()
+    assert ws.sent == ["m2", "m3"]
+    await manager.disconnect(conn)
+
+
+@pytest.mark.asyncio
+async def test_coalesce_policy_replaces_frames_with_same_key():
+    manager = ConnectionManager(max_queue_size=2, policy="coalesce")
+    ws = FakeWebSocket(block=True)
+    conn = await manager.connect(ws, "g")
+    await _drain()
+
+    await manager.broadcast_to_group("g", "delta-1", coalesce_key="msg-a")
+    await manager.broadcast_to_group("g", "other", coalesce_key="msg-b")
+    await manager.broadcast_to_group("g", "delta-2", coalesce_key="msg-a")
+    assert [m for _, m in conn.queue] == ["other", "delta-2"]
+    await manager.disconnect(conn)
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_with_resync_hint():
+    manager = ConnectionManager(max_queue_size=1, policy="disconnect")
+    ws = FakeWebSocket(block=True)
+    conn = await manager.connect(ws, "g")
+    await _drain()
+
+    await manager.broadcast_to_group("g", "m0")
+    accepted = await manager.broadcast_to_group("g", "m1")
+    await _drain()
+
+    assert accepted == 0
+    assert conn.closed
+    assert ws.closed_with[1] == RESYNC_CLOSE_REASON
+    await manager.disconnect(conn)
+    assert "g" not in manager.active_connections
+
+
+@pytest.mark.asyncio
+async def test_sends_across_connections_run_concurrently():
+    manager = ConnectionManager(max_queue_size=10, policy="drop_oldest")
+    sockets = [FakeWebSocket(send_delay=0.05) for _ in range(10)]
+    conns = [await manager.connect(ws, "g") for ws in sockets]
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await manager.broadcast_to_group("g", "hello")
+    while not all(ws.sent for ws in sockets):
+        await asyncio.sleep(0.005)
+    elapsed = loop.time() - started
+
+    # Ten sequential sends would take at least 0.5s.
+    assert elapsed < 0.25
+    for conn in conns:
+        await manager.disconnect(conn)
+
+
+class FakeStreamRedis:
+    """Just enough of the Redis Streams API for the group event stream."""
+
+    def __init__(self):
+        self.streams: dict[str, list[tuple[str, dict]]] = {}
+        self._seq = 0
+        self._appended = asyncio.Event()
+
+    def add(self, key, payload, coalesce_key=None):
+        self._seq += 1
+        entry_id = f"1000-{self._seq}"
+        fields = {b"data": encode_event(payload)}
+        if coalesce_key:
+            fields[b"key"] = coalesce_key.encode()
+        self.streams.setdefault(key, []).append((entry_id.encode(), fields))
+        self._appended.set()
+        return entry_id
+
+    @staticmethod
+    def _id(entry_id):
+        return parse_stream_id(entry_id)
+
+    async def xrange(self, key, min="-", max="+", count=None):
+        entries = self.streams.get(key, [])
+        if min.startswith("("):
+            lower = self._id(min[1:])
+            entries = [e for e in entries if self._id(e[0]) > lower]
+        elif min != "-":
+            entries = [e for e in entries if self._id(e[0]) >= self._id(min)]
+        return entries[:count] if count else entries
+
+    async def xrevrange(self, key, max="+", min="-", count=None):
+        entries = list(reversed(self.streams.get(key, [])))
+        return entries[:count] if count else entries
+
+    async def xread(self, streams, count=None, block=None):
+        (key, cursor), = streams.items()
+        while True:
+            entries = [e for e in self.streams.get(key, []) if self._id(e[0]) > self._id(cursor)]
+            if entries:
+                return [[key.encode(), entries[:count]]]
+            self._appended.clear()
+            try:
+                await asyncio.wait_for(self._appended.wait(), timeout=(block or 1000) / 1000)
+            except asyncio.TimeoutError:
+                return []
+
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_missed_events_then_goes_live():
+    redis = FakeStreamRedis()
+    key = group_stream_key("g")
+    first_id = redis.add(key, {"id": "m1", "content": "one"}, "m1")
+    redis.add(key, {"id": "m2", "content": "two"}, "m2")
+    redis.add(key, {"id": "m3", "content": "three"}, "m3")
+
+    manager = ConnectionManager(max_queue_size=10, policy="drop_oldest")
+    ws = FakeWebSocket()
+    conn = await manager.connect(ws, "g", redis, last_event_id=first_id)
+    await _drain()
+
+    redis.add(key, {"id": "m4", "content": "four"}, "m4")
+    for _ in range(50):
+        if len(ws.sent) == 3:
+            break
+        await asyncio.sleep(0.01)
+
+    assert all(isinstance(m, bytes) for m in ws.sent)
+    frames = [json.loads(m) for m in ws.sent]
+    assert [f["id"] for f in frames] == ["m2", "m3", "m4"]
+    assert [f["event_id"] for f in frames] == ["1000-2", "1000-3", "1000-4"]
+    await manager.disconnect(conn)
+
+
+@pytest.mark.asyncio
+async def test_trimmed_last_event_id_sends_resync_hint():
+    redis = FakeStreamRedis()
+    key = group_stream_key("g")
+    redis.add(key, {"id": "m1"}, "m1")
+    redis.add(key, {"id": "m2"}, "m2")
+    redis.streams[key].pop(0)  # simulate MAXLEN trimming of m1
+
+    manager = ConnectionManager(max_queue_size=10, policy="drop_oldest")
+    ws = FakeWebSocket()
+    conn = await manager.connect(ws, "g", redis, last_event_id="999-0")
+    await _drain()
+
+    frames = [json.loads(m) for m in ws.sent]
+    assert frames[0]["type"] == "resync"
+    assert frames[1]["id"] == "m2"
+    await manager.disconnect(conn)
+
+
+@pytest.mark.asyncio
+async def test_last_client_leaving_during_a_replay_keeps_the_listener():
+    class SlowReplayRedis(FakeStreamRedis):
+        def __init__(self):
+            super().__init__()
+            self.replaying = asyncio.Event()
+            self.release_replay = asyncio.Event()
+
+        async def xrange(self, key, min="-", max="+", count=None):
+            self.replaying.set()
+            await self.release_replay.wait()
+            return await super().xrange(key, min, max, count)
+
+    redis = SlowReplayRedis()
+    key = group_stream_key("g")
+    first_id = redis.add(key, {"id": "m1"}, "m1")
+    manager = ConnectionManager(max_queue_size=10, policy="drop_oldest")
+    leaving = await manager.connect(FakeWebSocket(), "g", redis)
+
+    ws = FakeWebSocket()
+    joining = asyncio.create_task(manager.connect(ws, "g", redis, last_event_id=first_id))
+    await redis.replaying.wait()
+    disconnecting = asyncio.create_task(manager.disconnect(leaving))
+    await _drain()
+    redis.release_replay.set()
+    conn = await joining
+    await disconnecting
+
+    assert "g" in manager._listeners and manager.active_connections["g"] == [conn]
+    redis.add(key, {"id": "m2"}, "m2")
+    for _ in range(50):
+        if ws.sent:
+            break
+        await asyncio.sleep(0.01)
+    assert [json.loads(m)["id"] for m in ws.sent] == ["m2"]
+
+    await manager.disconnect(conn)
+    assert manager._listeners == {} and manager._group_locks == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_connect_stops_the_writer_and_closes_the_socket():
+    class UnavailableRedis(FakeStreamRedis):
+        async def xrevrange(self, key, max="+", min="-", count=None):
+            raise ConnectionError("redis unavailable")
+
+    manager = ConnectionManager(max_queue_size=10, policy="drop_oldest")
+    ws = FakeWebSocket()
+    tasks_before = len(asyncio.all_tasks())
+    with pytest.raises(ConnectionError):
+        await manager.connect(ws, "g", UnavailableRedis())
+    await _drain()
+
+    assert ws.closed_with == (1011, None)
+    assert len(asyncio.all_tasks()) == tasks_before
+    assert manager.active_connections == {}
+
+
+def test_frame_splices_event_id_into_stored_bytes():
+    data = encode_event(message_event("m1", "Researcher", 'say "héllo"', "t1", has_meta=True))
+    frame = stream_entry_to_frame(b"1718000000000-3", {b"data": data})
+    assert frame.startswith(data[:-1])
+    assert json.loads(frame) == {
+        "id": "m1", "sender": "Researcher", "content": 'say "héllo"', "turn": "t1",
+        "has_meta": True, "event_id": "1718000000000-3",
+    }
+    assert "has_meta" not in message_event("m2", "User", "hi", "t1")
+    for bad in (b"", b"{}", b"[1]"):
+        with pytest.raises(ValueError):
+            stream_entry_to_frame(b"1-0", {b"data": bad})